@@ -1,50 +1,323 @@
 # project/api/api_handler.py
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List
-import json
-from core.annotation import Annotation, export_annotations, export_layoutlm_format, validate_annotations
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
+from typing import List, Optional
+import os
+from core.annotation import Annotation, export_layoutlm_format, validate_annotations, overlap_violations
+from core.annotation_store import AnnotationStore, PoolTimeoutError, get_default_store
+from core.disk_cache import get_default_disk_cache
+from core.jsonl_export import iter_json_array, iter_records_jsonl
+from core.jobs import (JobQueue, QueueFullError, get_default_job_queue, new_job_id, DONE, FAILED, FINISHED_STATES,
+                       DEFAULT_JOBS_DIR)
+from core.document_tasks import DocumentLibrary, get_default_library, render_task, ocr_task, export_task
+from core.render_profiles import get_render_profile, COLORSPACES
 
 app = FastAPI(title="Annotation API")
 
+@app.exception_handler(RequestValidationError)
+async def request_validation_error_handler(request: Request, exc: RequestValidationError):
+    # ไม่ส่งค่า input กลับใน error (ค่าอย่าง NaN แปลงเป็น JSON ไม่ได้ และจะกลายเป็น 500 แทน 422)
+    errors = [{key: value for key, value in error.items() if key not in ("input", "ctx")} for error in exc.errors()]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    # connection ของฐานข้อมูลถูกใช้หมด: ให้ client ลองใหม่แทนการรอไม่มีกำหนด
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 class AnnotationModel(BaseModel):
+    # พิกัดต้องเป็นตัวเลขจำกัด และขนาดต้องไม่ติดลบ: ข้อมูลผิดรูปถูกปฏิเสธด้วย 422 ก่อนถึง store หรือ /validate
+    model_config = ConfigDict(allow_inf_nan=False)
+
     x: float
     y: float
-    width: float
-    height: float
+    width: float = Field(ge=0)
+    height: float = Field(ge=0)
     label: str
+    document: Optional[str] = None
+    page: Optional[int] = None
+    color: Optional[str] = None
+    id: Optional[int] = None
 
-# In-memory store สำหรับ Annotation
-annotations_store: List[Annotation] = []
+# จำนวน annotation ต่อหน้าของ GET /annotations (ค่าเริ่มต้นและค่าสูงสุด)
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
 
-@app.get("/annotations", response_model=List[AnnotationModel])
-def get_annotations():
-    return [anno.to_dict() for anno in annotations_store]
+# ชนิดของ body ที่ POST /annotations/bulk อ่านเป็น NDJSON (ชนิดอื่นอ่านเป็น JSON array)
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
 
-@app.post("/annotations", response_model=AnnotationModel)
-def create_annotation(anno: AnnotationModel):
-    new_anno = Annotation(anno.x, anno.y, anno.width, anno.height, anno.label)
-    annotations_store.append(new_anno)
-    return new_anno.to_dict()
+# cache ภาพหน้าบนดิสก์ ใช้ไดเรกทอรีเดียวกับ GUI (กำหนดได้ด้วย OCR_AI_CACHE_DIR)
+page_disk_cache = get_default_disk_cache()
 
-@app.get("/export/json")
-def export_annotations_endpoint():
+def get_store() -> AnnotationStore:
+    """
+    ที่เก็บ annotation (SQLite แบบ WAL ที่ OCR_AI_DB_PATH) ใช้ร่วมกันระหว่าง request และระหว่าง worker
+    """
+    return get_default_store()
+
+def annotation_filters(document: Optional[str] = None, page: Optional[int] = None, label: Optional[str] = None,
+                       region: Optional[str] = Query(None, description="x1,y1,x2,y2: annotations overlapping this box")):
+    """
+    เงื่อนไขการค้นหา annotation จาก query string (ใช้ร่วมกันระหว่าง endpoint)
+    """
+    bbox = None
+    if region is not None:
+        try:
+            bbox = tuple(float(v) for v in region.split(","))
+        except ValueError:
+            bbox = ()
+        if len(bbox) != 4:
+            raise HTTPException(status_code=400, detail="region must be x1,y1,x2,y2")
+    return {"document": document, "page": page, "label": label, "region": bbox}
+
+@app.get("/annotations", responses={200: {"model": List[AnnotationModel]}})
+def get_annotations(filters: dict = Depends(annotation_filters), cursor: Optional[int] = None,
+                    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                    store: AnnotationStore = Depends(get_store)):
+    """
+    คืนค่า annotation ไม่เกิน limit รายการ (JSON list) ถ้ายังมีรายการถัดไป header X-Next-Cursor
+    คือค่า cursor ของหน้าถัดไป ข้อมูลจาก store ถูกเขียนเป็น JSON โดยตรงโดยไม่ผ่าน pydantic
+    """
+    rows = list(store.iter_rows(**filters, after_id=cursor, limit=limit))
+    headers = {}
+    if len(rows) == limit:
+        headers["X-Next-Cursor"] = str(rows[-1]["id"])
+    return Response("".join(iter_json_array(rows)), media_type="application/json", headers=headers)
+
+@app.get("/annotations/stream")
+def stream_annotations(filters: dict = Depends(annotation_filters), store: AnnotationStore = Depends(get_store)):
+    """
+    ส่ง annotation ทั้งหมดที่ตรงเงื่อนไขเป็น NDJSON (หนึ่งบรรทัดต่อรายการ) แบบ streaming
+    """
+    return StreamingResponse(iter_records_jsonl(store.iter_rows(**filters)), media_type="application/x-ndjson")
+
+@app.post("/annotations", response_model=AnnotationModel, response_model_exclude_none=True)
+def create_annotation(anno: AnnotationModel, store: AnnotationStore = Depends(get_store)):
+    new_anno = Annotation(anno.x, anno.y, anno.width, anno.height, anno.label, anno.color, anno.page)
+    annotation_id = store.add(new_anno, document=anno.document or "")
+    return store.get(annotation_id)
+
+# ตรวจสอบทั้ง batch ในครั้งเดียวด้วย pydantic-core (ไม่สร้าง validator ต่อรายการ)
+annotation_list_adapter = TypeAdapter(List[AnnotationModel])
+
+def parse_bulk_body(body: bytes, content_type: str) -> list:
+    """
+    แปลง body ของ bulk ingest (JSON array หรือ NDJSON) เป็น list ของ AnnotationModel
+    """
+    if content_type.split(";")[0].strip() in NDJSON_CONTENT_TYPES:
+        # รวมบรรทัดเป็น JSON array เพื่อ validate ครั้งเดียว (ตำแหน่งใน error คือลำดับของบรรทัดที่ไม่ว่าง)
+        body = b"[" + b",".join(line for line in body.splitlines() if line.strip()) + b"]"
+    return annotation_list_adapter.validate_json(body)
+
+def batch_overlaps(items: list, document: str, page: Optional[int], threshold: float) -> list:
+    """
+    ตรวจการซ้อนทับภายใน batch แยกตาม (document, page) คืนค่า list ของ (i, j, overlap) ตามลำดับใน batch
+    """
+    groups = {}
+    for i, item in enumerate(items):
+        key = (item.document or document, item.page if item.page is not None else page)
+        groups.setdefault(key, []).append(i)
+    violations = []
+    for indices in groups.values():
+        annotations = [Annotation(items[i].x, items[i].y, items[i].width, items[i].height, items[i].label)
+                       for i in indices]
+        for a, b, overlap in overlap_violations(annotations, threshold):
+            violations.append((indices[a], indices[b], overlap))
+    return sorted(violations)
+
+def ingest_bulk(store: AnnotationStore, body: bytes, content_type: str, document: str, page: Optional[int],
+                check_overlaps: bool, reject_overlaps: bool, threshold: float) -> dict:
     try:
-        json_data = export_annotations(annotations_store)
-        return json.loads(json_data)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        items = parse_bulk_body(body, content_type)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False, include_input=False))
+    result = {"received": len(items)}
+    if check_overlaps or reject_overlaps:
+        violations = batch_overlaps(items, document, page, threshold)
+        result["valid"] = not violations
+        result["violations"] = [{"a": i, "b": j, "overlap": round(float(overlap), 4)} for i, j, overlap in violations]
+        if violations and reject_overlaps:
+            raise HTTPException(status_code=422, detail=result)
+    first_id, last_id = store.add_many(items, document=document, page=page)
+    result.update({"inserted": len(items), "first_id": first_id, "last_id": last_id})
+    return result
+
+@app.post("/annotations/bulk")
+async def bulk_create_annotations(request: Request, document: str = "", page: Optional[int] = None,
+                                  check_overlaps: bool = False, reject_overlaps: bool = False,
+                                  threshold: float = Query(0.8, gt=0, le=1),
+                                  store: AnnotationStore = Depends(get_store)):
+    """
+    เพิ่ม annotation หลายรายการในครั้งเดียว body เป็น JSON array หรือ NDJSON (Content-Type: application/x-ndjson)
+    document/page เป็นค่าเริ่มต้นของรายการที่ไม่ได้กำหนดเอง ทุกรายการถูกตรวจสอบก่อน แล้วเพิ่มใน transaction เดียว
+    check_overlaps รายงานคู่ที่ซ้อนทับเกิน threshold ภายใน batch, reject_overlaps ปฏิเสธทั้ง batch ถ้าพบ
+    """
+    body = await request.body()
+    # การ parse/ตรวจสอบ/เขียนฐานข้อมูลทำบน thread pool เพื่อไม่ block event loop
+    return await run_in_threadpool(ingest_bulk, store, body, request.headers.get("content-type", ""),
+                                   document, page, check_overlaps, reject_overlaps, threshold)
+
+@app.get("/export/json")
+def export_annotations_endpoint(store: AnnotationStore = Depends(get_store)):
+    # เขียน JSON array ทีละก้อนจาก store โดยตรง (ไม่ต้อง dumps แล้ว loads กลับ)
+    records = (anno.to_dict() for anno in store.iter_annotations())
+    return StreamingResponse(iter_json_array(records), media_type="application/json")
 
 @app.get("/export/layoutlm")
-def export_layoutlm_endpoint():
+def export_layoutlm_endpoint(store: AnnotationStore = Depends(get_store)):
     try:
-        json_data = export_layoutlm_format(annotations_store)
-        return json.loads(json_data)
+        json_data = export_layoutlm_format(list(store.iter_annotations()))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return Response(json_data, media_type="application/json")
 
 @app.get("/validate")
-def validate_annotations_endpoint():
-    valid, message = validate_annotations(annotations_store)
+def validate_annotations_endpoint(store: AnnotationStore = Depends(get_store)):
+    valid, message = validate_annotations(list(store.iter_annotations()))
     return {"valid": valid, "message": message}
+
+@app.get("/cache/stats")
+def cache_stats_endpoint():
+    return page_disk_cache.stats()
+
+# ชนิดงาน render/OCR/export ฝั่ง server และ render profile เริ่มต้นของแต่ละชนิด
+JOB_KINDS = {"render": "export", "ocr": "ocr", "export": "export"}
+
+class JobRequest(BaseModel):
+    kind: str
+    pages: Optional[List[int]] = None
+    profile: Optional[str] = None
+    dpi: Optional[float] = None
+    colorspace: Optional[str] = None
+    ocr_backend: Optional[str] = None
+    document_type: str = ""
+    render_images: bool = False
+
+def get_library() -> DocumentLibrary:
+    return get_default_library()
+
+def get_job_queue() -> JobQueue:
+    """
+    คิวงานภายใน process (thread pool จำกัดขนาด) งานหนักทั้งหมดทำในคิวนี้ ไม่ทำใน request handler
+    งานทำใน worker ที่รับงาน สถานะและผลลัพธ์อยู่ใน OCR_AI_JOBS_DIR จึงถามจาก worker ใดก็ได้
+    (เมื่อรันหลาย worker) แต่ DELETE /jobs/{id} และ GET /jobs ใช้ได้กับงานของ worker นั้นเท่านั้น
+    """
+    return get_default_job_queue()
+
+def get_job_or_404(job_id: str, queue: JobQueue):
+    job = queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def job_output_dir(job_id: str) -> str:
+    return os.path.join(DEFAULT_JOBS_DIR, job_id)
+
+@app.post("/documents", status_code=201)
+async def upload_document(request: Request, filename: str, library: DocumentLibrary = Depends(get_library)):
+    """
+    upload เอกสาร (body คือเนื้อหาไฟล์ PDF/ภาพ) คืนค่า document_id สำหรับสร้างงาน
+    """
+    body = await request.body()
+    if not body:
+        raise HTTPException(status_code=400, detail="Empty document")
+    try:
+        return await run_in_threadpool(library.add, body, filename)
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+@app.post("/documents/{document_id}/jobs", status_code=202)
+def create_job(document_id: str, job_request: JobRequest, response: Response,
+               library: DocumentLibrary = Depends(get_library), queue: JobQueue = Depends(get_job_queue),
+               store: AnnotationStore = Depends(get_store)):
+    """
+    ส่งงาน render/ocr/export ของเอกสารเข้าคิว คืนค่าสถานะของงานทันที (HTTP 429 ถ้าคิวเต็ม)
+    """
+    document_path = library.path_for(document_id)
+    if document_path is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if job_request.kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {sorted(JOB_KINDS)}")
+    try:
+        profile = get_render_profile(job_request.profile or JOB_KINDS[job_request.kind])
+        changes = {key: value for key, value in (("dpi", job_request.dpi), ("colorspace", job_request.colorspace))
+                   if value is not None}
+        if changes.get("colorspace", profile.colorspace) not in COLORSPACES:
+            raise ValueError(f"colorspace must be one of {list(COLORSPACES)}")
+        profile = profile.replace(**changes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job_id = new_job_id()
+    output_dir = job_output_dir(job_id)
+    params = {"document_id": document_id, **job_request.model_dump(exclude_none=True)}
+    if job_request.kind == "render":
+        task, args, kwargs = render_task, (document_path, output_dir), {"pages": job_request.pages,
+                                                                        "profile": profile}
+    elif job_request.kind == "ocr":
+        task, args, kwargs = ocr_task, (document_path, output_dir, store, document_id), {
+            "pages": job_request.pages, "ocr_backend": job_request.ocr_backend or "stub", "profile": profile}
+    else:
+        task, args, kwargs = export_task, (document_path, output_dir, store, document_id), {
+            "pages": job_request.pages, "document_type": job_request.document_type,
+            "render_images": job_request.render_images, "ocr_backend": job_request.ocr_backend,
+            "profile": profile}
+    try:
+        job = queue.submit(job_request.kind, task, *args, params=params, job_id=job_id, **kwargs)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job.to_dict()
+
+@app.get("/jobs")
+def job_queue_stats(queue: JobQueue = Depends(get_job_queue)):
+    """
+    จำนวนงานในคิวของ worker ที่ตอบ request นี้ (ไม่รวมงานของ worker อื่น)
+    """
+    return queue.stats()
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, queue: JobQueue = Depends(get_job_queue)):
+    job = get_job_or_404(job_id, queue)
+    data = job.to_dict()
+    if job.status == DONE:
+        data["result"] = job.result
+    return data
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str, queue: JobQueue = Depends(get_job_queue)):
+    """
+    ผลของงานที่เสร็จแล้ว (HTTP 409 ถ้ายังไม่เสร็จ, 500 ถ้างานล้มเหลว)
+    """
+    job = get_job_or_404(job_id, queue)
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return job.result
+
+@app.get("/jobs/{job_id}/files/{name}")
+def get_job_file(job_id: str, name: str, queue: JobQueue = Depends(get_job_queue)):
+    """
+    ไฟล์ผลลัพธ์ของงาน เช่น page-1.png ของงาน render หรือ records.jsonl ของงาน export
+    """
+    job = get_job_or_404(job_id, queue)
+    path = os.path.join(job_output_dir(job.id), os.path.basename(name))
+    if job.status != DONE or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="File not found")
+    return FileResponse(path)
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str, queue: JobQueue = Depends(get_job_queue)):
+    """
+    ยกเลิกงานที่ยังไม่เริ่ม (HTTP 409 ถ้างานเริ่มแล้วหรือเป็นงานของ worker อื่น)
+    """
+    job = get_job_or_404(job_id, queue)
+    if job.status not in FINISHED_STATES and not queue.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job has already started or belongs to another worker")
+    return job.to_dict()
@@ -0,0 +1,85 @@
+# project/benchmarks/bench_page_transfer.py
+#
+# เปรียบเทียบการส่ง pixel ของหน้าจาก MuPDF ไปยัง Qt
+#   ppm:    pix.tobytes("ppm") -> QImage.fromData -> QPixmap (encode/decode และคัดลอกหลายรอบ)
+#   direct: pixmap_to_qimage(pix) -> QPixmap (ห่อ buffer ของ fitz โดยตรง)
+# ใช้งาน (จาก root ของ repo): python -m benchmarks.bench_page_transfer --pages 100
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import fitz  # PyMuPDF
+from PyQt6.QtGui import QImage, QPixmap, QGuiApplication
+from core.pdf_utils import DEFAULT_ZOOM
+from gui.pdf_source import pixmap_to_qimage
+
+
+def make_pdf(path: str, pages: int) -> None:
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=595, height=842)  # A4
+        page.insert_text((72, 72), f"Page {i + 1}", fontsize=24)
+        for line in range(40):
+            page.insert_text((72, 110 + line * 17), "The quick brown fox jumps over the lazy dog " * 2, fontsize=9)
+        page.draw_rect(fitz.Rect(72, 800, 300, 820), color=(0, 0, 1), fill=(0.8, 0.8, 1))
+    doc.save(path)
+    doc.close()
+
+
+def via_ppm(pix) -> QPixmap:
+    return QPixmap.fromImage(QImage.fromData(pix.tobytes("ppm")))
+
+
+def via_direct(pix) -> QPixmap:
+    return QPixmap.fromImage(pixmap_to_qimage(pix))
+
+
+def run(pdf_path: str, zoom: float, convert) -> tuple:
+    """
+    render ทุกหน้าแล้วแปลงเป็น QPixmap คืนค่า (เวลา render รวม, เวลาแปลงรวม) เป็นวินาที
+    """
+    doc = fitz.open(pdf_path)
+    render_time = 0.0
+    convert_time = 0.0
+    matrix = fitz.Matrix(zoom, zoom)
+    for page in doc:
+        start = time.perf_counter()
+        pix = page.get_pixmap(matrix=matrix)
+        render_time += time.perf_counter() - start
+        start = time.perf_counter()
+        pixmap = convert(pix)
+        convert_time += time.perf_counter() - start
+        assert not pixmap.isNull()
+    doc.close()
+    return render_time, convert_time
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark MuPDF -> Qt page pixel transfer.")
+    parser.add_argument("--pages", type=int, default=100, help="number of pages in the generated PDF")
+    parser.add_argument("--zoom", type=float, default=DEFAULT_ZOOM, help="render zoom")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per method (best is reported)")
+    args = parser.parse_args(argv)
+
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "bench.pdf")
+        make_pdf(pdf_path, args.pages)
+        print(f"{args.pages} pages at zoom {args.zoom:g}")
+        results = {}
+        for name, convert in (("ppm", via_ppm), ("direct", via_direct)):
+            runs = [run(pdf_path, args.zoom, convert) for _ in range(args.repeat)]
+            render_time, convert_time = min(runs, key=lambda r: r[1])
+            results[name] = convert_time
+            print(f"{name:>7}: render {render_time * 1000:8.1f} ms, "
+                  f"to QPixmap {convert_time * 1000:8.1f} ms ({convert_time * 1000 / args.pages:.2f} ms/page)")
+        if results["direct"] > 0:
+            print(f"speedup of transfer: {results['ppm'] / results['direct']:.1f}x")
+    del app
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# project/benchmarks/bench_render_profiles.py
+#
+# เปรียบเทียบเวลา render และหน่วยความจำของเอกสารขาวดำเมื่อ render เป็น RGB กับ colorspace "auto"
+# (หน้าที่ไม่มีสีจะถูก render เป็น grayscale หนึ่ง channel)
+# "auto" วัดสองรอบ: รอบแรกรวมการตรวจสีของทุกหน้า รอบที่สองเปิดไฟล์ใหม่และใช้ผลการตรวจที่จำไว้
+# ใช้งาน (จาก root ของ repo): python -m benchmarks.bench_render_profiles --pages 100
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import fitz  # PyMuPDF
+from core.render_profiles import VIEWING_PROFILE, render_pixmap, document_key
+
+
+def make_gray_pdf(path: str, pages: int) -> None:
+    # จำลองเอกสารสแกนขาวดำ: ภาพ grayscale เต็มหน้าพร้อมข้อความสีดำ
+    scan = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 850, 1100), False)
+    scan.set_rect(scan.irect, (235,))
+    for y in range(100, 1000, 40):
+        scan.set_rect(fitz.IRect(80, y, 770, y + 12), (40,))
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(page.rect, pixmap=scan)
+        page.insert_text((72, 60), f"Page {i + 1}", fontsize=18)
+    doc.save(path)
+    doc.close()
+
+
+def run(pdf_path: str, profile) -> tuple:
+    """
+    render ทุกหน้าด้วย profile คืนค่า (เวลารวมเป็นวินาที, bytes ของ pixel รวม)
+    """
+    doc = fitz.open(pdf_path)
+    key = document_key(pdf_path)
+    elapsed = 0.0
+    total_bytes = 0
+    for page in doc:
+        start = time.perf_counter()
+        pix = render_pixmap(page, profile, key=key)
+        elapsed += time.perf_counter() - start
+        total_bytes += len(pix.samples_mv)
+    doc.close()
+    return elapsed, total_bytes
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark RGB vs auto (grayscale) rendering of a gray document.")
+    parser.add_argument("--pages", type=int, default=100, help="number of pages in the generated PDF")
+    parser.add_argument("--dpi", type=float, default=VIEWING_PROFILE.dpi, help="render resolution")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "gray.pdf")
+        make_gray_pdf(pdf_path, args.pages)
+        print(f"{args.pages} grayscale pages at {args.dpi:g} dpi")
+        results = {}
+        rgb = VIEWING_PROFILE.replace(dpi=args.dpi, colorspace="rgb")
+        auto = VIEWING_PROFILE.replace(dpi=args.dpi, colorspace="auto")
+        for name, profile in (("rgb", rgb), ("auto", auto), ("auto (probed)", auto)):
+            elapsed, total_bytes = run(pdf_path, profile)
+            results[name] = (elapsed, total_bytes)
+            print(f"{name:>13}: {elapsed * 1000:8.1f} ms, {total_bytes / 1024 / 1024:8.1f} MB of pixels")
+        print(f"time ratio: {results['rgb'][0] / results['auto'][0]:.1f}x "
+              f"({results['rgb'][0] / results['auto (probed)'][0]:.1f}x once probed), "
+              f"memory ratio: {results['rgb'][1] / results['auto'][1]:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
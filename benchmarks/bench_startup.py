@@ -0,0 +1,104 @@
+# project/benchmarks/bench_startup.py
+#
+# วัดเวลาเริ่มต้นของโปรแกรมใน process ใหม่ทุกครั้ง (cold start ของ interpreter):
+#   window: เวลาจากเริ่ม process จนหน้าต่างหลักแสดงครั้งแรก (time-to-first-window)
+#   api:    เวลาจากเริ่ม process จน API ตอบ request แรก
+#   core:   เวลา import core ที่ API และเครื่องมือ batch ใช้ (ต้องไม่ import PyQt6)
+# พร้อมแสดง module ที่ใช้เวลา import มากที่สุดจาก python -X importtime
+# ใช้งาน (จาก root ของ repo): python -m benchmarks.bench_startup --repeat 5
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# โค้ดที่รันใน process ใหม่ของแต่ละกรณี พิมพ์ชื่อ module หนักที่ถูก import ไปแล้วบรรทัดสุดท้าย
+SCENARIOS = {
+    "window": (
+        "from PyQt6.QtWidgets import QApplication\n"
+        "from gui.main_window import MainWindow\n"
+        "app = QApplication([])\n"
+        "window = MainWindow()\n"
+        "window.show()\n"
+        "app.processEvents()\n"
+    ),
+    # เรียก ASGI app โดยตรง (ไม่ผ่าน TestClient ซึ่ง import httpx เพิ่มเอง)
+    "api": (
+        "import asyncio\n"
+        "from api.api_handler import app\n"
+        "messages = []\n"
+        "async def receive():\n"
+        "    return {'type': 'http.request', 'body': b'', 'more_body': False}\n"
+        "async def send(message):\n"
+        "    messages.append(message)\n"
+        "scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',\n"
+        "         'scheme': 'http', 'path': '/jobs', 'raw_path': b'/jobs', 'root_path': '',\n"
+        "         'query_string': b'', 'headers': [], 'server': ('localhost', 80), 'client': ('127.0.0.1', 1)}\n"
+        "asyncio.run(app(scope, receive, send))\n"
+        "assert messages[0]['status'] == 200\n"
+    ),
+    "core": (
+        "import core.annotation, core.annotation_store, core.batch_export, core.document_tasks, core.jobs\n"
+        "import core.ocr, core.page_render, core.pdf_utils, core.render_profiles\n"
+    ),
+}
+HEAVY_MODULES = ("PyQt6", "fitz", "PIL.Image", "numpy", "multiprocessing")
+_REPORT = ("import sys\n"
+           f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n")
+
+
+def run_once(code: str, env: dict) -> tuple:
+    """
+    รันโค้ดใน interpreter ใหม่ คืนค่า (เวลาเป็นวินาที, module หนักที่ถูก import)
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code + _REPORT], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - start
+    return elapsed, result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+
+
+def import_profile(code: str, env: dict, top: int) -> list:
+    """
+    คืนค่า (เวลาสะสม ms, ชื่อ module) ของ module ระดับบนสุดที่ import นานที่สุด จาก -X importtime
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark cold start of the GUI window, the API and core imports.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of fresh processes per scenario")
+    parser.add_argument("--top", type=int, default=8, help="number of slowest imports to show")
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS), help="scenarios to run")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    for name in args.scenarios:
+        code = SCENARIOS[name]
+        run_once(code, env)  # อุ่นเครื่อง (ไฟล์ .pyc และ disk cache ของระบบ)
+        timings = []
+        for _ in range(args.repeat):
+            elapsed, heavy = run_once(code, env)
+            timings.append(elapsed)
+        print(f"{name:>6}: median {statistics.median(timings) * 1000:7.1f} ms, "
+              f"min {min(timings) * 1000:7.1f} ms, heavy modules loaded: {heavy or '-'}")
+        for cumulative, module in import_profile(code, env, args.top):
+            print(f"        {cumulative:7.1f} ms  {module}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
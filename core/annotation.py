@@ -1,22 +1,40 @@
 import os
 import json
+import math
+from collections import defaultdict
 
 class Annotation:
-    def __init__(self, x: float, y: float, width: float, height: float, label: str):
+    def __init__(self, x: float, y: float, width: float, height: float, label: str, color: str = None,
+                 page: int = None):
         self.x = x
         self.y = y
         self.width = width
         self.height = height
         self.label = label
+        self.color = color  # สีของ label ที่ใช้แสดงบน canvas (ถ้ามี)
+        self.page = page  # หน้าของเอกสารที่ annotation นี้อยู่ (ถ้ามี)
 
     def to_dict(self):
-        return {
+        data = {
             "x": self.x,
             "y": self.y,
             "width": self.width,
             "height": self.height,
             "label": self.label
         }
+        if self.color is not None:
+            data["color"] = self.color
+        if self.page is not None:
+            data["page"] = self.page
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        สร้าง Annotation จาก dict รูปแบบเดียวกับ to_dict (เช่น ข้อมูลกู้คืนจาก autosave)
+        """
+        return cls(data["x"], data["y"], data["width"], data["height"], data.get("label", ""),
+                   color=data.get("color"), page=data.get("page"))
 
     def __repr__(self):
         return f"Annotation({self.x}, {self.y}, {self.width}, {self.height}, {self.label})"
@@ -27,6 +45,26 @@ def export_annotations(annotations: list) -> str:
     """
     return json.dumps([anno.to_dict() for anno in annotations], indent=4)
 
+def export_layoutlm_format(annotations: list) -> str:
+    """
+    ส่งออก Annotation เป็น JSON string ในรูปแบบ LayoutLMv3 (bbox เป็น [x1, y1, x2, y2])
+    ใช้กับ API ที่ไม่มีข้อมูลหน้าเอกสารแบบเดียวกับ LayoutLMExporter
+    """
+    data = {
+        "annotations": [
+            {
+                "bbox": [anno.x, anno.y, anno.x + anno.width, anno.y + anno.height],
+                "label": anno.label,
+            }
+            for anno in annotations
+        ],
+        "metadata": {
+            "exported_format": "LayoutLMv3",
+            "count": len(annotations),
+        },
+    }
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
 
 class LayoutLMExporter:
     """
@@ -36,15 +74,63 @@ class LayoutLMExporter:
       - file_annotations: dict mapping image_path -> list of annotations (แต่ละ annotation เป็น dict ที่มี key 'coordinates' และ 'label')
       - doc_type_combo: widget (เช่น QComboBox) ที่มี method currentText() เพื่อให้ได้ประเภทเอกสาร
       - original_pixmap: QPixmap ของเอกสารต้นฉบับ (ใช้เพื่อดึง width และ height)
+      - page_source: PdfPageSource/ImagePageSource (ถ้ากำหนด ใช้ขนาดของแต่ละหน้าในพิกัดของ annotation
+        แทน original_pixmap จึงไม่ขึ้นกับความละเอียดหรือ colorspace ของภาพที่แสดงอยู่)
+      - ocr_backend: ชื่อ backend ใน core.ocr.OCR_BACKENDS สำหรับหน้าที่ไม่มี text layer (ถ้าไม่กำหนดจะเว้น words ว่าง)
+    words/confidence ของหน้า PDF ที่มี text layer มาจาก text layer (เหมือน core.batch_export)
     """
-    def __init__(self, current_document, file_annotations, doc_type_combo, original_pixmap):
+    def __init__(self, current_document, file_annotations, doc_type_combo, original_pixmap=None, page_source=None,
+                 ocr_backend: str = None, ocr_cache_dir: str = None, text_layer: bool = True):
         self.current_document = current_document
         self.file_annotations = file_annotations
         self.doc_type_combo = doc_type_combo
         self.original_pixmap = original_pixmap
+        self.page_source = page_source
+        self.ocr_backend = ocr_backend
+        self.ocr_cache_dir = ocr_cache_dir
+        self.text_layer = text_layer
+
+    def page_size(self, page_number: int) -> tuple:
+        """
+        คืนค่า (width, height) ของหน้า page_number (เริ่มที่ 1) หรือ (None, None) ถ้าไม่ทราบ
+        """
+        if self.page_source is not None:
+            return self.page_source.page_size(page_number - 1)
+        if self.original_pixmap:
+            return self.original_pixmap.width(), self.original_pixmap.height()
+        return None, None
+
+    def annotation_zoom(self) -> float:
+        """
+        zoom ของพิกัด annotation ของหน้า PDF: pixel ที่ zoom ของ page_source (ค่าเริ่มต้นเดียวกับ batch export)
+        """
+        from core.annotation_batch import DEFAULT_RENDER_ZOOM
+        return getattr(self.page_source, "zoom", None) or DEFAULT_RENDER_ZOOM
+
+    def page_words(self, documents: dict, original_path: str, page_number: int, bboxes: list):
+        """
+        (text, confidence) ของแต่ละกล่องบนหน้า page_number (เริ่มที่ 1) ของ original_path หรือ None
+        documents เก็บเอกสารที่เปิดแล้วระหว่างการ export หนึ่งครั้ง
+        """
+        if not (self.text_layer or self.ocr_backend) or not original_path or not os.path.exists(original_path):
+            return None
+        from core.batch_export import DocumentPages, get_ocr_stage, page_words
+        pages = documents.get(original_path)
+        if pages is None:
+            pages = documents[original_path] = DocumentPages(original_path, self.annotation_zoom())
+        ocr_stage = get_ocr_stage(self.ocr_backend, self.ocr_cache_dir) if self.ocr_backend else None
+        return page_words(pages, page_number - 1, bboxes, ocr_stage, text_layer=self.text_layer)
 
     def export_layoutlm_format(self, directory) -> None:
         """Export ในรูปแบบที่ใช้กับ LayoutLMv3 โดยสร้างไฟล์ JSON สำหรับแต่ละหน้าที่มี annotations"""
+        documents = {}
+        try:
+            self._export_pages(directory, documents)
+        finally:
+            for pages in documents.values():
+                pages.close()
+
+    def _export_pages(self, directory, documents: dict) -> None:
         if self.current_document:
             for page in self.current_document['pages']:
                 image_path = page['path']
@@ -60,69 +146,385 @@ class LayoutLMExporter:
                     json_name = f"{basename}_layoutlm.json"
                     save_path = os.path.join(directory, json_name)
 
-                    # เตรียมข้อมูลสำหรับ LayoutLM
-                    layoutlm_data = {
-                        'image_path': image_path,
-                        'original_path': page['original_path'],
-                        'page_number': page.get('page', 1),
-                        'document_type': self.doc_type_combo.currentText() if hasattr(self.doc_type_combo, "currentText") else "",
-                        'width': self.original_pixmap.width() if self.original_pixmap else None,
-                        'height': self.original_pixmap.height() if self.original_pixmap else None,
-                        'layout': {
-                            'bbox': [],        # [x1, y1, x2, y2] coordinates
-                            'label': [],       # label ของแต่ละ bbox
-                            'words': [],       # text ในแต่ละ box (สำหรับ OCR)
-                            'segment_ids': [],  # group ID สำหรับ boxes ที่เกี่ยวข้องกัน
-                            'confidence': []   # ค่าความเชื่อมั่น
-                        }
-                    }
-
                     # แปลง annotations เป็น format ของ LayoutLM
+                    boxes = []
                     for ann in annotations:
                         coords = ann['coordinates']  # ควรเป็น dict ที่มี key: 'x1', 'y1', 'x2', 'y2'
-                        bbox = [
-                            coords['x1'],   # x1
-                            coords['y1'],   # y1
-                            coords['x2'],   # x2
-                            coords['y2']    # y2
-                        ]
-                        layoutlm_data['layout']['bbox'].append(bbox)
-                        layoutlm_data['layout']['label'].append(ann['label'])
-                        layoutlm_data['layout']['words'].append("")  # เว้นว่างไว้สำหรับ OCR
-                        layoutlm_data['layout']['segment_ids'].append(0)  # default group
-                        layoutlm_data['layout']['confidence'].append(1.0)  # default confidence
+                        boxes.append(([coords['x1'], coords['y1'], coords['x2'], coords['y2']], ann['label']))
+                    width, height = self.page_size(page.get('page', 1))
+                    layoutlm_data = make_layoutlm_record(
+                        image_path=image_path,
+                        original_path=page['original_path'],
+                        page_number=page.get('page', 1),
+                        document_type=self.doc_type_combo.currentText() if hasattr(self.doc_type_combo, "currentText") else "",
+                        width=width,
+                        height=height,
+                        boxes=boxes,
+                        ocr_results=self.page_words(documents, page['original_path'], page.get('page', 1),
+                                                    [bbox for bbox, _ in boxes]),
+                        points_zoom=self.annotation_zoom() if page['type'] == 'pdf_page' else None,
+                    )
 
                     # บันทึกไฟล์ JSON ลงใน directory ที่กำหนด
                     with open(save_path, 'w', encoding='utf-8') as f:
-                        json.dump(layoutlm_data, f, ensure_ascii=False, indent=2)
+                        json.dump(layoutlm_data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def make_layoutlm_record(image_path, original_path, page_number, document_type, width, height, boxes,
+                         ocr_results=None, points_zoom: float = None) -> dict:
+    """
+    สร้างข้อมูล LayoutLMv3 ของหนึ่งหน้า
+    boxes คือ list ของ (bbox [x1, y1, x2, y2], label) ในพิกัดของ annotation (pixel เดียวกับ width/height)
+    ocr_results คือ list ของ (text, confidence) ตามลำดับ boxes (ถ้าไม่มีจะเว้น words ว่างไว้)
+    points_zoom คือ zoom ของพิกัด annotation ของหน้า PDF ถ้ากำหนดจะเพิ่ม layout['bbox_points']
+    (กล่องเดียวกันในหน่วย point ของ PDF ซึ่งไม่ขึ้นกับ dpi ที่ใช้ render)
+    """
+    layout = {
+        'bbox': [],        # [x1, y1, x2, y2] coordinates
+        'label': [],       # label ของแต่ละ bbox
+        'words': [],       # text ในแต่ละ box (สำหรับ OCR)
+        'segment_ids': [],  # group ID สำหรับ boxes ที่เกี่ยวข้องกัน
+        'confidence': []   # ค่าความเชื่อมั่น
+    }
+    if ocr_results is None:
+        ocr_results = [("", 1.0)] * len(boxes)  # เว้นว่างไว้สำหรับ OCR, default confidence
+    for (bbox, label), (text, confidence) in zip(boxes, ocr_results):
+        layout['bbox'].append(list(bbox))
+        layout['label'].append(label)
+        layout['words'].append(text)
+        layout['segment_ids'].append(0)  # default group
+        layout['confidence'].append(confidence)
+    if points_zoom:
+        from core.render_profiles import to_points
+        layout['bbox_points'] = [to_points(bbox, points_zoom) for bbox in layout['bbox']]
+    return {
+        'image_path': image_path,
+        'original_path': original_path,
+        'page_number': page_number,
+        'document_type': document_type,
+        'width': width,
+        'height': height,
+        'layout': layout,
+    }
+
+class SpatialIndex:
+    """
+    Spatial index แบบ uniform grid สำหรับกล่อง (x, y, width, height)
+    แต่ละกล่องถูกบันทึกในทุก cell ที่มันทับ ทำให้ค้นหากล่องที่ซ้อนทับกันได้โดยไม่ต้องเทียบทุกคู่
+    ใช้ได้ทั้งการตรวจสอบการซ้อนทับ, hit-test ตามจุด และค้นหาตามพื้นที่
+    """
+    DEFAULT_CELL_SIZE = 64.0
+
+    def __init__(self, cell_size: float = None):
+        self.cell_size = float(cell_size) if cell_size else self.DEFAULT_CELL_SIZE
+        self._boxes = {}  # key -> (x0, y0, x1, y1)
+        self._cells = defaultdict(set)  # (cx, cy) -> set ของ key
+
+    @classmethod
+    def from_annotations(cls, annotations: list, cell_size: float = None):
+        """
+        สร้าง index จาก list ของ Annotation โดยใช้ตำแหน่งใน list เป็น key
+        ถ้าไม่กำหนด cell_size จะเลือกจากขนาดกล่องเฉลี่ย
+        """
+        if cell_size is None:
+            cell_size = suggest_cell_size(annotations)
+        index = cls(cell_size)
+        for i, anno in enumerate(annotations):
+            index.insert(i, anno.x, anno.y, anno.width, anno.height)
+        return index
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def __contains__(self, key):
+        return key in self._boxes
+
+    def insert(self, key, x: float, y: float, width: float, height: float) -> None:
+        if key in self._boxes:
+            self.remove(key)
+        box = box_edges(x, y, width, height)
+        self._boxes[key] = box
+        for cell in self._cells_for(box):
+            self._cells[cell].add(key)
+
+    def remove(self, key) -> None:
+        box = self._boxes.pop(key, None)
+        if box is None:
+            return
+        for cell in self._cells_for(box):
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._cells[cell]
+
+    def box(self, key) -> tuple:
+        """
+        คืนค่า (x0, y0, x1, y1) ของ key
+        """
+        return self._boxes[key]
+
+    def query(self, x: float, y: float, width: float, height: float) -> set:
+        """
+        คืนค่า key ของกล่องทั้งหมดที่ทับกับพื้นที่ (x, y, width, height) (รวมกรณีขอบชนกัน)
+        """
+        area = box_edges(x, y, width, height)
+        found = set()
+        for cell in self._cells_for(area):
+            for key in self._cells.get(cell, ()):
+                if key not in found and _boxes_touch(self._boxes[key], area):
+                    found.add(key)
+        return found
+
+    def query_point(self, x: float, y: float) -> set:
+        """
+        คืนค่า key ของกล่องทั้งหมดที่ครอบจุด (x, y) (ใช้สำหรับ hit-test)
+        """
+        return self.query(x, y, 0, 0)
+
+    def neighbours(self, key) -> set:
+        """
+        คืนค่า key ของกล่องอื่นที่ทับกับกล่อง key
+        """
+        x0, y0, x1, y1 = self._boxes[key]
+        found = self.query(x0, y0, x1 - x0, y1 - y0)
+        found.discard(key)
+        return found
+
+    def candidate_pairs(self):
+        """
+        คืนค่าคู่ (key_a, key_b) ของกล่องที่ทับกันทุกคู่ โดยไม่ซ้ำ
+        แต่ละคู่ถูกรายงานจาก cell ที่มุมบนซ้ายของพื้นที่ทับกันเท่านั้น
+        """
+        size = self.cell_size
+        for cell, bucket in self._cells.items():
+            if len(bucket) < 2:
+                continue
+            keys = list(bucket)
+            for i in range(len(keys)):
+                a = self._boxes[keys[i]]
+                for j in range(i + 1, len(keys)):
+                    b = self._boxes[keys[j]]
+                    if not _boxes_touch(a, b):
+                        continue
+                    owner = (math.floor(max(a[0], b[0]) / size), math.floor(max(a[1], b[1]) / size))
+                    if owner == cell:
+                        yield (keys[i], keys[j])
+
+    def _cells_for(self, box: tuple):
+        size = self.cell_size
+        x0, y0, x1, y1 = box
+        for cx in range(math.floor(x0 / size), math.floor(x1 / size) + 1):
+            for cy in range(math.floor(y0 / size), math.floor(y1 / size) + 1):
+                yield (cx, cy)
+
+
+def suggest_cell_size(annotations: list) -> float:
+    """
+    เลือกขนาด cell ของ grid ให้ใกล้เคียงขนาดกล่องโดยเฉลี่ย (อย่างน้อย 1 หน่วย)
+    """
+    if not annotations:
+        return SpatialIndex.DEFAULT_CELL_SIZE
+    total = sum(max(anno.width, anno.height) for anno in annotations)
+    return max(1.0, 2.0 * total / len(annotations))
+
+
+def box_edges(x: float, y: float, width: float, height: float) -> tuple:
+    """
+    คืนค่า (x0, y0, x1, y1) ของกล่อง กล่องที่ width/height ติดลบ (เช่น ลากจากขวาไปซ้าย)
+    ถูกนับเป็นกล่องเดียวกับกล่องที่กลับด้านแล้ว
+    """
+    x1, y1 = x + width, y + height
+    return (min(x, x1), min(y, y1), max(x, x1), max(y, y1))
+
+
+def _boxes_touch(a: tuple, b: tuple) -> bool:
+    return not (a[2] < b[0] or b[2] < a[0] or a[3] < b[1] or b[3] < a[1])
+
 
 def _calculate_overlap(anno1: Annotation, anno2: Annotation) -> float:
     """
     คำนวณเปอร์เซ็นต์การซ้อนทับระหว่าง annotation 2 อัน
     คืนค่าเป็น float ระหว่าง 0.0 ถึง 1.0
     """
-    x_left = max(anno1.x, anno2.x)
-    y_top = max(anno1.y, anno2.y)
-    x_right = min(anno1.x + anno1.width, anno2.x + anno2.width)
-    y_bottom = min(anno1.y + anno1.height, anno2.y + anno2.height)
-    
+    a = box_edges(anno1.x, anno1.y, anno1.width, anno1.height)
+    b = box_edges(anno2.x, anno2.y, anno2.width, anno2.height)
+    x_left = max(a[0], b[0])
+    y_top = max(a[1], b[1])
+    x_right = min(a[2], b[2])
+    y_bottom = min(a[3], b[3])
+
     if x_right < x_left or y_bottom < y_top:
         return 0.0
     overlap_area = (x_right - x_left) * (y_bottom - y_top)
-    area1 = anno1.width * anno1.height
-    area2 = anno2.width * anno2.height
+    area1 = (a[2] - a[0]) * (a[3] - a[1])
+    area2 = (b[2] - b[0]) * (b[3] - b[1])
+    # กล่องที่ไม่มีพื้นที่ถือว่าไม่ซ้อนทับ
+    if min(area1, area2) <= 0:
+        return 0.0
     return overlap_area / min(area1, area2)
 
+def find_overlaps(annotations: list, threshold: float = 0.8, index: SpatialIndex = None) -> list:
+    """
+    ค้นหาคู่ annotation ทั้งหมดที่ซ้อนทับกันเกิน threshold โดยใช้ SpatialIndex
+    คืนค่า list ของ (i, j, overlap) เรียงตาม index
+    """
+    if index is None:
+        index = SpatialIndex.from_annotations(annotations)
+    violations = []
+    for a, b in index.candidate_pairs():
+        i, j = min(a, b), max(a, b)
+        overlap = _calculate_overlap(annotations[i], annotations[j])
+        if overlap > threshold:
+            violations.append((i, j, overlap))
+    violations.sort()
+    return violations
+
+# จำนวน annotation ขั้นต่ำที่จะตรวจสอบด้วย AnnotationBatch แทน SpatialIndex
+BATCH_VALIDATION_THRESHOLD = 500
+
 def validate_annotations(annotations: list) -> (bool, str):
     """
     ตรวจสอบความถูกต้องของ Annotation
     เช่น ตรวจสอบว่ามี annotation ซ้อนทับกันเกิน 80%
+    รายงานทุกคู่ที่ผิดเงื่อนไข (หนึ่งบรรทัดต่อคู่)
     """
     threshold = 0.8  # 80%
-    n = len(annotations)
-    for i in range(n):
-        for j in range(i + 1, n):
-            overlap = _calculate_overlap(annotations[i], annotations[j])
-            if overlap > threshold:
-                return (False, f"Annotations {i} and {j} overlap more than {threshold*100}%.")
+    return format_validation_result(overlap_violations(annotations, threshold), threshold)
+
+def group_by_page(annotations: list) -> dict:
+    """
+    จัดกลุ่มตำแหน่งของ annotation ตาม Annotation.page (None เป็นกลุ่มหนึ่ง) คืนค่า dict ของ page -> list ของ index
+    """
+    groups = {}
+    for i, anno in enumerate(annotations):
+        groups.setdefault(getattr(anno, "page", None), []).append(i)
+    return groups
+
+def overlap_violations(annotations: list, threshold: float = 0.8) -> list:
+    """
+    คืนค่า list ของ (i, j, overlap) ของคู่ที่ซ้อนทับเกิน threshold
+    ตรวจแยกตามหน้า (เหมือน IncrementalValidator) กล่องคนละหน้าจึงไม่ถือว่าซ้อนทับกัน
+    ชุดใหญ่ใช้ engine แบบ vectorized ของ NumPy (ถ้ามี) ชุดเล็กใช้ SpatialIndex
+    """
+    groups = group_by_page(annotations)
+    if len(groups) <= 1:
+        return _page_overlap_violations(annotations, threshold)
+    violations = []
+    for indices in groups.values():
+        found = _page_overlap_violations([annotations[i] for i in indices], threshold)
+        violations.extend((indices[i], indices[j], overlap) for i, j, overlap in found)
+    violations.sort()
+    return violations
+
+def _page_overlap_violations(annotations: list, threshold: float) -> list:
+    # annotation ทั้งหมดอยู่หน้าเดียวกัน
+    if len(annotations) >= BATCH_VALIDATION_THRESHOLD:
+        try:
+            from core.annotation_batch import AnnotationBatch
+            return AnnotationBatch.from_annotations(annotations).find_overlaps(threshold)
+        except ImportError:
+            pass
+    return find_overlaps(annotations, threshold)
+
+def format_validation_result(violations: list, threshold: float = 0.8) -> (bool, str):
+    """
+    แปลง list ของ (i, j, overlap) เป็นผลลัพธ์ (valid, message) ของการตรวจสอบ
+    """
+    if violations:
+        lines = [f"Annotations {i} and {j} overlap more than {threshold*100}%." for i, j, *_ in violations]
+        return (False, "\n".join(lines))
     return (True, "Annotations are valid.")
+
+
+class IncrementalValidator:
+    """
+    ตรวจสอบการซ้อนทับแบบ incremental: เก็บสถานะไว้ระหว่างการแก้ไข
+    เมื่อเพิ่มหรือลบกล่อง จะตรวจเฉพาะกล่องข้างเคียงที่ได้จาก SpatialIndex เท่านั้น
+    key ของแต่ละกล่องคือ Annotation object เอง
+    กล่องที่อยู่คนละหน้า (Annotation.page ต่างกัน) ไม่ถือว่าซ้อนทับกัน แม้พิกัดจะทับกัน
+    """
+    def __init__(self, threshold: float = 0.8, cell_size: float = None):
+        self.threshold = threshold
+        self.index = SpatialIndex(cell_size)
+        self._violations = {}  # annotation -> {annotation อื่น: overlap}
+
+    def __len__(self):
+        return len(self.index)
+
+    def add(self, anno) -> set:
+        """
+        เพิ่มกล่องแล้วตรวจกับกล่องข้างเคียง คืนค่าชุดของ annotation ที่สถานะการซ้อนทับเปลี่ยนไป
+        """
+        if anno in self.index:
+            self.remove(anno)
+        self.index.insert(anno, anno.x, anno.y, anno.width, anno.height)
+        changed = set()
+        page = getattr(anno, "page", None)
+        for other in self.index.neighbours(anno):
+            if getattr(other, "page", None) != page:
+                continue
+            overlap = _calculate_overlap(anno, other)
+            if overlap > self.threshold:
+                if not self._violations.get(other):
+                    changed.add(other)
+                self._violations.setdefault(anno, {})[other] = overlap
+                self._violations.setdefault(other, {})[anno] = overlap
+        if self._violations.get(anno):
+            changed.add(anno)
+        return changed
+
+    def remove(self, anno) -> set:
+        """
+        ลบกล่องออก คืนค่าชุดของ annotation ที่สถานะการซ้อนทับเปลี่ยนไป (รวมกล่องที่ถูกลบถ้าเคยผิดเงื่อนไข)
+        """
+        if anno not in self.index:
+            return set()
+        self.index.remove(anno)
+        changed = set()
+        partners = self._violations.pop(anno, {})
+        if partners:
+            changed.add(anno)
+        for other in partners:
+            remaining = self._violations.get(other)
+            if remaining is not None:
+                remaining.pop(anno, None)
+                if not remaining:
+                    del self._violations[other]
+                    changed.add(other)
+        return changed
+
+    def update(self, anno) -> set:
+        """
+        ตรวจใหม่หลังจากกล่องถูกย้ายหรือเปลี่ยนขนาด
+        """
+        return self.remove(anno) | self.add(anno)
+
+    def clear(self) -> None:
+        self.index = SpatialIndex(self.index.cell_size)
+        self._violations.clear()
+
+    def is_violating(self, anno) -> bool:
+        return bool(self._violations.get(anno))
+
+    def violating_annotations(self) -> list:
+        return [anno for anno, partners in self._violations.items() if partners]
+
+    def violation_count(self) -> int:
+        """
+        จำนวนคู่ที่ซ้อนทับกันเกิน threshold
+        """
+        return sum(len(partners) for partners in self._violations.values()) // 2
+
+    def result(self, annotations: list) -> (bool, str):
+        """
+        คืนค่าผลตรวจสอบในรูปแบบเดียวกับ validate_annotations โดยอ้างอิงตำแหน่งใน annotations
+        """
+        positions = {id(anno): i for i, anno in enumerate(annotations)}
+        pairs = set()
+        for anno, partners in self._violations.items():
+            for other in partners:
+                i, j = positions.get(id(anno)), positions.get(id(other))
+                if i is not None and j is not None:
+                    pairs.add((min(i, j), max(i, j)))
+        return format_validation_result(sorted(pairs), self.threshold)
@@ -0,0 +1,228 @@
+# project/core/annotation_batch.py
+
+import numpy as np
+from core.annotation import Annotation
+
+# zoom ที่ใช้ render หน้า PDF สำหรับ canvas (pixel = point * zoom)
+DEFAULT_RENDER_ZOOM = 3.0
+
+# โครงสร้างข้อมูลของกล่องแต่ละกล่องใน batch
+BOX_DTYPE = np.dtype([
+    ("x", np.float64),
+    ("y", np.float64),
+    ("width", np.float64),
+    ("height", np.float64),
+    ("label_id", np.int32),
+])
+
+
+class AnnotationBatch:
+    """
+    ชุดของ annotation แบบ columnar (structured NumPy array ของ x/y/width/height และ label_id)
+    ใช้คำนวณ geometry ของทั้งหน้าพร้อมกันแบบ vectorized
+    labels คือ list ของชื่อ label โดย label_id คือตำแหน่งใน list นี้
+    """
+    def __init__(self, boxes: np.ndarray, labels: list):
+        self.boxes = boxes
+        self.labels = list(labels)
+
+    @classmethod
+    def from_annotations(cls, annotations: list, labels: list = None):
+        """
+        สร้าง batch จาก list ของ Annotation (หรือ dict ที่มี key x, y, width, height, label)
+        """
+        labels = list(labels) if labels is not None else []
+        label_ids = {name: i for i, name in enumerate(labels)}
+        boxes = np.empty(len(annotations), dtype=BOX_DTYPE)
+        for i, anno in enumerate(annotations):
+            if isinstance(anno, dict):
+                x, y, w, h, label = anno["x"], anno["y"], anno["width"], anno["height"], anno["label"]
+            else:
+                x, y, w, h, label = anno.x, anno.y, anno.width, anno.height, anno.label
+            label_id = label_ids.get(label)
+            if label_id is None:
+                label_id = label_ids[label] = len(labels)
+                labels.append(label)
+            boxes[i] = (x, y, w, h, label_id)
+        return cls(boxes, labels)
+
+    @classmethod
+    def from_arrays(cls, x, y, width, height, label_ids=None, labels=None):
+        boxes = np.empty(len(x), dtype=BOX_DTYPE)
+        boxes["x"] = x
+        boxes["y"] = y
+        boxes["width"] = width
+        boxes["height"] = height
+        boxes["label_id"] = 0 if label_ids is None else label_ids
+        return cls(boxes, labels if labels is not None else [""])
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __getitem__(self, selector):
+        """
+        เลือกกล่องด้วย index, slice หรือ boolean mask แล้วคืนค่าเป็น batch ใหม่
+        """
+        return AnnotationBatch(np.atleast_1d(self.boxes[selector]), self.labels)
+
+    def to_annotations(self) -> list:
+        return [Annotation(float(b["x"]), float(b["y"]), float(b["width"]), float(b["height"]),
+                           self.labels[b["label_id"]])
+                for b in self.boxes]
+
+    def to_dicts(self) -> list:
+        labels = self.labels
+        return [{"x": x, "y": y, "width": w, "height": h, "label": labels[label_id]}
+                for x, y, w, h, label_id in self.boxes.tolist()]
+
+    def xyxy(self) -> np.ndarray:
+        """
+        คืนค่า array ขนาด (n, 4) ของ [x1, y1, x2, y2] (x1 <= x2 และ y1 <= y2 แม้ width/height ติดลบ
+        เหมือน core.annotation.box_edges)
+        """
+        b = self.boxes
+        x2 = b["x"] + b["width"]
+        y2 = b["y"] + b["height"]
+        return np.stack([np.minimum(b["x"], x2), np.minimum(b["y"], y2),
+                         np.maximum(b["x"], x2), np.maximum(b["y"], y2)], axis=1)
+
+    def areas(self) -> np.ndarray:
+        return np.abs(self.boxes["width"] * self.boxes["height"])
+
+    def filter_area(self, min_area: float = 0.0, max_area: float = np.inf):
+        """
+        คืนค่า batch ของกล่องที่มีพื้นที่อยู่ในช่วง [min_area, max_area]
+        """
+        areas = self.areas()
+        return self[(areas >= min_area) & (areas <= max_area)]
+
+    def clip(self, page_width: float, page_height: float):
+        """
+        ตัดกล่องให้อยู่ภายในขอบหน้า (0, 0, page_width, page_height)
+        """
+        xyxy = self.xyxy()
+        np.clip(xyxy[:, 0::2], 0, page_width, out=xyxy[:, 0::2])
+        np.clip(xyxy[:, 1::2], 0, page_height, out=xyxy[:, 1::2])
+        boxes = self.boxes.copy()
+        boxes["x"] = xyxy[:, 0]
+        boxes["y"] = xyxy[:, 1]
+        boxes["width"] = xyxy[:, 2] - xyxy[:, 0]
+        boxes["height"] = xyxy[:, 3] - xyxy[:, 1]
+        return AnnotationBatch(boxes, self.labels)
+
+    def scale(self, factor: float):
+        boxes = self.boxes.copy()
+        for field in ("x", "y", "width", "height"):
+            boxes[field] *= factor
+        return AnnotationBatch(boxes, self.labels)
+
+    def to_pdf_points(self, zoom: float = DEFAULT_RENDER_ZOOM):
+        """
+        แปลงพิกัดจาก pixel ของภาพที่ render ที่ zoom เป็นหน่วย point ของ PDF
+        """
+        return self.scale(1.0 / zoom)
+
+    def from_pdf_points(self, zoom: float = DEFAULT_RENDER_ZOOM):
+        """
+        แปลงพิกัดจากหน่วย point ของ PDF เป็น pixel ของภาพที่ render ที่ zoom
+        """
+        return self.scale(zoom)
+
+    def intersection_matrix(self, other=None) -> np.ndarray:
+        other = self if other is None else other
+        a = self.xyxy()[:, None, :]
+        b = other.xyxy()[None, :, :]
+        width = np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0])
+        height = np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1])
+        return np.clip(width, 0, None) * np.clip(height, 0, None)
+
+    def overlap_matrix(self, other=None) -> np.ndarray:
+        """
+        สัดส่วนการซ้อนทับ (พื้นที่ทับกัน / พื้นที่ของกล่องที่เล็กกว่า) ของทุกคู่
+        ความหมายเดียวกับ core.annotation._calculate_overlap
+        """
+        other = self if other is None else other
+        inter = self.intersection_matrix(other)
+        smaller = np.minimum(self.areas()[:, None], other.areas()[None, :])
+        return np.divide(inter, smaller, out=np.zeros_like(inter), where=smaller > 0)
+
+    def iou_matrix(self, other=None) -> np.ndarray:
+        other = self if other is None else other
+        inter = self.intersection_matrix(other)
+        union = self.areas()[:, None] + other.areas()[None, :] - inter
+        return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+    def find_overlaps(self, threshold: float = 0.8, max_pairs: int = 4_000_000) -> list:
+        """
+        ค้นหาคู่ (i, j, overlap) ทั้งหมดที่ซ้อนทับกันเกิน threshold
+        แบ่งหน้าเป็นแถบตามแกน y แล้วในแต่ละแถบเรียงกล่องตาม x (sweep-line)
+        คู่ที่อาจทับกันคือกล่องที่เริ่มก่อนขอบขวาของกล่องก่อนหน้าในแถบเดียวกัน
+        ทุกขั้นตอนเป็น vectorized และประมวลผลครั้งละไม่เกิน max_pairs คู่
+        กล่องที่มีพิกัดไม่เป็นตัวเลขจำกัด (NaN/inf) ไม่ถูกนับว่าทับกล่องใด
+        """
+        n = len(self)
+        if n < 2:
+            return []
+        xyxy = self.xyxy()
+        areas = self.areas()
+        invalid = ~np.isfinite(xyxy).all(axis=1)
+        if invalid.any():
+            xyxy[invalid] = 0.0
+            areas[invalid] = 0.0
+        # แถบสูงราว 4 เท่าของกล่องทั่วไป แต่ไม่บางกว่าที่จำเป็นต่อการแบ่งความสูงรวมเป็น n แถบ
+        # (กันกรณี median เป็น 0) และขยายจนจำนวนช่อง (กล่อง, แถบ) รวมไม่เกิน max_spans
+        extent = float(xyxy[:, 3].max() - xyxy[:, 1].min())
+        band_height = max(4.0 * float(np.median(xyxy[:, 3] - xyxy[:, 1])), extent / n, 1.0)
+        max_spans = max(4 * n, 1024)
+        while True:
+            first_band = np.floor(xyxy[:, 1] / band_height).astype(np.int64)
+            last_band = np.floor(xyxy[:, 3] / band_height).astype(np.int64)
+            # กล่องที่คร่อมหลายแถบจะอยู่ในทุกแถบที่มันทับ
+            spans = last_band - first_band + 1
+            if int(spans.sum()) <= max_spans:
+                break
+            band_height *= 2.0
+        ids = np.repeat(np.arange(n), spans)
+        offsets = np.arange(len(ids)) - np.repeat(np.cumsum(spans) - spans, spans)
+        bands = first_band[ids] + offsets
+        order = np.lexsort((xyxy[ids, 0], bands))
+        ids = ids[order]
+        bands = bands[order]
+
+        # key ที่เรียงตาม (แถบ, x0) เพื่อหาช่วงของกล่องที่อาจทับกันด้วย searchsorted ครั้งเดียว
+        x_min = xyxy[:, 0].min()
+        span = float(xyxy[:, 2].max() - x_min) + 1.0
+        starts = bands * span + (xyxy[ids, 0] - x_min)
+        ends = bands * span + (xyxy[ids, 2] - x_min)
+        hi = np.searchsorted(starts, ends, side="right")
+        counts = np.maximum(hi - np.arange(len(ids)) - 1, 0)
+
+        results = []
+        chunk_start = 0
+        cumulative = np.cumsum(counts)
+        while chunk_start < len(ids):
+            base = cumulative[chunk_start - 1] if chunk_start else 0
+            chunk_stop = int(np.searchsorted(cumulative, base + max_pairs, side="right"))
+            chunk_stop = max(chunk_stop, chunk_start + 1)
+            c = counts[chunk_start:chunk_stop]
+            left = np.repeat(np.arange(chunk_start, chunk_stop), c)
+            right = left + 1 + (np.arange(len(left)) - np.repeat(np.cumsum(c) - c, c))
+            a = ids[left]
+            b = ids[right]
+            box_a = xyxy[a]
+            box_b = xyxy[b]
+            width = np.minimum(box_a[:, 2], box_b[:, 2]) - np.maximum(box_a[:, 0], box_b[:, 0])
+            height = np.minimum(box_a[:, 3], box_b[:, 3]) - np.maximum(box_a[:, 1], box_b[:, 1])
+            inter = np.clip(width, 0, None) * np.clip(height, 0, None)
+            smaller = np.minimum(areas[a], areas[b])
+            overlap = np.divide(inter, smaller, out=np.zeros_like(inter), where=smaller > 0)
+            # รายงานแต่ละคู่จากแถบที่มีขอบบนของพื้นที่ทับกันเท่านั้น
+            top = np.maximum(box_a[:, 1], box_b[:, 1])
+            owner = np.floor(top / band_height).astype(np.int64) == bands[left]
+            hit = (overlap > threshold) & owner
+            lo_ids = np.minimum(a[hit], b[hit])
+            hi_ids = np.maximum(a[hit], b[hit])
+            results.extend(zip(lo_ids.tolist(), hi_ids.tolist(), overlap[hit].tolist()))
+            chunk_start = chunk_stop
+        results.sort()
+        return results
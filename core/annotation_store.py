@@ -0,0 +1,261 @@
+# project/core/annotation_store.py
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from core.annotation import Annotation
+
+# ตำแหน่งเริ่มต้นของฐานข้อมูล annotation ของ API (กำหนดได้ด้วย OCR_AI_DB_PATH)
+DEFAULT_DB_PATH = os.environ.get(
+    "OCR_AI_DB_PATH", os.path.join(os.path.expanduser("~"), ".ocr_ai", "annotations.db")
+)
+# จำนวน connection สูงสุดใน pool ต่อ process
+DEFAULT_POOL_SIZE = 8
+# เวลารอ lock ของ writer อื่น (เช่น uvicorn worker อีกตัว) ก่อนแจ้ง error (ms)
+BUSY_TIMEOUT_MS = 5000
+# จำนวนแถวที่อ่านต่อครั้ง (ยืม connection จาก pool ครั้งละหนึ่งชุด)
+FETCH_SIZE = 1000
+# เวลารอ connection ว่างจาก pool ก่อน raise PoolTimeoutError (วินาที)
+POOL_TIMEOUT = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS annotations (
+    id INTEGER PRIMARY KEY,
+    document TEXT NOT NULL DEFAULT '',
+    page INTEGER,
+    label TEXT NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    width REAL NOT NULL,
+    height REAL NOT NULL,
+    color TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_annotations_document_page ON annotations (document, page);
+CREATE INDEX IF NOT EXISTS idx_annotations_label ON annotations (label, document, page);
+"""
+
+COLUMNS = ("id", "document", "page", "label", "x", "y", "width", "height", "color")
+INSERT_SQL = ("INSERT INTO annotations (document, page, label, x, y, width, height, color) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+class PoolTimeoutError(TimeoutError):
+    """
+    ไม่มี connection ว่างใน pool ภายในเวลาที่กำหนด (ผู้เรียกควรลองใหม่ภายหลัง)
+    """
+
+
+class ConnectionPool:
+    """
+    pool ของ sqlite3 connection สำหรับใช้จากหลาย thread (เช่น thread pool ของ FastAPI)
+    สร้าง connection เมื่อจำเป็นและเก็บไว้ใช้ซ้ำไม่เกิน size connection
+    """
+    def __init__(self, path: str, size: int = DEFAULT_POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                               isolation_level=None)
+        # WAL: reader ไม่ block writer และหลาย process อ่านไฟล์เดียวกันได้พร้อมกัน
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        ยืม connection จาก pool และคืนเมื่อจบ block ถ้า connection ถูกใช้ครบ size แล้ว
+        จะรอไม่เกิน timeout วินาที แล้ว raise PoolTimeoutError
+        """
+        if self._closed:
+            raise ValueError("Connection pool is closed")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                conn = self._connect()
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise PoolTimeoutError(f"No database connection available within {self.timeout:g}s") from None
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class AnnotationStore:
+    """
+    ที่เก็บ annotation ของ API บน SQLite (WAL) มี index ตาม (document, page) และ label
+    ข้อมูลอยู่ในไฟล์ จึงคงอยู่หลัง restart และ uvicorn หลาย worker ใช้ไฟล์เดียวกันได้
+    ผลการอ่านเป็น generator ที่ดึงแถวทีละ FETCH_SIZE แถว ไม่โหลดทั้งตารางเข้า memory
+    """
+    def __init__(self, path: str = None, pool_size: int = DEFAULT_POOL_SIZE):
+        self.path = path or DEFAULT_DB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.pool = ConnectionPool(self.path, pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def add(self, annotation, document: str = "") -> int:
+        """
+        เพิ่ม annotation (Annotation หรือ dict แบบ to_dict) คืนค่า id ที่ได้
+        """
+        row = _row_values(annotation, document)
+        with self.pool.connection() as conn:
+            return conn.execute(INSERT_SQL, row).lastrowid
+
+    def add_many(self, annotations, document: str = "", page: int = None) -> tuple:
+        """
+        เพิ่ม annotation หลายรายการใน transaction เดียว (ทั้งหมดหรือไม่มีเลย)
+        document/page เป็นค่าเริ่มต้นของรายการที่ไม่ได้กำหนดเอง
+        คืนค่า (id แรก, id สุดท้าย) ของรายการที่เพิ่ม (ต่อเนื่องกัน) หรือ (None, None) ถ้าไม่มีรายการ
+        """
+        rows = [_row_values(annotation, document, page) for annotation in annotations]
+        if not rows:
+            return None, None
+        with self.pool.connection() as conn:
+            # IMMEDIATE: จอง lock ของ writer ตั้งแต่ต้น id ที่ได้จึงต่อเนื่องกันแม้มีหลาย worker
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(INSERT_SQL, rows)
+                last_id = conn.execute("SELECT MAX(id) FROM annotations").fetchone()[0]
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return last_id - len(rows) + 1, last_id
+
+    def get(self, annotation_id: int):
+        with self.pool.connection() as conn:
+            row = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM annotations WHERE id = ?",
+                               (annotation_id,)).fetchone()
+        return _row_dict(row) if row is not None else None
+
+    def count(self, document: str = None, page: int = None, label: str = None, region=None) -> int:
+        where, params = _where(document, page, label, region)
+        with self.pool.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM annotations{where}", params).fetchone()[0]
+
+    def iter_rows(self, document: str = None, page: int = None, label: str = None, region=None,
+                  after_id: int = None, limit: int = None):
+        """
+        อ่าน annotation ตามเงื่อนไข (เรียงตาม id) คืนค่าเป็น dict ทีละแถว
+        region คือกรอบ (x1, y1, x2, y2) ที่ annotation ต้องซ้อนทับ
+        after_id/limit ใช้แบ่งหน้าแบบ cursor: อ่านต่อจาก id สุดท้ายของหน้าก่อนโดยไม่ต้องนับข้ามแถว
+        อ่านทีละ FETCH_SIZE แถวตาม id และคืน connection ให้ pool ระหว่างชุด
+        ผู้อ่านที่ช้า (เช่น streaming response) จึงไม่ถือ connection ค้างไว้ตลอดการอ่าน
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = FETCH_SIZE if remaining is None else min(FETCH_SIZE, remaining)
+            where, params = _where(document, page, label, region, after_id)
+            with self.pool.connection() as conn:
+                rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM annotations{where} ORDER BY id LIMIT ?",
+                                    params + [size]).fetchall()
+            for row in rows:
+                yield _row_dict(row)
+            if len(rows) < size:
+                break
+            after_id = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def iter_annotations(self, document: str = None, page: int = None, label: str = None):
+        """
+        เหมือน iter_rows แต่คืนค่าเป็น Annotation (สำหรับฟังก์ชัน export/validate ของ core.annotation)
+        """
+        for row in self.iter_rows(document, page, label):
+            yield Annotation(row["x"], row["y"], row["width"], row["height"], row["label"],
+                             row.get("color"), row.get("page"))
+
+    def clear(self) -> None:
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM annotations")
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+def _row_values(annotation, document: str, page: int = None) -> tuple:
+    if isinstance(annotation, dict):
+        get = annotation.get
+    else:
+        get = lambda key: getattr(annotation, key, None)
+    row_page = get("page")
+    return (get("document") or document or "", page if row_page is None else row_page, get("label"),
+            get("x"), get("y"), get("width"), get("height"), get("color"))
+
+
+def _row_dict(row) -> dict:
+    data = dict(zip(COLUMNS, row))
+    # ตัดค่าที่ไม่ได้กำหนด ให้รูปแบบเดียวกับ Annotation.to_dict
+    for key in ("page", "color"):
+        if data[key] is None:
+            del data[key]
+    return data
+
+
+def _where(document: str = None, page: int = None, label: str = None, region=None,
+           after_id: int = None) -> tuple:
+    clauses = []
+    params = []
+    if after_id is not None:
+        clauses.append("id > ?")
+        params.append(after_id)
+    if document is not None:
+        clauses.append("document = ?")
+        params.append(document)
+    if page is not None:
+        clauses.append("page = ?")
+        params.append(page)
+    if label is not None:
+        clauses.append("label = ?")
+        params.append(label)
+    if region is not None:
+        x1, y1, x2, y2 = region
+        clauses.append("x < ? AND x + width > ? AND y < ? AND y + height > ?")
+        params.extend((x2, x1, y2, y1))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_store() -> AnnotationStore:
+    """
+    คืนค่า AnnotationStore ที่ใช้ร่วมกันภายใน process (ตำแหน่งกำหนดได้ด้วย OCR_AI_DB_PATH)
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = AnnotationStore()
+        return _default_store
@@ -3,51 +3,386 @@
 import os
 import json
 import time
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.disk_cache import file_content_hash
+
+# ตำแหน่งเริ่มต้นของ autosave แยกตามเอกสาร (กำหนดได้ด้วย OCR_AI_AUTOSAVE_DIR)
+DEFAULT_AUTOSAVE_DIR = os.environ.get(
+    "OCR_AI_AUTOSAVE_DIR", os.path.join(os.path.expanduser("~"), ".ocr_ai", "autosave")
+)
+# ชื่อไฟล์ snapshot ภายในโฟลเดอร์ของแต่ละเอกสาร
+SNAPSHOT_NAME = "autosave.json"
+
+# compact journal เป็น snapshot ใหม่เมื่อจำนวน record ใน journal เกินค่านี้
+# หรือเกินสัดส่วน COMPACT_RATIO ของจำนวน annotation ใน snapshot
+COMPACT_MIN_RECORDS = 256
+COMPACT_RATIO = 0.5
+
+
+def _write_atomic(path: str, text: str) -> None:
+    # เขียนลงไฟล์ชั่วคราวในโฟลเดอร์เดียวกันแล้ว rename เพื่อไม่ให้เหลือไฟล์ที่เขียนไม่ครบ
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 
 class AutoSaveManager:
-    def __init__(self, autosave_path="autosave.json"):
+    """
+    บันทึกงานอัตโนมัติแบบ journal:
+      - snapshot (autosave_path) เก็บสถานะทั้งหมด เขียนแบบ atomic (ไฟล์ชั่วคราว + rename)
+      - journal (autosave_path + ".journal") เก็บการแก้ไข add/remove/modify ทีละบรรทัดแบบต่อท้าย
+    การบันทึกแต่ละครั้งเขียนเฉพาะการแก้ไขตั้งแต่ครั้งก่อน และจะ compact เป็น snapshot ใหม่เมื่อ journal ยาวเกินไป
+    การแก้ไขแจ้งผ่าน record_add / record_remove / record_modify
+    """
+    def __init__(self, autosave_path="autosave.json",
+                 compact_min_records=COMPACT_MIN_RECORDS, compact_ratio=COMPACT_RATIO):
         self.autosave_path = autosave_path
-    
+        self.journal_path = autosave_path + ".journal"
+        self.compact_min_records = compact_min_records
+        self.compact_ratio = compact_ratio
+        self._ids = {}          # Annotation -> id ที่ใช้ใน journal
+        self._next_id = 0
+        self._pending = []      # record ที่ยังไม่ได้เขียนลง journal
+        self._document = None   # เอกสารของ snapshot ปัจจุบัน
+        self._generation = 0    # เปลี่ยนทุกครั้งที่เขียน snapshot ใหม่
+        self._snapshot_count = 0
+        self._journal_records = 0
+        self._has_snapshot = False
+        # revision เพิ่มขึ้นทุกครั้งที่มีการแก้ไข ใช้ตรวจว่ามีอะไรต้องบันทึกหรือไม่
+        self.revision = 0
+        # เริ่มต้นถือว่าไม่มีอะไรต้องบันทึก เพื่อไม่ให้เขียนทับข้อมูลกู้คืนเดิมด้วยสถานะว่าง
+        self._saved_revision = 0
+        # งานเขียนไฟล์ทำบน thread เดียวตามลำดับ (สร้างเมื่อใช้งานครั้งแรก)
+        self._executor = None
+        # ป้องกัน executor, สถิติ และสถานะ snapshot ที่ทั้ง _prepare และ _write (thread เบื้องหลัง) แก้ไข
+        self._lock = threading.Lock()
+        self._stats = {"saves": 0, "bytes_written": 0, "last_bytes": 0,
+                       "last_latency_ms": 0.0, "total_latency_ms": 0.0, "errors": 0}
+
+    def record_add(self, annotation) -> None:
+        anno_id = self._next_id
+        self._next_id += 1
+        self._ids[annotation] = anno_id
+        self._pending.append({"op": "add", "id": anno_id, "annotation": annotation.to_dict()})
+        self.revision += 1
+
+    def record_remove(self, annotation) -> None:
+        anno_id = self._ids.pop(annotation, None)
+        if anno_id is not None:
+            self._pending.append({"op": "remove", "id": anno_id})
+        self.revision += 1
+
+    def record_modify(self, annotation) -> None:
+        anno_id = self._ids.get(annotation)
+        if anno_id is None:
+            self.record_add(annotation)
+        else:
+            self._pending.append({"op": "modify", "id": anno_id, "annotation": annotation.to_dict()})
+            self.revision += 1
+
+    def mark_dirty(self) -> None:
+        """
+        แจ้งว่ามีการเปลี่ยนแปลงที่ไม่ได้ผ่าน record_* (เช่น ล้าง annotation ทั้งหมด หรือเปิดเอกสารใหม่)
+        """
+        self.revision += 1
+
+    def is_dirty(self) -> bool:
+        return self._saved_revision != self.revision
+
     def auto_save(self, document_handler, annotations: list):
         """
-        บันทึกสถานะปัจจุบันของเอกสารและ Annotation ลงไฟล์ autosave
+        บันทึกสถานะปัจจุบันของเอกสารและ Annotation
+        ถ้ามี snapshot ของเอกสารเดียวกันอยู่แล้ว จะต่อท้ายเฉพาะการแก้ไขลง journal
+        """
+        job = self._prepare(document_handler, annotations)
+        if job is not None:
+            self._write(job)
+
+    def auto_save_async(self, document_handler, annotations: list):
+        """
+        เหมือน auto_save แต่เขียนไฟล์บน thread เบื้องหลัง ต้องเรียกจาก thread ที่แก้ไข annotations
+        ข้อมูลที่ต้องเขียนถูกคัดลอกเป็น dict ก่อนส่งต่อ จึงแก้ไข annotation ต่อได้ทันที
+        คืนค่า Future หรือ None ถ้าไม่มีอะไรต้องบันทึก
+        """
+        job = self._prepare(document_handler, annotations)
+        if job is None:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            return self._executor.submit(self._write, job)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        รอให้งานเขียนที่ค้างอยู่เสร็จ แล้วหยุด thread เบื้องหลัง
         """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        """
+        สถิติการบันทึก: จำนวนครั้ง, bytes ที่เขียน และเวลาที่ใช้ (ms)
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def check_for_autosave(self):
+        """
+        ตรวจสอบว่ามีไฟล์ autosave อยู่หรือไม่แล้วคืนข้อมูลออกมา
+        สถานะที่คืนคือ snapshot ที่ replay การแก้ไขใน journal แล้ว
+        """
+        if not os.path.exists(self.autosave_path):
+            return None
+        try:
+            with open(self.autosave_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except Exception as e:
+            print(f"Error reading autosave file: {e}")
+            return None
+        generation = snapshot.get("generation", 0)
+        ids = snapshot.get("ids") or list(range(len(snapshot.get("annotations", []))))
+        state = dict(zip(ids, snapshot.get("annotations", [])))
+        timestamp = snapshot.get("timestamp")
+        for record in self._read_journal():
+            # record ของ snapshot รุ่นก่อน (ค้างจากการ compact ที่ไม่เสร็จ) ถูกรวมไว้ใน snapshot แล้ว
+            if record.get("generation") != generation:
+                continue
+            if record["op"] == "remove":
+                state.pop(record["id"], None)
+            else:
+                state[record["id"]] = record["annotation"]
+            timestamp = record.get("timestamp", timestamp)
+        return {
+            "timestamp": timestamp,
+            "document": snapshot.get("document"),
+            "annotations": list(state.values()),
+        }
+
+    def cleanup_old_autosaves(self, max_age_seconds=3600):
+        """
+        ลบไฟล์ autosave (snapshot และ journal) หากมีอายุเกิน max_age_seconds
+        """
+        paths = [p for p in (self.autosave_path, self.journal_path) if os.path.exists(p)]
+        if self.autosave_path not in paths:
+            return
+        try:
+            # journal ว่างถูกสร้างพร้อม snapshot จึงไม่นับเป็นการแก้ไขล่าสุด
+            file_time = max(os.path.getmtime(p) for p in paths
+                            if p == self.autosave_path or os.path.getsize(p) > 0)
+            if time.time() - file_time > max_age_seconds:
+                for p in paths:
+                    os.remove(p)
+                with self._lock:
+                    self._has_snapshot = False
+                print("Old autosave file removed.")
+        except Exception as e:
+            print(f"Error cleaning up autosave file: {e}")
+
+    def _needs_snapshot(self, document, annotations: list) -> bool:
+        if not self._has_snapshot or document != self._document:
+            return True
+        # annotation ที่ไม่ได้แจ้งผ่าน record_* (เช่น ล้าง list ทั้งหมด) ทำให้จำนวนไม่ตรงกัน
+        if len(self._ids) != len(annotations):
+            return True
+        journal_size = self._journal_records + len(self._pending)
+        return journal_size > max(self.compact_min_records, self.compact_ratio * self._snapshot_count)
+
+    def _prepare(self, document_handler, annotations: list):
+        # ทำงานบน thread ที่แก้ไข annotations: ตัดสินใจว่าจะเขียนอะไร และคัดลอกข้อมูลที่ต้องเขียน
+        # ถือ lock เดียวกับ _write ที่อาจกำลัง reset สถานะ snapshot จาก thread เบื้องหลัง
+        document = document_handler.filepath if hasattr(document_handler, 'filepath') else None
+        with self._lock:
+            if self._needs_snapshot(document, annotations):
+                job = self._prepare_snapshot(document, annotations)
+            elif self._pending:
+                job = self._prepare_journal()
+            else:
+                job = None
+            self._saved_revision = self.revision
+        return job
+
+    def _prepare_snapshot(self, document, annotations: list) -> dict:
+        # กำหนด id ใหม่ให้ทุก annotation ตามลำดับใน list
+        self._ids = {anno: i for i, anno in enumerate(annotations)}
+        self._next_id = len(annotations)
+        # ไม่ซ้ำกับ snapshot ของ process ก่อนหน้า ซึ่ง journal ของมันอาจยังค้างอยู่
+        self._generation = max(self._generation + 1, time.time_ns())
         data = {
             "timestamp": time.time(),
-            "document": document_handler.filepath if hasattr(document_handler, 'filepath') else None,
-            "annotations": [anno.to_dict() for anno in annotations]
+            "document": document,
+            "generation": self._generation,
+            "ids": list(range(len(annotations))),
+            "annotations": [anno.to_dict() for anno in annotations],
         }
+        self._pending = []
+        self._document = document
+        self._snapshot_count = len(annotations)
+        self._journal_records = 0
+        self._has_snapshot = True
+        return {"kind": "snapshot", "data": data}
+
+    def _prepare_journal(self) -> dict:
+        timestamp = time.time()
+        records = self._pending
+        for record in records:
+            record["generation"] = self._generation
+            record["timestamp"] = timestamp
+        self._journal_records += len(records)
+        self._pending = []
+        return {"kind": "journal", "records": records}
+
+    def _write(self, job: dict) -> None:
+        # ทำงานบน thread เบื้องหลังได้: ใช้เฉพาะข้อมูลใน job
+        started = time.perf_counter()
         try:
-            with open(self.autosave_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4)
-            print(f"Auto-saved to {self.autosave_path}")
+            if job["kind"] == "snapshot":
+                text = json.dumps(job["data"], separators=(",", ":"))
+                _write_atomic(self.autosave_path, text)
+                # journal เดิมถูกรวมไว้ใน snapshot แล้ว
+                _write_atomic(self.journal_path, "")
+                print(f"Auto-saved snapshot to {self.autosave_path}")
+            else:
+                text = "".join(json.dumps(record, separators=(",", ":")) + "\n"
+                               for record in job["records"])
+                with open(self.journal_path, "a", encoding="utf-8") as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                print(f"Auto-saved {len(job['records'])} journal records to {self.journal_path}")
         except Exception as e:
             print(f"Error during auto-save: {e}")
-    
-    def check_for_autosave(self):
+            with self._lock:
+                self._stats["errors"] += 1
+                # ไม่แน่ใจว่าไฟล์อยู่ในสถานะใด ครั้งถัดไปให้เขียน snapshot ใหม่ทั้งหมด
+                self._has_snapshot = False
+                self._saved_revision = None
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        written = len(text.encode("utf-8"))
+        with self._lock:
+            self._stats["saves"] += 1
+            self._stats["bytes_written"] += written
+            self._stats["last_bytes"] = written
+            self._stats["last_latency_ms"] = elapsed_ms
+            self._stats["total_latency_ms"] += elapsed_ms
+
+    def _read_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # บรรทัดสุดท้ายที่เขียนไม่ครบเพราะโปรแกรมหยุดกลางคัน
+                    break
+
+
+class AutoSaveStore:
+    """
+    ที่เก็บ autosave แยกตามเอกสาร โดยใช้ SHA-256 ของเนื้อหาไฟล์เป็น key
+    โครงสร้าง: <directory>/<hash[:2]>/<hash>/autosave.json (+ .journal)
+    การหาข้อมูลกู้คืนของไฟล์ที่เปิดใช้แค่การคำนวณ path จึงไม่ขึ้นกับจำนวนเอกสารใน directory
+    แต่ละเอกสารมี AutoSaveManager ของตัวเอง จึงไม่เขียนทับข้อมูลของเอกสารอื่น
+    """
+    def __init__(self, directory: str = None):
+        self.directory = directory or DEFAULT_AUTOSAVE_DIR
+        self._managers = {}  # content hash -> AutoSaveManager ที่ใช้งานอยู่ใน process นี้
+        # ป้องกัน _managers และโฟลเดอร์ของเอกสาร (cleanup_old_autosaves ทำงานบน thread เบื้องหลังได้)
+        self._lock = threading.Lock()
+
+    def path_for(self, content_hash: str) -> str:
+        return os.path.join(self.directory, content_hash[:2], content_hash, SNAPSHOT_NAME)
+
+    def manager_for(self, filepath: str) -> AutoSaveManager:
         """
-        ตรวจสอบว่ามีไฟล์ autosave อยู่หรือไม่แล้วคืนข้อมูลออกมา
+        คืนค่า AutoSaveManager ของเอกสาร filepath (สร้างโฟลเดอร์ของเอกสารถ้ายังไม่มี)
         """
-        if os.path.exists(self.autosave_path):
-            try:
-                with open(self.autosave_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                return data
-            except Exception as e:
-                print(f"Error reading autosave file: {e}")
-                return None
-        return None
-    
-    def cleanup_old_autosaves(self, max_age_seconds=3600):
+        content_hash = file_content_hash(filepath)
+        with self._lock:
+            manager = self._managers.get(content_hash)
+            if manager is None:
+                path = self.path_for(content_hash)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                manager = AutoSaveManager(path)
+                self._managers[content_hash] = manager
+            return manager
+
+    def release(self, manager: AutoSaveManager) -> None:
+        """
+        หยุดใช้ manager ของเอกสาร (รอให้งานเขียนที่ค้างอยู่เสร็จก่อน)
+        """
+        manager.shutdown()
+        with self._lock:
+            for content_hash, active in list(self._managers.items()):
+                if active is manager:
+                    del self._managers[content_hash]
+
+    def recover(self, filepath: str, page: int = None):
+        """
+        คืนข้อมูลกู้คืนของเอกสาร filepath (รูปแบบเดียวกับ AutoSaveManager.check_for_autosave)
+        ถ้าระบุ page จะคืนเฉพาะ annotation ของหน้านั้น คืนค่า None ถ้าไม่มี autosave
         """
-        ลบไฟล์ autosave หากมีอายุเกิน max_age_seconds
-        """
-        if os.path.exists(self.autosave_path):
-            try:
-                file_time = os.path.getmtime(self.autosave_path)
-                current_time = time.time()
-                if current_time - file_time > max_age_seconds:
-                    os.remove(self.autosave_path)
-                    print("Old autosave file removed.")
-            except Exception as e:
-                print(f"Error cleaning up autosave file: {e}")
+        try:
+            content_hash = file_content_hash(filepath)
+        except OSError:
+            return None
+        data = AutoSaveManager(self.path_for(content_hash)).check_for_autosave()
+        if data is not None and page is not None:
+            data["annotations"] = [anno for anno in data["annotations"] if anno.get("page", 0) == page]
+        return data
+
+    def cleanup_old_autosaves(self, max_age_seconds=7 * 24 * 3600) -> int:
+        """
+        ลบ autosave ของทุกเอกสารที่ไม่ได้แก้ไขนานเกิน max_age_seconds (ยกเว้นเอกสารที่ใช้งานอยู่)
+        MainWindow เรียกเมื่อเริ่มโปรแกรม คืนค่าจำนวนเอกสารที่ถูกลบ
+        """
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for content_hash, doc_path, mtime in self._iter_documents():
+            if mtime >= cutoff:
+                continue
+            with self._lock:
+                if content_hash in self._managers:
+                    continue
+                try:
+                    shutil.rmtree(doc_path)
+                except OSError as e:
+                    print(f"Error cleaning up autosave {doc_path}: {e}")
+                    continue
+            removed += 1
+        if removed:
+            print(f"Removed {removed} old autosave documents.")
+        return removed
+
+    def _iter_documents(self):
+        # ไล่โฟลเดอร์ของทุกเอกสาร: (hash, path, เวลาแก้ไขล่าสุดของไฟล์ในโฟลเดอร์)
+        if not os.path.isdir(self.directory):
+            return
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for doc_dir in os.scandir(shard.path):
+                if not doc_dir.is_dir():
+                    continue
+                mtime = 0.0
+                for entry in os.scandir(doc_dir.path):
+                    try:
+                        mtime = max(mtime, entry.stat().st_mtime)
+                    except OSError:
+                        continue
+                yield doc_dir.name, doc_dir.path, mtime
@@ -0,0 +1,344 @@
+# project/core/batch_export.py
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from core.annotation import make_layoutlm_record
+from core.annotation_batch import DEFAULT_RENDER_ZOOM
+from core.jsonl_export import ShardedJsonlWriter, DEFAULT_SHARD_BYTES
+from core.disk_cache import file_content_hash
+from core.render_profiles import OCR_PROFILE, EXPORT_PROFILE, COLORSPACES, to_points, from_points
+from core.page_render import PageRenderer, PDF_EXTENSIONS, IMAGE_EXTENSIONS  # นามสกุลไฟล์ที่ export ได้
+
+
+
+class ExportJob:
+    """
+    งาน export ของเอกสารหนึ่งไฟล์: ไฟล์เอกสาร และไฟล์ annotation (JSON list ของ annotation.to_dict())
+    """
+    def __init__(self, document_path: str, annotations_path: str):
+        self.document_path = document_path
+        self.annotations_path = annotations_path
+
+    def __repr__(self):
+        return f"ExportJob({self.document_path}, {self.annotations_path})"
+
+
+def find_jobs(documents_dir: str, annotations_dir: str = None) -> list:
+    """
+    หาเอกสารใน documents_dir ที่มีไฟล์ annotation <ชื่อไฟล์>.json
+    (อยู่ข้างเอกสาร หรือใน annotations_dir ถ้ากำหนด) เรียงตามชื่อไฟล์
+    """
+    annotations_dir = annotations_dir or documents_dir
+    jobs = []
+    for entry in sorted(os.scandir(documents_dir), key=lambda e: e.name):
+        if not entry.is_file():
+            continue
+        stem, ext = os.path.splitext(entry.name)
+        if ext.lower() not in PDF_EXTENSIONS + IMAGE_EXTENSIONS:
+            continue
+        annotations_path = os.path.join(annotations_dir, stem + ".json")
+        if os.path.exists(annotations_path):
+            jobs.append(ExportJob(entry.path, annotations_path))
+    return jobs
+
+
+class DocumentPages(PageRenderer):
+    """
+    เปิดเอกสารครั้งเดียวต่องาน: ขนาดของแต่ละหน้าในพิกัดเดียวกับ annotation
+    (pixel ของภาพที่ render ที่ zoom) และการ render ภาพของหน้าตาม RenderProfile
+    (ocr_profile สำหรับภาพที่ส่งให้ OCR และ export_profile สำหรับภาพที่ export)
+    """
+    def __init__(self, document_path: str, zoom: float, ocr_profile=OCR_PROFILE, export_profile=EXPORT_PROFILE):
+        super().__init__(document_path)
+        self.zoom = zoom
+        self.ocr_profile = ocr_profile
+        self.export_profile = export_profile
+        # ไฟล์ภาพหลาย frame (TIFF/GIF) แต่ละ frame คือหนึ่งหน้า
+        self.sizes = [self.page_size(index, zoom) for index in range(self.page_count)]
+
+    def image_zoom(self, profile) -> float:
+        """
+        zoom ของภาพที่ render ด้วย profile (ไฟล์ภาพใช้ pixel ของภาพต้นฉบับเสมอ)
+        """
+        return profile.zoom if self.is_pdf else 1.0
+
+    def image_bbox(self, bbox, profile) -> list:
+        """
+        แปลง bbox จากพิกัดของ annotation เป็นพิกัด pixel ของภาพที่ render ด้วย profile (ผ่านหน่วย point)
+        """
+        if not self.is_pdf:
+            return list(bbox)
+        return from_points(to_points(bbox, self.zoom), profile.zoom)
+
+    def image(self, page_index: int, profile=None):
+        """
+        ภาพ PIL ของหน้าที่ render ด้วย profile (ค่าเริ่มต้นคือ ocr_profile)
+        """
+        return self.render_image(page_index, profile or self.ocr_profile)
+
+    def word_index(self, page_index: int):
+        """
+        ดัชนีคำจาก text layer ของหน้า (เฉพาะ PDF) หรือ None
+        """
+        if not self.is_pdf:
+            return None
+        from core.document_handler import PageWordIndex
+        return PageWordIndex.from_page(self.document[page_index], self.zoom)
+
+    def render(self, page_index: int, save_path: str) -> None:
+        self.save_png(page_index, save_path, self.export_profile)
+
+
+def _load_by_page(job: ExportJob) -> dict:
+    with open(job.annotations_path, "r", encoding="utf-8") as f:
+        annotations = json.load(f)
+    by_page = {}
+    for anno in annotations:
+        by_page.setdefault(anno.get("page") or 0, []).append(anno)
+    return by_page
+
+
+_ocr_stages = {}
+
+
+def get_ocr_stage(backend_name: str, cache_dir: str = None):
+    """
+    OcrStage ของ backend_name (ชื่อใน core.ocr.OCR_BACKENDS) สร้างครั้งเดียวต่อ process
+    (worker และ GUI ใช้ซ้ำระหว่างเอกสาร)
+    """
+    from core.ocr import OcrStage, OcrCache, get_ocr_backend
+    key = (backend_name, cache_dir)
+    stage = _ocr_stages.get(key)
+    if stage is None:
+        stage = _ocr_stages[key] = OcrStage(get_ocr_backend(backend_name), OcrCache(cache_dir))
+    return stage
+
+
+def page_words(pages: DocumentPages, page_index: int, bboxes: list, ocr_stage=None, content_hash: str = None,
+               text_layer: bool = True):
+    """
+    (text, confidence) ของแต่ละกล่อง bboxes ([x1, y1, x2, y2] ในพิกัดของ annotation) บนหน้า page_index
+    หน้า PDF ที่มี text layer ใช้ข้อความจาก text layer (ถ้า text_layer=True) หน้าอื่นใช้ ocr_stage ถ้ากำหนด
+    คืนค่า None ถ้าไม่มีทั้งสองทาง (make_layoutlm_record จะเว้น words ว่างไว้)
+    """
+    words = pages.word_index(page_index) if text_layer else None
+    if words is not None and words.has_text:
+        # หน้า born-digital: ใช้ข้อความจาก text layer โดยตรง ไม่ต้อง render หรือ OCR
+        return [(words.text_in(x0, y0, x1 - x0, y1 - y0), 1.0) for x0, y0, x1, y1 in bboxes]
+    if ocr_stage is None:
+        return None
+    from core.ocr import page_hash
+    profile = pages.ocr_profile
+    if content_hash is None:
+        content_hash = file_content_hash(pages.document_path)
+    # render หน้าเฉพาะเมื่อมีกล่องที่ยังไม่เคย OCR
+    return ocr_stage.recognize_page(lambda: pages.image(page_index, profile),
+                                    page_hash(content_hash, page_index, pages.image_zoom(profile), profile.colorspace),
+                                    [pages.image_bbox(bbox, profile) for bbox in bboxes])
+
+
+def _iter_page_records(job: ExportJob, pages, by_page: dict, output_dir: str,
+                       document_type: str, render_images: bool, ocr_backend: str = None,
+                       ocr_cache_dir: str = None, text_layer: bool = True):
+    # สร้าง (basename, page_index, record) ของแต่ละหน้าที่มี annotation
+    stem = os.path.splitext(os.path.basename(job.document_path))[0]
+    ocr_stage = get_ocr_stage(ocr_backend, ocr_cache_dir) if ocr_backend else None
+    content_hash = file_content_hash(job.document_path) if ocr_stage is not None else None
+    for page_index in sorted(by_page):
+        if page_index >= len(pages.sizes):
+            print(f"Skipping annotations on missing page {page_index} of {job.document_path}")
+            continue
+        # ภาพ frame เดียวใช้ชื่อไฟล์เดิม เอกสารหลายหน้าต้องมีเลขหน้าเพื่อไม่ให้เขียนทับกัน
+        basename = f"{stem}_page_{page_index + 1}" if pages.is_pdf or len(pages.sizes) > 1 else stem
+        image_path = job.document_path
+        if render_images:
+            image_path = os.path.join("images", basename + ".png")
+            pages.render(page_index, os.path.join(output_dir, image_path))
+        width, height = pages.sizes[page_index]
+        boxes = [([a["x"], a["y"], a["x"] + a["width"], a["y"] + a["height"]], a["label"])
+                 for a in by_page[page_index]]
+        ocr_results = page_words(pages, page_index, [bbox for bbox, _ in boxes], ocr_stage, content_hash,
+                                 text_layer)
+        record = make_layoutlm_record(
+            image_path=image_path,
+            original_path=job.document_path,
+            page_number=page_index + 1,
+            document_type=document_type,
+            width=width,
+            height=height,
+            boxes=boxes,
+            ocr_results=ocr_results,
+            points_zoom=pages.zoom if pages.is_pdf else None,
+        )
+        yield basename, page_index, record
+
+
+def export_document(job: ExportJob, output_dir: str, document_type: str = "",
+                    render_images: bool = False, zoom: float = DEFAULT_RENDER_ZOOM,
+                    ocr_backend: str = None, ocr_cache_dir: str = None, text_layer: bool = True,
+                    ocr_profile=OCR_PROFILE, export_profile=EXPORT_PROFILE) -> dict:
+    """
+    export เอกสารหนึ่งไฟล์เป็นไฟล์ LayoutLMv3 JSON หนึ่งไฟล์ต่อหน้าที่มี annotation
+    ถ้า render_images=True จะ render ภาพของหน้านั้นลง <output_dir>/images ด้วย
+    words/confidence ของหน้า PDF ที่มี text layer มาจาก text layer (ถ้า text_layer=True)
+    หน้าอื่น ๆ (ภาพสแกน) ใช้ผล OCR ถ้ากำหนด ocr_backend (ชื่อใน core.ocr.OCR_BACKENDS)
+    ภาพที่ส่งให้ OCR และภาพที่ export ถูก render ตาม ocr_profile และ export_profile
+    โดย layout['bbox'] อยู่ในพิกัดของ annotation (zoom) ไม่ขึ้นกับ dpi ของ profile
+    และหน้า PDF มี layout['bbox_points'] เป็นกล่องเดียวกันในหน่วย point ของ PDF
+    ทำงานใน worker process ได้ (ไม่ใช้ Qt) คืนค่าสถิติของงาน
+    """
+    by_page = _load_by_page(job)
+    stats = {"documents": 1, "pages": 0, "boxes": 0, "bytes": 0}
+    pages = DocumentPages(job.document_path, zoom, ocr_profile, export_profile)
+    try:
+        for basename, _, record in _iter_page_records(job, pages, by_page, output_dir, document_type,
+                                                      render_images, ocr_backend, ocr_cache_dir,
+                                                      text_layer):
+            data = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            with open(os.path.join(output_dir, f"{basename}_layoutlm.json"), "wb") as f:
+                f.write(data)
+            stats["pages"] += 1
+            stats["boxes"] += len(record["layout"]["bbox"])
+            stats["bytes"] += len(data)
+    finally:
+        pages.close()
+    return stats
+
+
+def document_records(job: ExportJob, output_dir: str, document_type: str = "",
+                     render_images: bool = False, zoom: float = DEFAULT_RENDER_ZOOM,
+                     ocr_backend: str = None, ocr_cache_dir: str = None, text_layer: bool = True,
+                     ocr_profile=OCR_PROFILE, export_profile=EXPORT_PROFILE) -> list:
+    """
+    เหมือน export_document แต่คืนค่า list ของ (page_index, record) ให้ผู้เรียกเขียนเอง (เช่น ลง shard)
+    """
+    by_page = _load_by_page(job)
+    pages = DocumentPages(job.document_path, zoom, ocr_profile, export_profile)
+    try:
+        return [(page_index, record) for _, page_index, record in
+                _iter_page_records(job, pages, by_page, output_dir, document_type, render_images,
+                                   ocr_backend, ocr_cache_dir, text_layer)]
+    finally:
+        pages.close()
+
+
+def _iter_results(pool, fn, jobs: list, args: tuple, window: int):
+    # ส่งงานเข้า pool ครั้งละไม่เกิน window งาน และคืนผลตามลำดับ เพื่อไม่ให้ผลค้างใน memory
+    pending = []
+    jobs = iter(jobs)
+    for job in jobs:
+        pending.append((job, pool.submit(fn, job, *args)))
+        if len(pending) >= window:
+            break
+    while pending:
+        job, future = pending.pop(0)
+        next_job = next(jobs, None)
+        if next_job is not None:
+            pending.append((next_job, pool.submit(fn, next_job, *args)))
+        try:
+            yield job, future.result(), None
+        except Exception as e:
+            yield job, None, e
+
+
+def export_dataset(documents_dir: str, output_dir: str, annotations_dir: str = None,
+                   document_type: str = "", render_images: bool = False,
+                   max_workers: int = None, use_processes: bool = True,
+                   output_format: str = "json", shard_max_bytes: int = DEFAULT_SHARD_BYTES,
+                   ocr_backend: str = None, ocr_cache_dir: str = None, text_layer: bool = True,
+                   ocr_profile=OCR_PROFILE, export_profile=EXPORT_PROFILE) -> dict:
+    """
+    export ทุกเอกสารใน documents_dir เป็นชุดข้อมูล LayoutLMv3 ใน output_dir แบบขนาน
+    (ProcessPoolExecutor หรือ ThreadPoolExecutor ถ้า use_processes=False)
+    output_format="json" เขียนหนึ่งไฟล์ต่อหน้า, "shards" เขียนเป็น JSONL shard พร้อม index (ดู core.jsonl_export)
+    ocr_backend, ocr_cache_dir, text_layer และ render profile ส่งต่อให้ export_document
+    คืนค่าสถิติรวม: จำนวนเอกสาร/หน้า/กล่อง, bytes, เวลา และ throughput
+    """
+    if output_format not in ("json", "shards"):
+        raise ValueError(f"Unknown output format: {output_format}")
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    if render_images:
+        os.makedirs(os.path.join(output_dir, "images"), exist_ok=True)
+    jobs = find_jobs(documents_dir, annotations_dir)
+    totals = {"documents": 0, "pages": 0, "boxes": 0, "bytes": 0, "errors": 0}
+    pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    writer = ShardedJsonlWriter(output_dir, shard_max_bytes) if output_format == "shards" else None
+    fn = document_records if writer is not None else export_document
+    try:
+        with pool_class(max_workers=max_workers) as pool:
+            window = 2 * (max_workers or os.cpu_count() or 1)
+            args = (output_dir, document_type, render_images, DEFAULT_RENDER_ZOOM,
+                    ocr_backend, ocr_cache_dir, text_layer, ocr_profile, export_profile)
+            for job, result, error in _iter_results(pool, fn, jobs, args, window):
+                if error is not None:
+                    print(f"Error exporting {job.document_path}: {error}")
+                    totals["errors"] += 1
+                    continue
+                if writer is None:
+                    for key, value in result.items():
+                        totals[key] += value
+                    continue
+                totals["documents"] += 1
+                for page_index, record in result:
+                    totals["bytes"] += writer.write(job.document_path, page_index, record)
+                    totals["pages"] += 1
+                    totals["boxes"] += len(record["layout"]["bbox"])
+    finally:
+        if writer is not None:
+            writer.close()
+    elapsed = time.perf_counter() - started
+    totals["elapsed_seconds"] = elapsed
+    totals["pages_per_second"] = totals["pages"] / elapsed if elapsed > 0 else 0.0
+    totals["boxes_per_second"] = totals["boxes"] / elapsed if elapsed > 0 else 0.0
+    print(f"Exported {totals['documents']} documents, {totals['pages']} pages, {totals['boxes']} boxes "
+          f"in {elapsed:.2f}s ({totals['pages_per_second']:.1f} pages/s, "
+          f"{totals['bytes'] / 1024 / 1024:.1f} MB)")
+    return totals
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export a directory of annotated documents as a LayoutLMv3 dataset.")
+    parser.add_argument("documents_dir", help="directory of PDF/image files")
+    parser.add_argument("output_dir", help="directory to write the dataset into")
+    parser.add_argument("--annotations-dir", help="directory of <document name>.json annotation files "
+                                                  "(default: next to the documents)")
+    parser.add_argument("--document-type", default="", help="document type written into every record")
+    parser.add_argument("--render-images", action="store_true", help="also render page images into output_dir/images")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--threads", action="store_true", help="use threads instead of processes")
+    parser.add_argument("--format", choices=("json", "shards"), default="json",
+                        help="one JSON file per page, or JSONL shards with an index")
+    parser.add_argument("--shard-size-mb", type=int, default=DEFAULT_SHARD_BYTES // (1024 * 1024),
+                        help="maximum size of each shard in MB")
+    parser.add_argument("--ocr", choices=("stub", "tesseract"), default=None,
+                        help="fill words/confidence with this OCR backend")
+    parser.add_argument("--ocr-cache-dir", default=None, help="directory for cached OCR results")
+    parser.add_argument("--no-text-layer", action="store_true",
+                        help="ignore the PDF text layer and OCR every page")
+    parser.add_argument("--ocr-dpi", type=float, default=OCR_PROFILE.dpi, help="resolution of page images sent to OCR")
+    parser.add_argument("--ocr-colorspace", choices=COLORSPACES, default=OCR_PROFILE.colorspace,
+                        help="colorspace of page images sent to OCR")
+    parser.add_argument("--image-dpi", type=float, default=EXPORT_PROFILE.dpi,
+                        help="resolution of rendered page images (--render-images)")
+    parser.add_argument("--image-colorspace", choices=COLORSPACES, default=EXPORT_PROFILE.colorspace,
+                        help="colorspace of rendered page images; auto keeps grayscale pages single-channel")
+    args = parser.parse_args(argv)
+    totals = export_dataset(args.documents_dir, args.output_dir, args.annotations_dir,
+                            document_type=args.document_type, render_images=args.render_images,
+                            max_workers=args.workers, use_processes=not args.threads,
+                            output_format=args.format, shard_max_bytes=args.shard_size_mb * 1024 * 1024,
+                            ocr_backend=args.ocr, ocr_cache_dir=args.ocr_cache_dir,
+                            text_layer=not args.no_text_layer,
+                            ocr_profile=OCR_PROFILE.replace(dpi=args.ocr_dpi, colorspace=args.ocr_colorspace),
+                            export_profile=EXPORT_PROFILE.replace(dpi=args.image_dpi,
+                                                                  colorspace=args.image_colorspace))
+    return 1 if totals["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
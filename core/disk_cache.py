@@ -0,0 +1,195 @@
+# project/core/disk_cache.py
+
+import os
+import hashlib
+import functools
+import tempfile
+import threading
+
+# ตำแหน่งเริ่มต้นของ cache บนดิสก์ (ใช้ร่วมกันระหว่าง GUI และ API)
+DEFAULT_CACHE_DIR = os.environ.get(
+    "OCR_AI_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "ocr_ai")
+)
+# ขนาดสูงสุดของ cache บนดิสก์ (2 GB)
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# จำนวนไฟล์ที่จำ content hash ไว้ (ไม่ให้ memo โตไม่สิ้นสุดใน process ที่เปิดไฟล์จำนวนมาก เช่น API)
+HASH_MEMO_SIZE = 1024
+
+
+def file_content_hash(filepath: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    คำนวณ SHA-256 ของเนื้อหาไฟล์ (จำผลไว้ตาม path, ขนาด และเวลาแก้ไข จึงไม่อ่านไฟล์ซ้ำ)
+    """
+    st = os.stat(filepath)
+    return _content_hash(os.path.abspath(filepath), st.st_size, st.st_mtime_ns, chunk_size)
+
+
+@functools.lru_cache(maxsize=HASH_MEMO_SIZE)
+def _content_hash(path: str, size: int, mtime_ns: int, chunk_size: int) -> str:
+    # size และ mtime_ns เป็นส่วนหนึ่งของ key: ไฟล์ที่ถูกแก้ไขจะถูกอ่านใหม่
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _zoom_tag(zoom) -> str:
+    # แปลง zoom (ตัวเลขหรือ tuple เช่น ("thumbnail", 100)) เป็นส่วนหนึ่งของชื่อไฟล์
+    if isinstance(zoom, (tuple, list)):
+        return "-".join(str(part) for part in zoom)
+    return f"z{float(zoom):g}"
+
+
+class DiskPageCache:
+    """
+    Cache ของภาพหน้าที่ render แล้วบนดิสก์ key คือ (content hash, page, zoom)
+    จำกัดขนาดรวมด้วย max_bytes และลบไฟล์ที่ใช้งานล่าสุดนานที่สุดออกก่อน (LRU ตาม mtime)
+    ข้อมูลที่เก็บเป็น bytes ของภาพ (เช่น PPM จาก fitz) จึงไม่ขึ้นกับ Qt
+    """
+    def __init__(self, directory: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # คำนวณเมื่อใช้งานครั้งแรก
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path_for(self, content_hash: str, page: int, zoom) -> str:
+        return os.path.join(self.directory, content_hash[:2], content_hash,
+                            f"p{page}_{_zoom_tag(zoom)}.ppm")
+
+    def get(self, content_hash: str, page: int, zoom):
+        """
+        คืนค่า bytes ของภาพถ้ามีใน cache มิฉะนั้นคืนค่า None
+        """
+        path = self.path_for(content_hash, page, zoom)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # แตะ mtime เพื่อให้ไฟล์นี้เป็นรายการที่ใช้ล่าสุด
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, content_hash: str, page: int, zoom, data: bytes) -> None:
+        path = self.path_for(content_hash, page, zoom)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # เขียนลงไฟล์ชั่วคราวแล้ว rename เพื่อไม่ให้ process อื่นอ่านไฟล์ที่เขียนไม่ครบ
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            try:
+                # เขียนทับรายการเดิม: ขนาดรวมเพิ่มเฉพาะส่วนต่าง
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing page cache: {e}")
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_total()
+            else:
+                self._total_bytes += len(data) - old_size
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self, target_ratio: float = 0.9) -> int:
+        """
+        ลบไฟล์ที่เก่าที่สุดจนขนาดรวมเหลือไม่เกิน max_bytes * target_ratio
+        คืนค่าจำนวนไฟล์ที่ถูกลบ
+        """
+        entries = []
+        total = 0
+        for path, size, mtime in self._iter_files():
+            entries.append((mtime, size, path))
+            total += size
+        entries.sort()
+        target = self.max_bytes * target_ratio
+        removed = 0
+        for mtime, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self._total_bytes = total
+            self.evictions += removed
+        return removed
+
+    def clear(self) -> None:
+        for path, _, _ in self._iter_files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_total()
+            return {
+                "directory": self.directory,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _scan_total(self) -> int:
+        return sum(size for _, size, _ in self._iter_files())
+
+    def _iter_files(self):
+        # ไล่ไฟล์ทั้งหมดใน cache: <directory>/<hash[:2]>/<hash>/<file>
+        if not os.path.isdir(self.directory):
+            return
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for doc_dir in os.scandir(shard.path):
+                if not doc_dir.is_dir():
+                    continue
+                for entry in os.scandir(doc_dir.path):
+                    if entry.is_file() and entry.name.endswith(".ppm"):
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        yield entry.path, st.st_size, st.st_mtime
+
+
+_default_cache = None
+
+
+def get_default_disk_cache() -> DiskPageCache:
+    """
+    คืนค่า DiskPageCache ที่ใช้ร่วมกันภายใน process (ตำแหน่งกำหนดได้ด้วย OCR_AI_CACHE_DIR)
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DiskPageCache()
+    return _default_cache
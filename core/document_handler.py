@@ -1,29 +1,91 @@
 # project/core/document_handler.py
 
 import os
-from PIL import Image
-import fitz  # ใช้สำหรับเปิด PDF (PyMuPDF)
+from core.annotation import SpatialIndex
+
+# zoom ของพิกัด canvas (pixel ของหน้าที่ render ที่ zoom 3.0)
+WORD_ZOOM = 3.0
+# สัดส่วนพื้นที่ของคำที่ต้องอยู่ในกรอบ จึงจะนับว่าคำนั้นอยู่ในกรอบ
+WORD_COVERAGE = 0.5
+
+
+class PageWordIndex:
+    """
+    ดัชนีคำของหนึ่งหน้าจาก text layer ของ PDF (fitz get_text("words"))
+    พิกัดของคำอยู่ในพิกัด pixel ของ canvas (point * zoom) และค้นหาคำในกรอบด้วย SpatialIndex
+    """
+    def __init__(self, words: list):
+        # words: list ของ (x0, y0, x1, y1, text, block_no, line_no, word_no) ในพิกัด canvas
+        self.words = words
+        if words:
+            cell_size = 4.0 * sum(w[3] - w[1] for w in words) / len(words)
+        else:
+            cell_size = None
+        self.index = SpatialIndex(max(1.0, cell_size) if cell_size else None)
+        for i, (x0, y0, x1, y1, *_) in enumerate(words):
+            self.index.insert(i, x0, y0, x1 - x0, y1 - y0)
+
+    @classmethod
+    def from_page(cls, page, zoom: float = WORD_ZOOM):
+        words = [(x0 * zoom, y0 * zoom, x1 * zoom, y1 * zoom, text, block, line, word)
+                 for x0, y0, x1, y1, text, block, line, word in page.get_text("words")]
+        return cls(words)
+
+    def __len__(self):
+        return len(self.words)
+
+    @property
+    def has_text(self) -> bool:
+        """
+        หน้าที่มี text layer (born-digital) ใช้ข้อความได้โดยไม่ต้อง OCR
+        """
+        return bool(self.words)
+
+    def words_in(self, x: float, y: float, width: float, height: float,
+                 min_coverage: float = WORD_COVERAGE) -> list:
+        """
+        คืนค่าคำที่อยู่ในกรอบ (x, y, width, height) อย่างน้อย min_coverage ของพื้นที่คำ เรียงตามลำดับการอ่าน
+        """
+        x1 = x + width
+        y1 = y + height
+        found = []
+        for i in self.index.query(x, y, width, height):
+            wx0, wy0, wx1, wy1 = self.words[i][:4]
+            inter = max(0.0, min(x1, wx1) - max(x, wx0)) * max(0.0, min(y1, wy1) - max(y, wy0))
+            area = (wx1 - wx0) * (wy1 - wy0)
+            if area <= 0 or inter / area >= min_coverage:
+                found.append(self.words[i])
+        found.sort(key=lambda w: (w[5], w[6], w[7]))
+        return found
+
+    def text_in(self, x: float, y: float, width: float, height: float) -> str:
+        return " ".join(w[4] for w in self.words_in(x, y, width, height))
+
 
 class DocumentHandler:
     def __init__(self):
         self.document = None
         self.filepath = None
         self.document_type = None  # 'pdf' หรือ 'image'
+        self._word_indexes = {}  # page -> PageWordIndex (สร้างเมื่อใช้งานครั้งแรก)
     
     def load_image(self, filepath: str):
         """
         โหลดเอกสาร (PDF หรือรูปภาพ) โดยพิจารณาจากส่วนขยายไฟล์
         """
         self.filepath = filepath
+        self._word_indexes = {}
         ext = os.path.splitext(filepath)[1].lower()
         if ext == '.pdf':
             try:
+                import fitz  # PyMuPDF (import เมื่อเปิด PDF แรก ไม่ใช่ตอนเริ่มโปรแกรม)
                 self.document = fitz.open(filepath)
                 self.document_type = 'pdf'
             except Exception as e:
                 raise Exception(f"Error loading PDF file: {e}")
         elif ext in ['.png', '.jpg', '.jpeg', '.bmp', '.gif']:
             try:
+                from PIL import Image
                 self.document = Image.open(filepath)
                 self.document_type = 'image'
             except Exception as e:
@@ -42,3 +104,24 @@ class DocumentHandler:
             return {"type": "image", "size": self.document.size}
         else:
             return {}
+
+    def word_index(self, page: int):
+        """
+        คืนค่า PageWordIndex ของหน้า page (เฉพาะ PDF) คืนค่า None ถ้าเอกสารไม่ใช่ PDF
+        """
+        if self.document_type != 'pdf':
+            return None
+        index = self._word_indexes.get(page)
+        if index is None:
+            index = self._word_indexes[page] = PageWordIndex.from_page(self.document[page])
+        return index
+
+    def words_in_rect(self, page: int, x: float, y: float, width: float, height: float) -> list:
+        """
+        คำจาก text layer ที่อยู่ในกรอบ (พิกัด canvas) ของหน้า page
+        """
+        index = self.word_index(page)
+        return index.words_in(x, y, width, height) if index is not None else []
+
+    def text_in_rect(self, page: int, x: float, y: float, width: float, height: float) -> str:
+        return " ".join(w[4] for w in self.words_in_rect(page, x, y, width, height))
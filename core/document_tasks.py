@@ -0,0 +1,138 @@
+# project/core/document_tasks.py
+
+import os
+import re
+import json
+import hashlib
+import tempfile
+import threading
+from core.page_render import PageRenderer, PDF_EXTENSIONS, IMAGE_EXTENSIONS
+from core.render_profiles import EXPORT_PROFILE, OCR_PROFILE
+from core.jobs import DEFAULT_JOBS_DIR
+
+# ตำแหน่งเริ่มต้นของเอกสารที่ upload ผ่าน API (กำหนดได้ด้วย OCR_AI_DOCUMENTS_DIR)
+DEFAULT_DOCUMENTS_DIR = os.environ.get(
+    "OCR_AI_DOCUMENTS_DIR", os.path.join(os.path.expanduser("~"), ".ocr_ai", "documents")
+)
+RECORDS_NAME = "records.jsonl"
+
+_DOCUMENT_ID = re.compile(r"[0-9a-f]{64}")
+
+
+class DocumentLibrary:
+    """
+    เก็บไฟล์เอกสารที่ upload ตาม content hash (<directory>/<hash[:2]>/<hash>/document<ext>)
+    document id คือ SHA-256 ของเนื้อหา จึงตรงกับ key ของ DiskPageCache และ autosave
+    """
+    def __init__(self, directory: str = None):
+        self.directory = directory or DEFAULT_DOCUMENTS_DIR
+
+    def add(self, data: bytes, filename: str) -> dict:
+        """
+        เก็บเอกสาร (ไฟล์เดิมที่เนื้อหาเหมือนกันใช้ที่เก็บเดียวกัน) คืนค่า document_id, filename และ size
+        """
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in PDF_EXTENSIONS + IMAGE_EXTENSIONS:
+            raise ValueError(f"Unsupported document type: {ext or filename}")
+        document_id = hashlib.sha256(data).hexdigest()
+        folder = os.path.join(self.directory, document_id[:2], document_id)
+        path = os.path.join(folder, "document" + ext)
+        if not os.path.exists(path):
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return {"document_id": document_id, "filename": os.path.basename(filename), "size": len(data)}
+
+    def path_for(self, document_id: str):
+        """
+        path ของเอกสาร หรือ None ถ้าไม่มี (document_id ที่ไม่ใช่ hash ถูกปฏิเสธ)
+        """
+        if not _DOCUMENT_ID.fullmatch(document_id or ""):
+            return None
+        folder = os.path.join(self.directory, document_id[:2], document_id)
+        try:
+            names = [name for name in os.listdir(folder) if name.startswith("document.")]
+        except OSError:
+            return None
+        return os.path.join(folder, names[0]) if names else None
+
+
+def render_task(document_path: str, output_dir: str, pages: list = None, profile=EXPORT_PROFILE) -> dict:
+    """
+    render หน้าของเอกสารเป็น PNG (page-<n>.png) ลง output_dir ตาม profile
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    with PageRenderer(document_path) as renderer:
+        for index in (pages if pages is not None else range(renderer.page_count)):
+            name = f"page-{index + 1}.png"
+            width, height = renderer.save_png(index, os.path.join(output_dir, name), profile)
+            results.append({"page": index, "file": name, "width": width, "height": height})
+    return {"pages": results, "profile": repr(profile)}
+
+
+def _annotations_file(store, document_id: str, output_dir: str, pages: list = None) -> str:
+    # เขียน annotation ของเอกสารจาก store เป็นไฟล์ annotation ของ batch export
+    path = os.path.join(output_dir, "annotations.json")
+    wanted = set(pages) if pages is not None else None
+    with open(path, "w", encoding="utf-8") as f:
+        rows = [row for row in store.iter_rows(document=document_id)
+                if wanted is None or (row.get("page") or 0) in wanted]
+        json.dump(rows, f, ensure_ascii=False)
+    return path
+
+
+def _document_records(document_path: str, output_dir: str, store, document_id: str, pages: list, **options):
+    from core.batch_export import ExportJob, document_records
+    os.makedirs(output_dir, exist_ok=True)
+    if options.get("render_images"):
+        os.makedirs(os.path.join(output_dir, "images"), exist_ok=True)
+    job = ExportJob(document_path, _annotations_file(store, document_id, output_dir, pages))
+    return document_records(job, output_dir, **options)
+
+
+def ocr_task(document_path: str, output_dir: str, store, document_id: str, pages: list = None,
+             ocr_backend: str = "stub", ocr_cache_dir: str = None, profile=OCR_PROFILE) -> dict:
+    """
+    อ่านข้อความในกล่อง annotation ของเอกสาร (จาก text layer ถ้ามี มิฉะนั้นด้วย OCR backend บนภาพตาม profile)
+    """
+    records = _document_records(document_path, output_dir, store, document_id, pages,
+                                ocr_backend=ocr_backend, ocr_cache_dir=ocr_cache_dir, ocr_profile=profile)
+    return {"pages": [{"page": page_index,
+                       "bbox": record["layout"]["bbox"],
+                       "label": record["layout"]["label"],
+                       "words": record["layout"]["words"],
+                       "confidence": record["layout"]["confidence"]}
+                      for page_index, record in records]}
+
+
+def export_task(document_path: str, output_dir: str, store, document_id: str, pages: list = None,
+                document_type: str = "", render_images: bool = False, ocr_backend: str = None,
+                ocr_cache_dir: str = None, profile=EXPORT_PROFILE) -> dict:
+    """
+    export annotation ของเอกสารเป็น LayoutLMv3 record (JSONL หนึ่งบรรทัดต่อหน้า) ใน output_dir
+    ภาพของหน้า (render_images) ถูก render ตาม profile
+    """
+    from core.jsonl_export import write_jsonl
+    records = _document_records(document_path, output_dir, store, document_id, pages,
+                                document_type=document_type, render_images=render_images,
+                                ocr_backend=ocr_backend, ocr_cache_dir=ocr_cache_dir, export_profile=profile)
+    count = write_jsonl((record for _, record in records), os.path.join(output_dir, RECORDS_NAME))
+    return {"records": count, "file": RECORDS_NAME, "pages": [page_index for page_index, _ in records]}
+
+
+_default_library = None
+_default_library_lock = threading.Lock()
+
+
+def get_default_library() -> DocumentLibrary:
+    """
+    คืนค่า DocumentLibrary ที่ใช้ร่วมกันภายใน process (ตำแหน่งกำหนดได้ด้วย OCR_AI_DOCUMENTS_DIR)
+    """
+    global _default_library
+    with _default_library_lock:
+        if _default_library is None:
+            _default_library = DocumentLibrary()
+        return _default_library
@@ -0,0 +1,248 @@
+# project/core/jobs.py
+
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# จำนวน worker และจำนวนงานที่ค้างได้ (รอหรือกำลังทำ) ก่อนปฏิเสธงานใหม่
+# (กำหนดได้ด้วย OCR_AI_JOB_WORKERS และ OCR_AI_JOB_QUEUE_SIZE)
+DEFAULT_JOB_WORKERS = int(os.environ.get("OCR_AI_JOB_WORKERS", 2))
+DEFAULT_MAX_PENDING = int(os.environ.get("OCR_AI_JOB_QUEUE_SIZE", 16))
+# จำนวนงานที่เสร็จแล้วที่เก็บสถานะไว้ให้ถามได้
+DEFAULT_KEEP_FINISHED = 1000
+# ตำแหน่งเริ่มต้นของโฟลเดอร์ของแต่ละงาน (สถานะ job.json และไฟล์ผลลัพธ์) กำหนดได้ด้วย OCR_AI_JOBS_DIR
+DEFAULT_JOBS_DIR = os.environ.get(
+    "OCR_AI_JOBS_DIR", os.path.join(os.path.expanduser("~"), ".ocr_ai", "jobs")
+)
+JOB_STATE_NAME = "job.json"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class QueueFullError(Exception):
+    """
+    คิวงานเต็ม (ผู้เรียกควรลองใหม่ภายหลัง)
+    """
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+class Job:
+    """
+    สถานะของงานหนึ่งงานในคิว
+    """
+    def __init__(self, kind: str, params: dict = None, job_id: str = None):
+        self.id = job_id or new_job_id()
+        self.kind = kind
+        self.params = params or {}
+        self.status = QUEUED
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.future = None
+
+    def to_dict(self) -> dict:
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        job = cls(data["kind"], data.get("params"), data["id"])
+        for key in ("status", "created", "started", "finished", "error", "result"):
+            if key in data:
+                setattr(job, key, data[key])
+        return job
+
+
+class JobQueue:
+    """
+    คิวงานภายใน process บน thread pool ขนาด max_workers (ทำงานได้ offline ไม่ต้องมี broker)
+    รับงานค้างได้ไม่เกิน max_pending งาน เกินจากนั้น submit จะ raise QueueFullError (backpressure)
+    เก็บสถานะของงานที่เสร็จแล้วล่าสุดไว้ไม่เกิน keep_finished งาน
+
+    งานทำใน process ที่รับงานเท่านั้น ถ้ากำหนด jobs_dir สถานะของแต่ละงานจะถูกเขียนลง
+    <jobs_dir>/<job id>/job.json ด้วย process อื่น (เช่น uvicorn worker อีกตัว) ที่ใช้ jobs_dir เดียวกัน
+    จึงอ่านสถานะและผลลัพธ์ได้ แต่ยกเลิกงานได้เฉพาะ process ที่รับงาน และ stats() นับเฉพาะงานของ process นี้
+    โฟลเดอร์ของงานที่ถูกตัดออกจากรายการ (เกิน keep_finished) จะถูกลบไปด้วย
+    """
+    def __init__(self, max_workers: int = DEFAULT_JOB_WORKERS, max_pending: int = DEFAULT_MAX_PENDING,
+                 keep_finished: int = DEFAULT_KEEP_FINISHED, jobs_dir: str = None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self.jobs_dir = jobs_dir
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def job_dir(self, job_id: str):
+        """
+        โฟลเดอร์ของงาน (ไฟล์ผลลัพธ์และสถานะ) หรือ None ถ้าไม่ได้กำหนด jobs_dir หรือ job_id ไม่ถูกรูปแบบ
+        """
+        if self.jobs_dir is None or not _JOB_ID.fullmatch(job_id or ""):
+            return None
+        return os.path.join(self.jobs_dir, job_id)
+
+    def submit(self, kind: str, fn, *args, params: dict = None, job_id: str = None, **kwargs) -> Job:
+        """
+        ส่งงาน fn(*args, **kwargs) เข้าคิว คืนค่า Job ทันที (ผลลัพธ์ของ fn จะอยู่ที่ job.result)
+        job_id กำหนดเองได้ (เช่น เมื่อ fn ต้องรู้ id ล่วงหน้าเพื่อใช้เป็นชื่อโฟลเดอร์ผลลัพธ์)
+        """
+        job = Job(kind, params, job_id)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"Job queue is full ({self.max_pending} pending jobs)")
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            self._pending += 1
+            self._jobs[job.id] = job
+            self._save(job)
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str):
+        """
+        งานของ process นี้ หรืองานของ process อื่นที่อ่านจาก jobs_dir (None ถ้าไม่พบ)
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        folder = self.job_dir(job_id)
+        if folder is None:
+            return None
+        try:
+            with open(os.path.join(folder, JOB_STATE_NAME), "r", encoding="utf-8") as f:
+                return Job.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        ยกเลิกงานที่ยังไม่เริ่ม คืนค่า True ถ้ายกเลิกได้
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED or not job.future.cancel():
+                return False
+            self._mark_cancelled(job)
+            self._trim()
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {state: 0 for state in (QUEUED, RUNNING) + FINISHED_STATES}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            counts.update({"pending": self._pending, "max_pending": self.max_pending,
+                           "max_workers": self.max_workers})
+            return counts
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        หยุดคิว: งานที่ยังไม่เริ่มถูกยกเลิก งานที่กำลังทำจะทำจนเสร็จ (รอถ้า wait=True)
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            for job in self._jobs.values():
+                if job.status == QUEUED and job.future.cancel():
+                    self._mark_cancelled(job)
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job: Job, fn, args: tuple, kwargs: dict) -> None:
+        with self._lock:
+            job.status = RUNNING
+            job.started = time.time()
+            self._save(job)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            status, result, error = FAILED, None, str(e)
+        else:
+            status, error = DONE, None
+        with self._lock:
+            job.result = result
+            job.error = error
+            job.status = status
+            job.finished = time.time()
+            self._pending -= 1
+            self._save(job)
+            self._trim()
+
+    def _mark_cancelled(self, job: Job) -> None:
+        job.status = CANCELLED
+        job.finished = time.time()
+        self._pending -= 1
+        self._save(job)
+
+    def _save(self, job: Job) -> None:
+        # เขียนสถานะของงานลง job.json แบบ atomic (process อื่นอ่านได้โดยไม่เห็นไฟล์ที่เขียนไม่ครบ)
+        folder = self.job_dir(job.id)
+        if folder is None:
+            return
+        data = job.to_dict()
+        if job.status == DONE:
+            data["result"] = job.result
+        try:
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, os.path.join(folder, JOB_STATE_NAME))
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error saving state of job {job.id}: {e}")
+
+    def _trim(self) -> None:
+        # ลบงานที่เสร็จแล้วที่เก่าที่สุดออกเมื่อเก็บเกิน keep_finished งาน พร้อมโฟลเดอร์ของงาน
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+            folder = self.job_dir(job_id)
+            if folder is not None:
+                shutil.rmtree(folder, ignore_errors=True)
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_default_job_queue() -> JobQueue:
+    """
+    คืนค่า JobQueue ที่ใช้ร่วมกันภายใน process (โฟลเดอร์ของงานอยู่ที่ OCR_AI_JOBS_DIR)
+    """
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue(jobs_dir=DEFAULT_JOBS_DIR)
+        return _default_queue
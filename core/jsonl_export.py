@@ -0,0 +1,172 @@
+# project/core/jsonl_export.py
+
+import os
+import json
+
+# ขนาดสูงสุดของแต่ละ shard ก่อนเริ่ม shard ใหม่ (64 MB)
+DEFAULT_SHARD_BYTES = 64 * 1024 * 1024
+INDEX_NAME = "index.jsonl"
+MANIFEST_NAME = "manifest.json"
+
+
+def _dumps(record) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+def iter_annotations_jsonl(annotations):
+    """
+    แปลง Annotation ทีละตัวเป็นบรรทัด JSON (ลงท้ายด้วย newline) โดยไม่สร้าง string ของทั้งชุดใน memory
+    annotations เป็น iterable ใดก็ได้ (เช่น generator จากฐานข้อมูล)
+    """
+    for anno in annotations:
+        yield _dumps(anno.to_dict()) + "\n"
+
+
+def iter_records_jsonl(records, chunk_records: int = 1000):
+    """
+    แปลง record (dict) เป็นบรรทัด JSON รวมเป็นก้อนละ chunk_records บรรทัด (สำหรับ streaming response)
+    """
+    chunk = []
+    for record in records:
+        chunk.append(_dumps(record))
+        if len(chunk) >= chunk_records:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def iter_json_array(records, chunk_records: int = 1000):
+    """
+    แปลง record เป็น JSON array ทีละก้อน ได้ผลเดียวกับ json.dumps(list(records)) แบบ compact
+    โดยไม่ต้องสร้าง list หรือ string ของทั้งชุดใน memory
+    """
+    yield "["
+    first = True
+    chunk = []
+    for record in records:
+        chunk.append(_dumps(record))
+        if len(chunk) >= chunk_records:
+            yield ("" if first else ",") + ",".join(chunk)
+            first = False
+            chunk = []
+    if chunk:
+        yield ("" if first else ",") + ",".join(chunk)
+    yield "]"
+
+
+def write_jsonl(records, path: str) -> int:
+    """
+    เขียน record (dict) ทีละบรรทัดลงไฟล์ path คืนค่าจำนวน record ที่เขียน
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(_dumps(record) + "\n")
+            count += 1
+    return count
+
+
+def iter_jsonl(path: str):
+    """
+    อ่านไฟล์ JSONL ทีละบรรทัด (ใช้ memory คงที่ไม่ว่าไฟล์จะใหญ่แค่ไหน)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ShardedJsonlWriter:
+    """
+    เขียนชุดข้อมูลเป็น JSONL หลายไฟล์ (shard-00000.jsonl, ...) ขนาดไม่เกิน shard_max_bytes ต่อไฟล์
+    พร้อม index.jsonl ที่บอกตำแหน่ง (shard, offset, length) ของ record ของแต่ละ (document, page)
+    เขียนแบบ streaming: เก็บใน memory เฉพาะ record ที่กำลังเขียน
+    """
+    def __init__(self, directory: str, shard_max_bytes: int = DEFAULT_SHARD_BYTES):
+        self.directory = directory
+        self.shard_max_bytes = shard_max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._index = open(os.path.join(directory, INDEX_NAME), "w", encoding="utf-8")
+        self._shard = None
+        self._shard_name = None
+        self._shard_bytes = 0
+        self.shards = []
+        self.records = 0
+
+    def write(self, document: str, page: int, record: dict) -> int:
+        """
+        เขียน record ของ (document, page) คืนค่าจำนวน bytes ที่เขียน
+        """
+        data = (_dumps(record) + "\n").encode("utf-8")
+        if self._shard is None or (self._shard_bytes and self._shard_bytes + len(data) > self.shard_max_bytes):
+            self._open_next_shard()
+        offset = self._shard_bytes
+        self._shard.write(data)
+        self._shard_bytes += len(data)
+        self._index.write(_dumps({"document": document, "page": page, "shard": self._shard_name,
+                                  "offset": offset, "length": len(data)}) + "\n")
+        self.records += 1
+        return len(data)
+
+    def close(self) -> None:
+        if self._shard is not None:
+            self._shard.close()
+            self._shard = None
+        if not self._index.closed:
+            self._index.close()
+            manifest = {"shards": self.shards, "records": self.records, "index": INDEX_NAME}
+            with open(os.path.join(self.directory, MANIFEST_NAME), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _open_next_shard(self) -> None:
+        if self._shard is not None:
+            self._shard.close()
+        self._shard_name = f"shard-{len(self.shards):05d}.jsonl"
+        self.shards.append(self._shard_name)
+        self._shard = open(os.path.join(self.directory, self._shard_name), "wb")
+        self._shard_bytes = 0
+
+
+class ShardedJsonlReader:
+    """
+    อ่านชุดข้อมูลที่เขียนด้วย ShardedJsonlWriter
+    get(document, page) อ่านเฉพาะ record นั้นด้วย seek โดยไม่ต้อง parse shard ทั้งไฟล์
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        # index มีเฉพาะตำแหน่งของแต่ละหน้า จึงเล็กกว่าข้อมูลจริงมาก
+        self._index = {}
+        for entry in iter_jsonl(os.path.join(directory, self.manifest["index"])):
+            self._index[(entry["document"], entry["page"])] = (entry["shard"], entry["offset"], entry["length"])
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def keys(self) -> list:
+        return list(self._index)
+
+    def get(self, document: str, page: int):
+        location = self._index.get((document, page))
+        if location is None:
+            return None
+        shard, offset, length = location
+        with open(os.path.join(self.directory, shard), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def __iter__(self):
+        # อ่านทุก record ตามลำดับที่เขียน ทีละ shard
+        for shard in self.manifest["shards"]:
+            yield from iter_jsonl(os.path.join(self.directory, shard))
@@ -0,0 +1,241 @@
+# project/core/ocr.py
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.disk_cache import DEFAULT_CACHE_DIR
+
+# จำนวนกล่องที่ส่งให้ backend ต่อครั้ง
+DEFAULT_BATCH_SIZE = 32
+# ตำแหน่งเริ่มต้นของ cache ผล OCR บนดิสก์
+DEFAULT_OCR_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "ocr")
+# backend ที่ GUI ใช้ OCR หน้าที่ไม่มี text layer ตอน export (กำหนดได้ด้วย OCR_AI_OCR_BACKEND เช่น "tesseract")
+DEFAULT_OCR_BACKEND = os.environ.get("OCR_AI_OCR_BACKEND") or None
+
+
+class OcrBackend:
+    """
+    ส่วนต่อประสานของ OCR backend: รับ list ของภาพ (PIL) แล้วคืน list ของ (text, confidence)
+    backend ต้องเรียกจากหลาย thread พร้อมกันได้
+    """
+    name = "base"
+
+    def recognize_batch(self, images: list) -> list:
+        raise NotImplementedError
+
+
+class StubOcrBackend(OcrBackend):
+    """
+    backend จำลองสำหรับทดสอบและใช้งานแบบ offline ไม่ต้องติดตั้ง OCR engine
+    ข้อความที่คืนคือขนาดของภาพ และค่าความเชื่อมั่นคือสัดส่วนของ pixel สีเข้ม
+    """
+    name = "stub"
+
+    def __init__(self):
+        self.calls = 0
+        self.images = 0
+        self._lock = threading.Lock()
+
+    def recognize_batch(self, images: list) -> list:
+        with self._lock:
+            self.calls += 1
+            self.images += len(images)
+        results = []
+        for image in images:
+            gray = image.convert("L")
+            histogram = gray.histogram()
+            dark = sum(histogram[:128])
+            total = max(1, gray.width * gray.height)
+            results.append((f"{gray.width}x{gray.height}", round(dark / total, 4)))
+        return results
+
+
+class TesseractOcrBackend(OcrBackend):
+    """
+    OCR ด้วย Tesseract ผ่าน pytesseract (ต้องติดตั้ง pytesseract และ tesseract)
+    """
+    name = "tesseract"
+
+    def __init__(self, lang: str = "tha+eng"):
+        import pytesseract
+        self._pytesseract = pytesseract
+        self.lang = lang
+
+    def recognize_batch(self, images: list) -> list:
+        results = []
+        for image in images:
+            data = self._pytesseract.image_to_data(image, lang=self.lang,
+                                                   output_type=self._pytesseract.Output.DICT)
+            words = []
+            confidences = []
+            for text, conf in zip(data["text"], data["conf"]):
+                if text.strip() and float(conf) >= 0:
+                    words.append(text)
+                    confidences.append(float(conf) / 100.0)
+            confidence = sum(confidences) / len(confidences) if confidences else 0.0
+            results.append((" ".join(words), confidence))
+        return results
+
+
+OCR_BACKENDS = {
+    "stub": StubOcrBackend,
+    "tesseract": TesseractOcrBackend,
+}
+
+
+def get_ocr_backend(name: str) -> OcrBackend:
+    """
+    สร้าง backend จากชื่อ (ใช้ใน worker process ที่ส่ง object ข้าม process ไม่ได้)
+    """
+    try:
+        backend_class = OCR_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown OCR backend: {name}")
+    return backend_class()
+
+
+def bbox_key(bbox) -> str:
+    # ปัดพิกัดเป็นจำนวนเต็ม เพื่อให้กล่องที่ต่างกันเศษเล็กน้อยใช้ผลเดียวกัน
+    return ",".join(str(int(round(v))) for v in bbox)
+
+
+def page_hash(content_hash: str, page: int, zoom: float, colorspace: str = "rgb") -> str:
+    """
+    key ของภาพหน้าที่ render: เปลี่ยนเมื่อเนื้อหาไฟล์, หน้า, ความละเอียด หรือ colorspace เปลี่ยน
+    """
+    key = f"{content_hash}:{page}:{zoom:g}"
+    if colorspace != "rgb":
+        key += f":{colorspace}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class OcrCache:
+    """
+    Cache ผล OCR ตาม (page hash, bbox) เก็บใน memory และบนดิสก์หนึ่งไฟล์ต่อหน้า
+    (<directory>/<hash[:2]>/<hash>.json) จึงอ่านเฉพาะหน้าที่ใช้ และใช้ร่วมกันระหว่าง process ได้
+    ถ้า directory เป็น None จะเก็บใน memory อย่างเดียว
+    """
+    def __init__(self, directory: str = None):
+        self.directory = directory
+        self._pages = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_page(self, page_key: str) -> dict:
+        with self._lock:
+            entries = self._pages.get(page_key)
+        if entries is None:
+            entries = self._load(page_key)
+            with self._lock:
+                entries = self._pages.setdefault(page_key, entries)
+        return entries
+
+    def lookup(self, page_key: str, boxes: list) -> list:
+        """
+        คืน list ผล (text, confidence) ตามลำดับ boxes โดยกล่องที่ยังไม่มีใน cache เป็น None
+        """
+        entries = self.get_page(page_key)
+        results = [entries.get(bbox_key(bbox)) for bbox in boxes]
+        found = sum(1 for r in results if r is not None)
+        with self._lock:
+            self.hits += found
+            self.misses += len(results) - found
+        return [tuple(r) if r is not None else None for r in results]
+
+    def store(self, page_key: str, boxes: list, results: list) -> None:
+        entries = self.get_page(page_key)
+        with self._lock:
+            for bbox, result in zip(boxes, results):
+                entries[bbox_key(bbox)] = list(result)
+            snapshot = dict(entries)
+        self._save(page_key, snapshot)
+
+    def _path(self, page_key: str) -> str:
+        return os.path.join(self.directory, page_key[:2], page_key + ".json")
+
+    def _load(self, page_key: str) -> dict:
+        if self.directory is None:
+            return {}
+        try:
+            with open(self._path(page_key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, page_key: str, entries: dict) -> None:
+        if self.directory is None:
+            return
+        path = self._path(page_key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing OCR cache: {e}")
+
+
+class OcrStage:
+    """
+    ขั้นตอน OCR ของกล่อง annotation บนภาพหน้าที่ render แล้ว
+    ตัดภาพเฉพาะกล่องที่ยังไม่มีผลใน cache แบ่งเป็น batch แล้วส่งให้ backend บน thread pool
+    """
+    def __init__(self, backend: OcrBackend, cache: OcrCache = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE, max_workers: int = 2):
+        self.backend = backend
+        self.cache = cache if cache is not None else OcrCache()
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def recognize_page(self, page_image, page_key: str, boxes: list) -> list:
+        """
+        OCR กล่อง boxes ([x1, y1, x2, y2] ในพิกัด pixel ของ page_image)
+        page_image เป็นภาพ PIL หรือฟังก์ชันที่คืนภาพ (เรียกเฉพาะเมื่อมีกล่องที่ต้อง OCR จริง)
+        คืนค่า list ของ (text, confidence) ตามลำดับ boxes
+        """
+        results = self.cache.lookup(page_key, boxes)
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+        if callable(page_image):
+            page_image = page_image()
+        crops = [self._crop(page_image, boxes[i]) for i in missing]
+        batches = [(missing[start:start + self.batch_size], crops[start:start + self.batch_size])
+                   for start in range(0, len(missing), self.batch_size)]
+        executor = self._get_executor()
+        futures = [(indices, executor.submit(self.backend.recognize_batch, images))
+                   for indices, images in batches]
+        for indices, future in futures:
+            for i, result in zip(indices, future.result()):
+                results[i] = tuple(result)
+        self.cache.store(page_key, [boxes[i] for i in missing], [results[i] for i in missing])
+        return results
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    @staticmethod
+    def _crop(image, bbox):
+        x1, y1, x2, y2 = bbox
+        # ปัดทั้งสองด้านแบบเดียวกัน เพราะกล่องที่แปลงมาจากพิกัดอื่นมักเป็นเศษทศนิยม
+        left = max(0, min(int(round(x1)), image.width))
+        top = max(0, min(int(round(y1)), image.height))
+        right = max(left + 1, min(int(round(x2)), image.width))
+        bottom = max(top + 1, min(int(round(y2)), image.height))
+        return image.crop((left, top, right, bottom))
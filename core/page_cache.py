@@ -0,0 +1,122 @@
+# project/core/page_cache.py
+
+import threading
+from collections import OrderedDict
+
+# งบประมาณหน่วยความจำเริ่มต้นของ cache (256 MB)
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+
+
+def estimate_image_bytes(image) -> int:
+    """
+    ประมาณขนาดหน่วยความจำของภาพที่ render แล้ว (QPixmap, QImage, bytes หรือ numpy array)
+    """
+    if hasattr(image, "sizeInBytes"):  # QImage
+        return int(image.sizeInBytes())
+    if hasattr(image, "depth") and hasattr(image, "width"):  # QPixmap
+        return int(image.width() * image.height() * max(image.depth(), 8) // 8)
+    if hasattr(image, "nbytes"):  # numpy array / memoryview
+        return int(image.nbytes)
+    try:
+        return len(image)
+    except TypeError:
+        return 0
+
+
+class PageImageCache:
+    """
+    Cache ของภาพหน้าที่ render แล้ว แบบ LRU จำกัดตามจำนวน byte
+    key คือ (file, page, zoom) และเก็บสถิติ hit/miss/eviction
+    ใช้งานได้จากหลาย thread พร้อมกัน
+    """
+    def __init__(self, budget_bytes: int = DEFAULT_BUDGET_BYTES, size_fn=estimate_image_bytes):
+        self.budget_bytes = budget_bytes
+        self.size_fn = size_fn
+        self._entries = OrderedDict()  # key -> (image, size)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(filepath: str, page: int, zoom) -> tuple:
+        return (filepath, page, zoom)
+
+    def get(self, filepath: str, page: int, zoom):
+        key = self.make_key(filepath, page, zoom)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, filepath: str, page: int, zoom, image) -> None:
+        key = self.make_key(filepath, page, zoom)
+        size = self.size_fn(image)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            # ภาพที่ใหญ่กว่างบประมาณทั้งหมดจะไม่ถูกเก็บ
+            if size > self.budget_bytes:
+                return
+            self._entries[key] = (image, size)
+            self.current_bytes += size
+            self._evict_locked()
+
+    def get_or_render(self, filepath: str, page: int, zoom, render_fn):
+        """
+        คืนค่าภาพจาก cache ถ้ามี มิฉะนั้นเรียก render_fn() แล้วเก็บผลลัพธ์ไว้
+        """
+        image = self.get(filepath, page, zoom)
+        if image is None:
+            image = render_fn()
+            self.put(filepath, page, zoom, image)
+        return image
+
+    def contains(self, filepath: str, page: int, zoom) -> bool:
+        with self._lock:
+            return self.make_key(filepath, page, zoom) in self._entries
+
+    def set_budget(self, budget_bytes: int) -> None:
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            self._evict_locked()
+
+    def invalidate_file(self, filepath: str) -> None:
+        """
+        ลบภาพทั้งหมดของไฟล์ที่ระบุออกจาก cache (เช่น เมื่อปิดเอกสาร)
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == filepath]:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _evict_locked(self):
+        while self.current_bytes > self.budget_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
@@ -0,0 +1,103 @@
+# project/core/page_render.py
+
+import threading
+from core.render_profiles import EXPORT_PROFILE, render_pixmap, pil_for_profile, document_key, page_pixel_size
+
+# นามสกุลไฟล์เอกสารที่ render ได้
+PDF_EXTENSIONS = (".pdf",)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff")
+
+
+def pixmap_to_pil(pix):
+    """
+    แปลง fitz.Pixmap เป็นภาพ PIL ("L", "RGB" หรือ "RGBA" ตามจำนวน channel)
+    """
+    from PIL import Image
+    mode = {1: "L", 3: "RGB", 4: "RGBA"}.get(pix.n)
+    if mode is None or (pix.n == 4 and not pix.alpha):
+        import fitz
+        pix, mode = fitz.Pixmap(fitz.csRGB, pix), "RGB"
+    return Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+
+
+class PageRenderer:
+    """
+    render หน้าของ PDF (ด้วย MuPDF) หรือไฟล์ภาพ (ด้วย PIL แต่ละ frame คือหนึ่งหน้า) ตาม RenderProfile
+    ไม่ใช้ Qt จึงใช้ได้ใน API, worker process และเครื่องมือ batch
+    การเข้าถึงเอกสารถูกป้องกันด้วย lock เพื่อให้เรียกจากหลาย thread ได้
+    """
+    def __init__(self, document_path: str):
+        self.document_path = document_path
+        self.is_pdf = document_path.lower().endswith(PDF_EXTENSIONS)
+        self._lock = threading.RLock()
+        if self.is_pdf:
+            import fitz
+            self.document = fitz.open(document_path)
+            # key ของผลการตรวจสีของหน้า (colorspace "auto") ที่ใช้ร่วมกับแหล่งหน้าอื่นของไฟล์เดียวกัน
+            self.document_key = document_key(document_path)
+        else:
+            from PIL import Image
+            # Image.open อ่านเฉพาะ header จึงไม่ต้อง decode ภาพทั้งภาพจนกว่าจะ render
+            self.document = Image.open(document_path)
+
+    @property
+    def page_count(self) -> int:
+        if self.is_pdf:
+            return self.document.page_count
+        return getattr(self.document, "n_frames", 1)
+
+    def page_size(self, index: int, zoom: float = 1.0) -> tuple:
+        """
+        ขนาดหน้า (width, height) เป็น pixel ที่ zoom (ไฟล์ภาพใช้ pixel ของภาพต้นฉบับเสมอ)
+        """
+        with self._lock:
+            self._check(index)
+            if self.is_pdf:
+                rect = self.document[index].rect
+                return page_pixel_size(rect, zoom)
+            self.document.seek(index)
+            return self.document.size
+
+    def render_image(self, index: int, profile=EXPORT_PROFILE):
+        """
+        ภาพ PIL ของหน้าที่ index ตาม profile (PDF ใช้ dpi ของ profile, ไฟล์ภาพใช้ความละเอียดเดิม)
+        """
+        with self._lock:
+            self._check(index)
+            if self.is_pdf:
+                return pixmap_to_pil(render_pixmap(self.document[index], profile, key=self.document_key))
+            self.document.seek(index)
+            image = pil_for_profile(self.document, profile)
+            return image.copy() if image is self.document else image
+
+    def save_png(self, index: int, path: str, profile=EXPORT_PROFILE) -> tuple:
+        """
+        render หน้าที่ index เป็นไฟล์ PNG คืนค่าขนาดภาพ (width, height)
+        """
+        if self.is_pdf:
+            with self._lock:
+                self._check(index)
+                pix = render_pixmap(self.document[index], profile, key=self.document_key)
+            pix.save(path)
+            return (pix.width, pix.height)
+        image = self.render_image(index, profile)
+        image.save(path, format="PNG")
+        return image.size
+
+    def close(self) -> None:
+        with self._lock:
+            if self.document is not None:
+                self.document.close()
+                self.document = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _check(self, index: int) -> None:
+        if self.document is None:
+            raise ValueError("Document is closed")
+        if index < 0 or index >= self.page_count:
+            raise IndexError(f"Page index {index} out of range")
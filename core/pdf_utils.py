@@ -1,20 +1,42 @@
-import fitz  # PyMuPDF
-from PyQt6.QtGui import QImage, QPixmap
+# project/core/pdf_utils.py
+#
+# ส่วนของการ render PDF ที่ไม่ขึ้นกับ Qt (ใช้ได้ทั้ง GUI, API และเครื่องมือ batch)
+# แหล่งหน้าที่คืนค่าเป็น QImage/QPixmap อยู่ใน gui/pdf_source.py
 
-def pdf_to_pixmap_list(filepath: str) -> list:
+import re
+from core.render_profiles import VIEWING_PROFILE
+
+# zoom factor เริ่มต้นสำหรับการแสดงผล (216 dpi ของ VIEWING_PROFILE)
+DEFAULT_ZOOM = VIEWING_PROFILE.zoom
+# ขนาดกรอบของ thumbnail (pixel)
+THUMBNAIL_SIZE = 100
+
+# ส่วนหัวของ PPM/PGM แบบ binary: magic, width, height, maxval ตามด้วย whitespace หนึ่งตัว
+_PNM_HEADER = re.compile(rb"(P[56])\s+(\d+)\s+(\d+)\s+(\d+)\s")
+
+
+def pixmap_to_ppm(pix) -> bytes:
+    """
+    สร้าง PPM (หรือ PGM สำหรับภาพ grayscale) จาก samples ของ pix โดยตรง สำหรับเก็บลง disk cache
+    """
+    if pix.alpha or pix.n not in (1, 3):
+        return pix.tobytes("ppm")
+    magic = b"P5" if pix.n == 1 else b"P6"
+    return b"".join((b"%s\n%d %d\n255\n" % (magic, pix.width, pix.height), pix.samples_mv))
+
+
+def parse_pnm(data: bytes):
     """
-    เปิดไฟล์ PDF และแปลงแต่ละหน้าเป็น QPixmap แบบ full resolution
+    อ่านส่วนหัวของ PPM/PGM แบบ binary 8 bit คืนค่า (channels, width, height, pixels)
+    โดย pixels เป็น memoryview ของ data (ไม่คัดลอก) หรือ None ถ้าไม่ใช่รูปแบบนี้หรือข้อมูลไม่ครบ
     """
-    pixmap_list = []
-    doc = fitz.open(filepath)
-    # กำหนด zoom factor สูงขึ้นเพื่อให้ได้ความละเอียดที่ดี
-    zoom = 3.0  # ปรับค่าได้ตามต้องการ
-    mat = fitz.Matrix(zoom, zoom)
-    for page_num in range(doc.page_count):
-        page = doc.load_page(page_num)
-        pix = page.get_pixmap(matrix=mat)
-        img_data = pix.tobytes("ppm")
-        image = QImage.fromData(img_data)
-        full_pixmap = QPixmap.fromImage(image)
-        pixmap_list.append(full_pixmap)
-    return pixmap_list
+    match = _PNM_HEADER.match(data)
+    if match is None or match.group(4) != b"255":
+        return None
+    channels = 1 if match.group(1) == b"P5" else 3
+    width, height = int(match.group(2)), int(match.group(3))
+    size = width * channels * height
+    pixels = memoryview(data)[match.end():match.end() + size]
+    if len(pixels) < size:
+        return None
+    return channels, width, height, pixels
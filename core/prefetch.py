@@ -0,0 +1,121 @@
+# project/core/prefetch.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# จำนวนหน้าก่อน/หลังหน้าปัจจุบันที่จะ render ล่วงหน้า
+DEFAULT_PREFETCH_WINDOW = 2
+
+
+def prefetch_order(center: int, page_count: int, window: int) -> list:
+    """
+    คืนค่าลำดับหน้าที่ควร render ล่วงหน้า เรียงจากใกล้หน้าปัจจุบันไปไกล
+    เช่น center=5, window=2 -> [6, 4, 7, 3]
+    """
+    order = []
+    for distance in range(1, window + 1):
+        for index in (center + distance, center - distance):
+            if 0 <= index < page_count:
+                order.append(index)
+    return order
+
+
+class PrefetchScheduler:
+    """
+    ตัวจัดลำดับการ render หน้าข้างเคียงล่วงหน้าบน thread pool
+      - render_fn(index): ถูกเรียกบน worker thread และคืนค่าภาพที่ render แล้ว
+      - on_ready(index, image): ถูกเรียกบน worker thread เมื่อ render เสร็จ
+        (ฝั่ง GUI ต้องส่งต่อผลลัพธ์เข้า main thread เอง)
+      - is_cached(index): ถ้าคืนค่า True หน้านั้นจะไม่ถูก render ซ้ำ
+    งานที่อยู่นอก window ของหน้าปัจจุบันจะถูกยกเลิก และผลลัพธ์ที่ค้างอยู่จะถูกทิ้ง
+    """
+    def __init__(self, render_fn, on_ready, is_cached=None,
+                 window: int = DEFAULT_PREFETCH_WINDOW, max_workers: int = 2):
+        self.render_fn = render_fn
+        self.on_ready = on_ready
+        self.is_cached = is_cached
+        self.window = window
+        self.max_workers = max_workers
+        self._executor = None
+        self._pending = {}  # index -> (ticket, Future)
+        self._next_ticket = 0
+        self._wanted = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def schedule(self, center: int, page_count: int) -> list:
+        """
+        กำหนดหน้าปัจจุบันใหม่ ยกเลิกงานที่อยู่ไกลเกิน window และส่งงานของหน้าข้างเคียงเข้า pool
+        คืนค่ารายการ index ที่ถูกส่งเข้า pool ในรอบนี้
+        """
+        return self.schedule_pages(prefetch_order(center, page_count, self.window))
+
+    def schedule_pages(self, order: list) -> list:
+        """
+        กำหนดชุดหน้าที่ต้องการใหม่ตามลำดับความสำคัญ งานของหน้าที่ไม่อยู่ในชุดจะถูกยกเลิก
+        (ใช้กับรายการที่ไม่ได้อิงหน้าปัจจุบัน เช่น แถวของ thumbnail ที่มองเห็นอยู่)
+        """
+        submitted = []
+        with self._lock:
+            if self._closed:
+                return submitted
+            self._wanted = set(order)
+            for index in list(self._pending):
+                if index not in self._wanted:
+                    # งานที่ยังไม่เริ่มจะถูกยกเลิก งานที่กำลังทำอยู่จะถูกทิ้งผลลัพธ์
+                    self._pending.pop(index)[1].cancel()
+            for index in order:
+                if index in self._pending:
+                    continue
+                if self.is_cached is not None and self.is_cached(index):
+                    continue
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="prefetch")
+                self._next_ticket += 1
+                ticket = self._next_ticket
+                self._pending[index] = (ticket, self._executor.submit(self._run, index, ticket))
+                submitted.append(index)
+        return submitted
+
+    def cancel_all(self) -> None:
+        with self._lock:
+            self._wanted = set()
+            for _, future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+        self.cancel_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def pending_pages(self) -> list:
+        with self._lock:
+            return sorted(self._pending)
+
+    def _release(self, index: int, ticket: int) -> None:
+        # ลบงานออกจาก _pending เฉพาะเมื่อยังเป็นงานเดิม (หน้านั้นอาจถูกส่งเข้า pool ใหม่แล้ว)
+        entry = self._pending.get(index)
+        if entry is not None and entry[0] == ticket:
+            del self._pending[index]
+
+    def _run(self, index: int, ticket: int):
+        with self._lock:
+            if self._closed or index not in self._wanted:
+                self._release(index, ticket)
+                return None
+        try:
+            image = self.render_fn(index)
+        except Exception as e:
+            print(f"Error prefetching page {index}: {e}")
+            image = None
+        with self._lock:
+            self._release(index, ticket)
+            deliver = image is not None and not self._closed and index in self._wanted
+        if deliver:
+            self.on_ready(index, image)
+        return image
@@ -0,0 +1,195 @@
+# project/core/render_profiles.py
+
+import os
+import threading
+from collections import OrderedDict
+
+# จำนวน point ของ PDF ต่อนิ้ว (zoom 1.0 = 72 dpi)
+POINTS_PER_INCH = 72.0
+COLORSPACES = ("rgb", "gray", "auto")
+# ความต่างสูงสุดระหว่าง channel ที่ยังถือว่าเป็นสีเทา (ภาพสแกน JPEG มักมี noise ของสีเล็กน้อย)
+GRAY_TOLERANCE = 8
+# zoom ของภาพตัวอย่างขนาดเล็กที่ใช้ตรวจว่าหน้าไม่มีสี (18 dpi)
+GRAY_PROBE_ZOOM = 0.25
+# จำนวนหน้าที่จำผลการตรวจสีไว้ (ใช้ร่วมกันทุกแหล่งหน้าใน process)
+GRAYSCALE_CACHE_SIZE = 4096
+
+
+class RenderProfile:
+    """
+    การตั้งค่าการ render หน้าของงานหนึ่ง ๆ: ความละเอียด (dpi), colorspace และ alpha
+    colorspace "auto" จะ render หน้าที่ไม่มีสี (เช่น ภาพสแกนขาวดำ) เป็น grayscale หนึ่ง channel
+    และหน้าอื่นเป็น RGB
+    """
+    def __init__(self, name: str, dpi: float, colorspace: str = "rgb", alpha: bool = False):
+        if colorspace not in COLORSPACES:
+            raise ValueError(f"Unknown colorspace: {colorspace}")
+        self.name = name
+        self.dpi = dpi
+        self.colorspace = colorspace
+        self.alpha = alpha
+
+    @property
+    def zoom(self) -> float:
+        return self.dpi / POINTS_PER_INCH
+
+    def replace(self, **changes):
+        """
+        คืนค่า profile ใหม่ที่เปลี่ยนเฉพาะค่าที่กำหนด เช่น OCR_PROFILE.replace(dpi=400)
+        """
+        values = {"name": self.name, "dpi": self.dpi, "colorspace": self.colorspace, "alpha": self.alpha}
+        values.update(changes)
+        return RenderProfile(**values)
+
+    def cache_tag(self, grayscale: bool = None) -> tuple:
+        """
+        ส่วนที่ต้องเพิ่มใน key ของ cache เมื่อภาพต่างจาก RGB ปกติ
+        colorspace "auto" ต้องระบุผลการตรวจของหน้า (grayscale) หน้าที่ไม่มีสีจึงใช้ key เดียวกับ "gray"
+        และหน้าที่มีสีใช้ key เดียวกับ "rgb" (ภาพเหมือนกัน)
+        """
+        if self.colorspace == "auto" and grayscale is None:
+            raise ValueError("cache_tag of an auto profile needs the page's grayscale result")
+        tag = ()
+        if self.colorspace == "gray" or (self.colorspace == "auto" and grayscale):
+            tag += ("gray",)
+        if self.alpha:
+            tag += ("alpha",)
+        return tag
+
+    def __eq__(self, other):
+        return (isinstance(other, RenderProfile) and
+                (self.name, self.dpi, self.colorspace, self.alpha) ==
+                (other.name, other.dpi, other.colorspace, other.alpha))
+
+    def __repr__(self):
+        return f"RenderProfile({self.name}, {self.dpi:g} dpi, {self.colorspace}, alpha={self.alpha})"
+
+
+# การแสดงผลบน canvas: 216 dpi (zoom 3.0 ซึ่งเป็นพิกัดของ annotation)
+VIEWING_PROFILE = RenderProfile("viewing", 216, "auto")
+# thumbnail ถูกย่อให้พอดีกรอบ จึงใช้เฉพาะ colorspace
+THUMBNAIL_PROFILE = RenderProfile("thumbnail", 72, "auto")
+# OCR ต้องการความละเอียดสูงแต่ไม่ต้องการสี
+OCR_PROFILE = RenderProfile("ocr", 300, "gray")
+# ภาพที่ export ไปพร้อมชุดข้อมูล
+EXPORT_PROFILE = RenderProfile("export", 216, "auto")
+
+RENDER_PROFILES = {profile.name: profile for profile in
+                   (VIEWING_PROFILE, THUMBNAIL_PROFILE, OCR_PROFILE, EXPORT_PROFILE)}
+
+
+def get_render_profile(name: str) -> RenderProfile:
+    try:
+        return RENDER_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown render profile: {name}")
+
+
+def page_pixel_size(rect, zoom: float) -> tuple:
+    """
+    ขนาด (width, height) เป็น pixel ของหน้าขนาด rect (point ของ PDF) ที่ zoom
+    ปัดเศษแบบเดียวกันทุกที่ (canvas, render และ export) จึงได้พิกัดตรงกัน เช่น A4 ที่ zoom 3 กว้าง 1786 pixel
+    """
+    return (round(rect.width * zoom), round(rect.height * zoom))
+
+
+def to_points(bbox, zoom: float) -> list:
+    """
+    แปลง bbox [x1, y1, x2, y2] จาก pixel ของภาพที่ render ที่ zoom เป็นหน่วย point ของ PDF
+    """
+    return [v / zoom for v in bbox]
+
+
+def from_points(bbox, zoom: float) -> list:
+    """
+    แปลง bbox [x1, y1, x2, y2] จากหน่วย point ของ PDF เป็น pixel ของภาพที่ render ที่ zoom
+    """
+    return [v * zoom for v in bbox]
+
+
+def samples_are_gray(samples, channels: int, tolerance: int = GRAY_TOLERANCE) -> bool:
+    """
+    ตรวจว่า pixel แบบ interleaved (เช่น samples ของ fitz.Pixmap หรือ bytes ของภาพ PIL) ไม่มีสี
+    """
+    import numpy as np
+    if channels < 3:
+        return True
+    pixels = np.frombuffer(samples, dtype=np.uint8).reshape(-1, channels)[:, :3].astype(np.int16)
+    if len(pixels) == 0:
+        return True
+    spread = pixels.max(axis=1) - pixels.min(axis=1)
+    return int(spread.max()) <= tolerance
+
+
+_grayscale_cache = OrderedDict()  # (document key, page number) -> bool
+_grayscale_lock = threading.Lock()
+
+
+def document_key(path: str):
+    """
+    key ของไฟล์เอกสารสำหรับจำผลการตรวจสี (path, ขนาด, เวลาแก้ไข) หรือ None ถ้าอ่าน stat ไม่ได้
+    เปิดไฟล์เดิมใหม่จึงไม่ต้องตรวจซ้ำ และไฟล์ที่ถูกแก้ไขจะได้ key ใหม่
+    """
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def page_is_grayscale(page, key=None) -> bool:
+    """
+    ตรวจว่าหน้า PDF (fitz.Page) ไม่มีสี โดย render ภาพตัวอย่างความละเอียดต่ำแล้วตรวจ pixel
+    ครอบคลุมทั้งข้อความ เส้น และภาพที่ฝังไว้ไม่ว่าจะเก็บด้วย colorspace ใด
+    ถ้ากำหนด key (เช่น document_key ของไฟล์) ผลจะถูกจำไว้ต่อหน้า ทุกแหล่งหน้าที่เปิดไฟล์เดียวกัน
+    (viewer, thumbnail, งาน render/export) จึงตรวจแต่ละหน้าเพียงครั้งเดียว
+    """
+    if key is not None:
+        with _grayscale_lock:
+            grayscale = _grayscale_cache.get((key, page.number))
+            if grayscale is not None:
+                _grayscale_cache.move_to_end((key, page.number))
+                return grayscale
+    import fitz
+    pix = page.get_pixmap(matrix=fitz.Matrix(GRAY_PROBE_ZOOM, GRAY_PROBE_ZOOM), alpha=False)
+    grayscale = samples_are_gray(pix.samples_mv, pix.n)
+    if key is not None:
+        with _grayscale_lock:
+            _grayscale_cache[(key, page.number)] = grayscale
+            while len(_grayscale_cache) > GRAYSCALE_CACHE_SIZE:
+                _grayscale_cache.popitem(last=False)
+    return grayscale
+
+
+def render_pixmap(page, profile: RenderProfile, scale: float = None, clip=None, grayscale: bool = None,
+                  key=None):
+    """
+    render หน้า PDF ตาม profile คืนค่า fitz.Pixmap
+    scale แทน profile.zoom ได้ (เช่น thumbnail ที่ย่อให้พอดีกรอบ)
+    grayscale คือ colorspace ของหน้าที่ผู้เรียกรู้แล้วสำหรับ colorspace "auto"
+    ถ้าไม่กำหนดจะตรวจด้วย page_is_grayscale(page, key)
+    """
+    import fitz
+    if scale is None:
+        scale = profile.zoom
+    if profile.colorspace == "gray":
+        grayscale = True
+    elif profile.colorspace == "rgb":
+        grayscale = False
+    elif grayscale is None:
+        grayscale = page_is_grayscale(page, key)
+    return page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip, alpha=profile.alpha,
+                           colorspace=fitz.csGRAY if grayscale else fitz.csRGB)
+
+
+def pil_for_profile(image, profile: RenderProfile):
+    """
+    แปลงภาพ PIL ให้ตรงกับ colorspace ของ profile ("L" สำหรับ grayscale มิฉะนั้น "RGB" หรือ "RGBA")
+    colorspace "auto" คงภาพที่เป็นสีเทาอยู่แล้ว (เช่น mode "1", "L", "I;16") ไว้เป็น "L"
+    """
+    if profile.colorspace == "gray" or (profile.colorspace == "auto" and
+                                        image.mode in ("1", "L", "LA", "I", "I;16", "F")):
+        mode = "L"
+    else:
+        mode = "RGBA" if profile.alpha else "RGB"
+    return image if image.mode == mode else image.convert(mode)
@@ -0,0 +1,65 @@
+# project/core/tiles.py
+
+import math
+
+# ขนาดของ tile (pixel ของอุปกรณ์แสดงผล)
+TILE_SIZE = 512
+# ระดับต่ำสุด/สูงสุดของ pyramid (ระดับ L render ที่ 2^L เท่าของพิกัด scene)
+MIN_LEVEL = -4
+MAX_LEVEL = 3
+
+
+def level_for_scale(view_scale: float, min_level: int = MIN_LEVEL, max_level: int = MAX_LEVEL) -> int:
+    """
+    เลือกระดับของ pyramid ที่ความละเอียดไม่ต่ำกว่า view_scale (pixel จอต่อ 1 หน่วย scene)
+    เช่น view_scale=1.0 -> 0, 1.5 -> 1, 0.3 -> -1
+    """
+    if view_scale <= 0:
+        return min_level
+    level = math.ceil(math.log2(view_scale) - 1e-9)
+    return max(min_level, min(max_level, level))
+
+
+def level_scale(level: int) -> float:
+    return 2.0 ** level
+
+
+def tile_scene_size(level: int, tile_size: int = TILE_SIZE) -> float:
+    """
+    ขนาดด้านของ tile ระดับ level ในหน่วยพิกัด scene
+    """
+    return tile_size / level_scale(level)
+
+
+def tile_scene_rect(level: int, tx: int, ty: int, width: float, height: float,
+                    tile_size: int = TILE_SIZE) -> tuple:
+    """
+    คืนค่า (x, y, w, h) ในพิกัด scene ของ tile (tx, ty) โดยตัดส่วนที่เกินขอบภาพออก
+    """
+    size = tile_scene_size(level, tile_size)
+    x = tx * size
+    y = ty * size
+    return (x, y, min(size, width - x), min(size, height - y))
+
+
+def tiles_for_rect(rect: tuple, level: int, width: float, height: float,
+                   tile_size: int = TILE_SIZE) -> list:
+    """
+    คืนค่ารายการ (tx, ty) ของ tile ระดับ level ที่ทับกับ rect (x, y, w, h) ในพิกัด scene
+    เรียงแถวจากบนลงล่าง
+    """
+    x, y, w, h = rect
+    x0 = max(0.0, x)
+    y0 = max(0.0, y)
+    x1 = min(width, x + w)
+    y1 = min(height, y + h)
+    if x1 <= x0 or y1 <= y0:
+        return []
+    size = tile_scene_size(level, tile_size)
+    first_col = int(x0 // size)
+    first_row = int(y0 // size)
+    last_col = int(math.ceil(x1 / size)) - 1
+    last_row = int(math.ceil(y1 / size)) - 1
+    return [(tx, ty)
+            for ty in range(first_row, last_row + 1)
+            for tx in range(first_col, last_col + 1)]
@@ -0,0 +1,194 @@
+# project/core/validation_backend.py
+
+import os
+import time
+import threading
+from concurrent.futures import Future
+
+from core.annotation import validate_annotations, format_validation_result
+
+# ค่าเริ่มต้นของ backend (กำหนดได้ด้วย environment variable)
+DEFAULT_MAX_WORKERS = int(os.environ.get("OCR_AI_VALIDATION_WORKERS", "1"))
+# จำนวนกล่องขั้นต่ำที่จะส่งไปตรวจใน process แยก (ต่ำกว่านี้ตรวจบน thread ของ process เดิมเร็วกว่า)
+DEFAULT_PROCESS_THRESHOLD = int(os.environ.get("OCR_AI_VALIDATION_PROCESS_THRESHOLD", "200000"))
+# จำนวนกล่องขั้นต่ำที่จะส่งข้อมูลผ่าน shared memory แทนการ pickle ต้องไม่ต่ำกว่า process threshold
+# มิฉะนั้นทุกชุดที่ส่งไป process จะใช้ shared memory และ backend "process" (pickle) จะไม่ถูกเลือกเลย
+DEFAULT_SHARED_MEMORY_THRESHOLD = max(
+    int(os.environ.get("OCR_AI_VALIDATION_SHM_THRESHOLD", "1000000")), DEFAULT_PROCESS_THRESHOLD
+)
+
+THRESHOLD = 0.8
+
+
+# ค่าในคอลัมน์หน้าของกล่องที่ไม่ระบุหน้า (Annotation.page เป็น None)
+NO_PAGE = -1
+
+
+def _boxes_array(annotations: list):
+    # คอลัมน์: x, y, width, height, page
+    import numpy as np
+    boxes = np.empty((len(annotations), 5), dtype=np.float64)
+    for i, anno in enumerate(annotations):
+        page = getattr(anno, "page", None)
+        boxes[i] = (anno.x, anno.y, anno.width, anno.height, NO_PAGE if page is None else page)
+    return boxes
+
+
+def _validate_boxes(boxes, threshold: float) -> (bool, str):
+    # ตรวจแยกตามหน้าเหมือน overlap_violations แล้วแปลง index กลับเป็นตำแหน่งใน boxes
+    import numpy as np
+    from core.annotation_batch import AnnotationBatch
+    pages = boxes[:, 4]
+    groups = np.unique(pages)
+    violations = []
+    for page in groups:
+        rows = np.flatnonzero(pages == page) if len(groups) > 1 else None
+        group = boxes if rows is None else boxes[rows]
+        batch = AnnotationBatch.from_arrays(group[:, 0], group[:, 1], group[:, 2], group[:, 3])
+        found = batch.find_overlaps(threshold)
+        if rows is not None:
+            found = [(int(rows[i]), int(rows[j]), overlap) for i, j, overlap in found]
+        violations.extend(found)
+    violations.sort()
+    return format_validation_result(violations, threshold)
+
+
+def _validate_in_worker(payload, threshold: float) -> (bool, str):
+    """
+    ถูกเรียกใน worker process: payload เป็น numpy array หรือ (ชื่อ shared memory, จำนวนกล่อง)
+    """
+    if isinstance(payload, tuple):
+        import numpy as np
+        from multiprocessing import shared_memory
+        name, count = payload
+        shm = shared_memory.SharedMemory(name=name)
+        boxes = None
+        try:
+            boxes = np.ndarray((count, 5), dtype=np.float64, buffer=shm.buf)
+            return _validate_boxes(boxes, threshold)
+        finally:
+            # ต้องปล่อย array ที่อ้างอิง buffer ก่อน close มิฉะนั้น close จะ raise BufferError
+            boxes = None
+            shm.close()
+    return _validate_boxes(payload, threshold)
+
+
+class ValidationBackend:
+    """
+    เลือกวิธีตรวจสอบ annotation ตามขนาดข้อมูล:
+      - thread: ตรวจใน process เดิมบน thread เบื้องหลังหนึ่ง thread (ชุดเล็กถึงกลาง ไม่มีค่าใช้จ่ายในการส่งข้อมูล
+        และไม่ block GUI thread)
+      - process: ส่งเฉพาะ array ของกล่องไปตรวจใน ProcessPoolExecutor ที่เริ่มเมื่อใช้งานครั้งแรก
+        ถ้าชุดใหญ่มากจะส่งผ่าน shared memory แทนการ pickle
+    เก็บเวลาที่ใช้และเหตุผลที่เลือก backend ไว้ใน last_timing
+    """
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                 process_threshold: int = DEFAULT_PROCESS_THRESHOLD,
+                 shared_memory_threshold: int = DEFAULT_SHARED_MEMORY_THRESHOLD,
+                 threshold: float = THRESHOLD):
+        self.max_workers = max(1, max_workers)
+        self.process_threshold = process_threshold
+        self.shared_memory_threshold = shared_memory_threshold
+        self.threshold = threshold
+        self._executor = None
+        self._thread_executor = None
+        self._lock = threading.Lock()
+        self.last_timing = None
+
+    def choose(self, count: int) -> (str, str):
+        """
+        คืนค่า (ชื่อ backend, เหตุผล) สำหรับจำนวนกล่อง count
+        """
+        if count < self.process_threshold:
+            return ("thread", f"{count} boxes < process threshold {self.process_threshold}")
+        if count >= self.shared_memory_threshold:
+            return ("process+shm", f"{count} boxes >= shared memory threshold {self.shared_memory_threshold}")
+        return ("process", f"{count} boxes >= process threshold {self.process_threshold}")
+
+    def submit(self, annotations: list) -> Future:
+        """
+        เริ่มตรวจสอบ annotations คืนค่า Future ที่ให้ผล (valid, message) ทันที (ไม่รอผลบน thread ที่เรียก)
+        """
+        started = time.perf_counter()
+        backend, reason = self.choose(len(annotations))
+        if backend == "thread":
+            # คัดลอก list ไว้ ผู้เรียก (GUI) เพิ่มหรือลบ annotation ต่อได้ระหว่างตรวจ
+            snapshot = list(annotations)
+
+            def run():
+                try:
+                    return validate_annotations(snapshot)
+                finally:
+                    self._record(backend, reason, len(snapshot), started, 0)
+            return self._get_thread_executor().submit(run)
+
+        boxes = _boxes_array(annotations)
+        executor = self._get_executor()
+        shm = None
+        if backend == "process+shm":
+            from multiprocessing import shared_memory
+            import numpy as np
+            shm = shared_memory.SharedMemory(create=True, size=max(1, boxes.nbytes))
+            try:
+                np.ndarray(boxes.shape, dtype=boxes.dtype, buffer=shm.buf)[:] = boxes
+                inner = executor.submit(_validate_in_worker, (shm.name, len(boxes)), self.threshold)
+            except BaseException:
+                # ส่งงานไม่สำเร็จ (เช่น pool ถูกปิดแล้ว) ต้องคืน shared memory เอง
+                shm.close()
+                shm.unlink()
+                raise
+            transfer_bytes = 0
+        else:
+            inner = executor.submit(_validate_in_worker, boxes, self.threshold)
+            transfer_bytes = boxes.nbytes
+
+        # Future ที่คืนให้ผู้เรียกจะเสร็จหลังจากคืน shared memory และบันทึกเวลาแล้ว
+        future = Future()
+
+        def finish(inner_future):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            self._record(backend, reason, len(annotations), started, transfer_bytes)
+            if inner_future.cancelled():
+                future.cancel()
+                future.set_running_or_notify_cancel()
+            elif inner_future.exception() is not None:
+                future.set_exception(inner_future.exception())
+            else:
+                future.set_result(inner_future.result())
+        inner.add_done_callback(finish)
+        return future
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for executor in (self._executor, self._thread_executor):
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._thread_executor = None
+
+    def _get_thread_executor(self):
+        with self._lock:
+            if self._thread_executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._thread_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="validation")
+            return self._thread_executor
+
+    def _get_executor(self):
+        # เริ่ม pool เมื่อจำเป็นต้องใช้ครั้งแรกเท่านั้น (import multiprocessing ที่นี่ ไม่ใช่ตอนเริ่มโปรแกรม)
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _record(self, backend: str, reason: str, count: int, started: float, transfer_bytes: int):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.last_timing = {
+            "backend": backend,
+            "reason": reason,
+            "count": count,
+            "elapsed_ms": elapsed_ms,
+            "pickled_bytes": transfer_bytes,
+        }
+        print(f"Validation: backend={backend} ({reason}) took {elapsed_ms:.1f} ms")
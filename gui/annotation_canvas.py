@@ -1,11 +1,21 @@
 # project/gui/annotation_canvas.py
 
 from PyQt6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsRectItem, QSizePolicy
-from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtCore import Qt, QRectF, pyqtSignal
 from PyQt6.QtGui import QPen, QColor
 from PyQt6.QtGui import QPen, QColor, QWheelEvent
+from core.annotation import Annotation, IncrementalValidator
+from gui.tiled_image_item import TiledImageItem
+
+# ปากกาสำหรับกรอบเตือนของ annotation ที่ซ้อนทับกันเกินกำหนด
+VIOLATION_PEN = QPen(QColor(255, 0, 0), 3, Qt.PenStyle.DashLine)
 
 class AnnotationCanvas(QGraphicsView):
+    # ส่งจำนวนคู่ annotation ที่ซ้อนทับกันเกินกำหนด เมื่อผลตรวจสอบเปลี่ยนไป
+    violationsChanged = pyqtSignal(int)
+    # ส่ง ("add" | "remove", Annotation) เมื่อมีการเพิ่มหรือลบ annotation (ใช้บันทึก journal ของ autosave)
+    annotationChanged = pyqtSignal(str, object)
+
     def __init__(self, annotations, main_window=None, parent=None):
         super().__init__(parent)
         self.annotations = annotations  # List สำหรับเก็บ Annotation objects
@@ -26,11 +36,17 @@ class AnnotationCanvas(QGraphicsView):
 
         # เก็บรายการ QGraphicsRectItem ที่ถูกวาดเสร็จแล้ว
         self.annotation_items = []
+        # TiledImageItem ของภาพที่แสดงอยู่ (ถ้าแสดงแบบ tile)
+        self.image_item = None
+        # ตรวจสอบการซ้อนทับแบบ incremental ระหว่างวาด และกรอบเตือนของ annotation ที่ผิดเงื่อนไข
+        self.validator = IncrementalValidator()
+        self.violation_markers = {}  # Annotation -> QGraphicsRectItem
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
 
     def setImage(self, pixmap):
+        self._release_image_item()
         self.scene.clear()  # ล้าง scene ก่อน (ถ้าต้องการ)
         self.scene.addPixmap(pixmap)
         from PyQt6.QtCore import QRectF
@@ -40,6 +56,30 @@ class AnnotationCanvas(QGraphicsView):
         self._zoom = 1  # กำหนดค่า zoom เริ่มต้น
         # ล้าง annotation_items เมื่อโหลดภาพใหม่
         self.annotation_items.clear()
+        self.violation_markers.clear()
+
+    def setTiledImage(self, provider, cache=None):
+        """
+        แสดงภาพแบบ tile ที่ render ตามระดับ zoom ปัจจุบัน (provider: PdfTileProvider หรือ PilTileProvider)
+        พิกัด scene ยังคงเป็นพิกัด pixel เดิม จึงใช้ร่วมกับ annotation ได้เหมือน setImage
+        """
+        self._release_image_item()
+        self.scene.clear()
+        self.image_item = TiledImageItem(provider, cache)
+        self.scene.addItem(self.image_item)
+        self.setSceneRect(self.image_item.boundingRect())
+        # รีเซ็ต transform และ zoom เมื่อโหลดภาพใหม่
+        self.resetTransform()
+        self._zoom = 1  # กำหนดค่า zoom เริ่มต้น
+        # ล้าง annotation_items เมื่อโหลดภาพใหม่
+        self.annotation_items.clear()
+        self.violation_markers.clear()
+
+    def _release_image_item(self):
+        # หยุดงาน render tile ของภาพเดิมก่อนล้าง scene
+        if self.image_item is not None:
+            self.image_item.shutdown()
+            self.image_item = None
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
@@ -71,11 +111,13 @@ class AnnotationCanvas(QGraphicsView):
                 label_text = self.main_window.currentLabel
             # สมมุติว่าคุณมี Annotation object ที่รับ label และสามารถเก็บข้อมูลนี้ได้
             # (คุณอาจต้องแก้ไขคลาส Annotation ใน core/annotation.py ให้รับ color ด้วย)
-            new_annotation = {"x": rect.x(), "y": rect.y(),
-                              "width": rect.width(), "height": rect.height(),
-                              "label": label_text,
-                              "color": self.main_window.currentLabelColor if self.main_window else "#000000"}
+            new_annotation = Annotation(rect.x(), rect.y(), rect.width(), rect.height(), label_text,
+                                        color=self.main_window.currentLabelColor if self.main_window else "#000000",
+                                        page=getattr(self.main_window, "current_page", None))
             self.annotations.append(new_annotation)
+            self.annotationChanged.emit("add", new_annotation)
+            # ตรวจเฉพาะกล่องข้างเคียงของกล่องใหม่
+            self._refresh_violation_markers(self.validator.add(new_annotation))
             # วาดข้อความบนกล่อง annotation
             text_item = self.scene.addText(label_text)
             text_item.setDefaultTextColor(QColor(self.main_window.currentLabelColor if self.main_window else "#000000"))
@@ -108,4 +150,63 @@ class AnnotationCanvas(QGraphicsView):
             self.scene.removeItem(last_item)
             # ลบ Annotation object ล่าสุดจาก list
             if self.annotations:
-                self.annotations.pop()
+                removed = self.annotations.pop()
+                self.annotationChanged.emit("remove", removed)
+                self._refresh_violation_markers(self.validator.remove(removed))
+
+    def showAnnotations(self, page=None):
+        """
+        วาดกรอบของ annotation ใน self.annotations ที่อยู่บนหน้า page (เช่น หลังกู้คืนจาก autosave)
+        แล้วเริ่มการตรวจสอบใหม่ annotation ที่ไม่ระบุหน้าจะแสดงเสมอ
+        """
+        for anno in self.annotations:
+            if page is not None and anno.page is not None and anno.page != page:
+                continue
+            color = QColor(anno.color or "red")
+            item = self.scene.addRect(QRectF(anno.x, anno.y, anno.width, anno.height), QPen(color, 2))
+            text_item = self.scene.addText(anno.label)
+            text_item.setDefaultTextColor(color)
+            text_item.setPos(anno.x, anno.y)
+            self.annotation_items.append(item)
+        self.resetValidation()
+
+    def resetValidation(self):
+        """
+        เริ่มสถานะการตรวจสอบใหม่จาก self.annotations (เช่น หลังล้างหรือกู้คืน annotation)
+        """
+        for marker in self.violation_markers.values():
+            self._remove_marker(marker)
+        self.violation_markers.clear()
+        self.validator.clear()
+        changed = set()
+        for anno in self.annotations:
+            changed |= self.validator.add(anno)
+        self._refresh_violation_markers(changed)
+
+    def clearScene(self):
+        """
+        ล้าง scene ทั้งหมด (ภาพ, กรอบ annotation และกรอบเตือน)
+        ควรเรียกแทน self.scene.clear() เพื่อไม่ให้เหลือการอ้างอิงถึง item ที่ถูกลบไปแล้ว
+        """
+        self._release_image_item()
+        self.violation_markers.clear()
+        self.annotation_items.clear()
+        self.scene.clear()
+
+    def _remove_marker(self, marker):
+        if marker.scene() is self.scene:
+            self.scene.removeItem(marker)
+
+    def _refresh_violation_markers(self, changed):
+        """
+        อัปเดตกรอบเตือนเฉพาะ annotation ที่สถานะเปลี่ยนไป แล้วแจ้งจำนวนคู่ที่ผิดเงื่อนไข
+        """
+        for anno in changed:
+            marker = self.violation_markers.pop(anno, None)
+            if marker is not None:
+                self._remove_marker(marker)
+            if self.validator.is_violating(anno):
+                marker = self.scene.addRect(QRectF(anno.x, anno.y, anno.width, anno.height), VIOLATION_PEN)
+                marker.setZValue(1)
+                self.violation_markers[anno] = marker
+        self.violationsChanged.emit(self.validator.violation_count())
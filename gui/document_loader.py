@@ -0,0 +1,103 @@
+# project/gui/document_loader.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, pyqtSignal
+from core.pdf_utils import THUMBNAIL_SIZE
+from gui.pdf_source import PdfPageSource
+from gui.image_source import ImagePageSource
+
+
+def open_page_source(filepath: str, cache=None, disk_cache=None):
+    """
+    เปิดแหล่งข้อมูลหน้าตามชนิดไฟล์: PdfPageSource สำหรับ PDF และ ImagePageSource สำหรับภาพ (รวม TIFF/GIF หลาย frame)
+    """
+    if os.path.splitext(filepath)[1].lower() == ".pdf":
+        return PdfPageSource(filepath, cache=cache, disk_cache=disk_cache)
+    return ImagePageSource(filepath, cache=cache)
+
+
+class DocumentLoader(QObject):
+    """
+    โหลดเอกสารบน worker thread โดยไม่ block หน้าต่างหลัก
+    ลำดับ signal: opened (หลังเปิดไฟล์และเตรียมหน้าแรกแล้ว) -> pageLoaded/progress ของหน้าแรก -> finished
+    thumbnail ของหน้าอื่นถูก render โดย PdfListWidget เฉพาะแถวที่มองเห็น (ไม่ render ทุกหน้าล่วงหน้า)
+    ยกเลิกได้ด้วย cancel() หรือเมื่อเริ่มโหลดไฟล์ใหม่ (จะได้ signal cancelled แทน finished)
+    """
+    # page source ที่เปิดแล้ว (แสดงหน้าแรกได้ทันที)
+    opened = pyqtSignal(object)
+    # (page source, index, thumbnail QImage) ของหน้าที่เตรียมเสร็จ
+    # ส่งเป็น object เพื่อคง buffer ที่ QImage อ้างอิงไว้ (ดู pixmap_to_qimage)
+    pageLoaded = pyqtSignal(object, int, object)
+    # (จำนวนหน้าที่เสร็จ, จำนวนหน้าทั้งหมด)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    cancelled = pyqtSignal(str)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, cache=None, disk_cache=None, thumbnail_size: int = THUMBNAIL_SIZE, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.disk_cache = disk_cache
+        self.thumbnail_size = thumbnail_size
+        self._executor = None
+        self._cancel_event = None
+        self._lock = threading.Lock()
+
+    def load(self, filepath: str) -> None:
+        """
+        เริ่มโหลด filepath (งานโหลดเดิมที่ยังไม่เสร็จจะถูกยกเลิก)
+        """
+        with self._lock:
+            if self._cancel_event is not None:
+                self._cancel_event.set()
+            cancel_event = self._cancel_event = threading.Event()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            self._executor.submit(self._run, filepath, cancel_event)
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._cancel_event is not None:
+                self._cancel_event.set()
+
+    def is_loading(self) -> bool:
+        with self._lock:
+            return self._cancel_event is not None and not self._cancel_event.is_set()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._cancel_event is not None:
+                self._cancel_event.set()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _run(self, filepath: str, cancel_event: threading.Event) -> None:
+        # ทำงานบน worker thread: signal ทั้งหมดถูกส่งต่อเข้า main thread แบบ queued
+        try:
+            source = open_page_source(filepath, self.cache, self.disk_cache)
+            if source.page_count == 0:
+                source.close()
+                raise ValueError("ไม่พบหน้าที่สามารถแปลงเป็นภาพได้")
+            # เตรียมข้อมูลของหน้าแรกก่อนแจ้ง opened เพื่อให้แสดงผลได้ทันที
+            first_thumbnail = source.render_thumbnail_image(0, self.thumbnail_size)
+        except Exception as e:
+            self._finish(cancel_event)
+            self.failed.emit(filepath, str(e))
+            return
+        if cancel_event.is_set():
+            source.close()
+            self.cancelled.emit(filepath)
+            return
+        self.opened.emit(source)
+        self.pageLoaded.emit(source, 0, first_thumbnail)
+        self.progress.emit(1, source.page_count)
+        self._finish(cancel_event)
+        self.finished.emit(source)
+
+    def _finish(self, cancel_event: threading.Event) -> None:
+        with self._lock:
+            if self._cancel_event is cancel_event:
+                self._cancel_event = None
@@ -0,0 +1,125 @@
+# project/gui/image_source.py
+
+import threading
+from collections import OrderedDict
+from PyQt6.QtGui import QImage, QPixmap
+from core.pdf_utils import THUMBNAIL_SIZE
+from core.render_profiles import VIEWING_PROFILE, THUMBNAIL_PROFILE, pil_for_profile
+
+# จำนวน frame ที่ decode แล้วเก็บไว้ใน memory
+FRAME_CACHE_SIZE = 2
+# รูปแบบ QImage และจำนวน channel ตาม mode ของภาพ PIL
+_QIMAGE_FORMATS = {
+    "L": (QImage.Format.Format_Grayscale8, 1),
+    "RGB": (QImage.Format.Format_RGB888, 3),
+    "RGBA": (QImage.Format.Format_RGBA8888, 4),
+}
+
+
+def pil_to_qimage(image) -> QImage:
+    """
+    แปลงภาพ PIL เป็น QImage (ใช้ต่อได้หลังภาพ PIL ถูกปิด)
+    ภาพ "L" และ "RGBA" คงจำนวน channel เดิม ภาพ mode อื่นถูกแปลงเป็น RGB
+    QImage อ้างอิง bytes ของ pixel โดยตรงโดยไม่คัดลอกซ้ำ เช่นเดียวกับ pixmap_to_qimage
+    """
+    if image.mode not in _QIMAGE_FORMATS:
+        image = image.convert("RGB")
+    image_format, channels = _QIMAGE_FORMATS[image.mode]
+    data = image.tobytes("raw", image.mode)
+    qimage = QImage(data, image.width, image.height, image.width * channels, image_format)
+    qimage._buffer_owner = data
+    return qimage
+
+
+class ImagePageSource:
+    """
+    แหล่งข้อมูลหน้าของไฟล์ภาพ (รองรับภาพหลาย frame เช่น TIFF/GIF โดยแต่ละ frame คือหนึ่งหน้า)
+    ใช้แทน PdfPageSource ได้สำหรับ PdfListWidget และการโหลดเอกสาร
+    การเข้าถึงไฟล์ภาพถูกป้องกันด้วย lock เพราะ PIL ต้อง seek ไปยัง frame ก่อนอ่าน
+    profile และ thumbnail_profile กำหนดเฉพาะ colorspace (ภาพสีเทาคงเป็น grayscale หนึ่ง channel)
+    """
+    zoom = 1.0  # พิกัดของหน้าคือ pixel ของภาพต้นฉบับ
+
+    def __init__(self, filepath: str, cache=None, profile=VIEWING_PROFILE, thumbnail_profile=THUMBNAIL_PROFILE):
+        self.filepath = filepath
+        self.cache = cache
+        self.profile = profile
+        self.thumbnail_profile = thumbnail_profile
+        self._lock = threading.Lock()
+        self._frames = OrderedDict()
+        from PIL import Image  # import เมื่อเปิดไฟล์ภาพแรก ไม่ใช่ตอนเริ่มโปรแกรม
+        self.document = Image.open(filepath)
+
+    @property
+    def page_count(self) -> int:
+        return getattr(self.document, "n_frames", 1)
+
+    def __len__(self):
+        return self.page_count
+
+    def page_size(self, index: int) -> tuple:
+        with self._lock:
+            self._seek(index)
+            return self.document.size
+
+    def frame(self, index: int):
+        """
+        คืนภาพ PIL ของ frame ที่ index (decode ครั้งแรกที่ขอ และเก็บไว้ไม่เกิน FRAME_CACHE_SIZE frame)
+        """
+        with self._lock:
+            image = self._frames.get(index)
+            if image is not None:
+                self._frames.move_to_end(index)
+                return image
+            self._seek(index)
+            image = self.document.copy()
+            image.load()
+            self._frames[index] = image
+            while len(self._frames) > FRAME_CACHE_SIZE:
+                self._frames.popitem(last=False)
+            return image
+
+    @staticmethod
+    def thumbnail_key(size: int = THUMBNAIL_SIZE) -> tuple:
+        return ("thumbnail", size)
+
+    def render_thumbnail_image(self, index: int, size: int = THUMBNAIL_SIZE) -> QImage:
+        """
+        สร้าง thumbnail ของ frame ที่ index เป็น QImage (เรียกจาก worker thread ได้)
+        """
+        frame = self.frame(index)
+        thumbnail = pil_for_profile(frame, self.thumbnail_profile)
+        if thumbnail is frame:
+            # thumbnail() ย่อภาพในที่ จึงต้องไม่ใช้ frame ที่เก็บไว้ใน cache โดยตรง
+            thumbnail = frame.copy()
+        thumbnail.thumbnail((size, size))
+        return pil_to_qimage(thumbnail)
+
+    def render_thumbnail(self, index: int, size: int = THUMBNAIL_SIZE) -> QPixmap:
+        if self.cache is None:
+            return QPixmap.fromImage(self.render_thumbnail_image(index, size))
+        return self.cache.get_or_render(self.filepath, index, self.thumbnail_key(size),
+                                        lambda: QPixmap.fromImage(self.render_thumbnail_image(index, size)))
+
+    def is_cached(self, index: int) -> bool:
+        with self._lock:
+            return index in self._frames
+
+    def render_image(self, index: int) -> QImage:
+        return pil_to_qimage(pil_for_profile(self.frame(index), self.profile))
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.invalidate_file(self.filepath)
+        with self._lock:
+            self._frames.clear()
+            if self.document is not None:
+                self.document.close()
+                self.document = None
+
+    def _seek(self, index: int) -> None:
+        if self.document is None:
+            raise ValueError("Document is closed")
+        if index < 0 or index >= self.page_count:
+            raise IndexError(f"Page index {index} out of range")
+        self.document.seek(index)
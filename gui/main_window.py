@@ -1,22 +1,35 @@
+import time
+import threading
 from PyQt6.QtWidgets import (
     QMainWindow, QApplication, QFileDialog, QMessageBox, QVBoxLayout,
     QWidget, QMenu, QSplitter,QComboBox ,QToolBar
 )
-from PyQt6.QtGui import QAction, QPixmap
-from PyQt6.QtCore import QTimer, Qt
+from PyQt6.QtGui import QAction
+from PyQt6.QtCore import QTimer, Qt, pyqtSignal
 from core.document_handler import DocumentHandler
-from core.autosave import AutoSaveManager
-from core.annotation import export_annotations, validate_annotations
-from core.annotation import LayoutLMExporter
+from core.autosave import AutoSaveStore  # autosave แยกตามเอกสาร (key คือ hash ของไฟล์)
+from core.annotation import Annotation, export_annotations, validate_annotations
 from gui.annotation_canvas import AnnotationCanvas
 from gui.pdf_list_widget import PdfListWidget  # Widget สำหรับแสดง thumbnail ของ PDF
-from core.pdf_utils import pdf_to_pixmap_list  # ฟังก์ชันแปลง PDF เป็น QPixmap list
+from gui.pdf_source import PdfPageSource  # แหล่งหน้าของ PDF ที่ render แบบ lazy
+from core.page_cache import PageImageCache  # LRU cache ของภาพหน้าที่ render แล้ว
+from core.disk_cache import get_default_disk_cache  # cache ภาพหน้าบนดิสก์ (ใช้ร่วมกับ API)
+from core.prefetch import DEFAULT_PREFETCH_WINDOW
+from gui.page_prefetcher import PagePrefetcher  # render หน้าข้างเคียงล่วงหน้าบน thread pool
+from gui.document_loader import DocumentLoader  # โหลดเอกสารแบบไม่ block หน้าต่าง
+from gui.tiled_image_item import PdfTileProvider, PilTileProvider  # แหล่ง tile สำหรับการแสดงผลแบบ deep zoom
 from core.document_types import DOCUMENT_TYPES  # นำเข้าข้อมูลประเภทเอกสาร
 
-from concurrent.futures import ProcessPoolExecutor
-from core.annotation import validate_annotations as core_validate_annotations
+from core.validation_backend import ValidationBackend  # เลือกตรวจใน process เดิมหรือ pool ตามขนาดข้อมูล
+
+# เวลารอหลังการแก้ไขครั้งล่าสุดก่อนบันทึกอัตโนมัติ และระยะห่างสูงสุดระหว่างการบันทึก (ms)
+AUTOSAVE_DEBOUNCE_MS = 2000
+AUTOSAVE_MAX_DELAY_MS = 30000
 
 class MainWindow(QMainWindow):
+    # ส่งผลการตรวจสอบ (valid, message) จาก thread ของ backend เข้า main thread
+    validationFinished = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Annotation Tool")
@@ -31,11 +44,31 @@ class MainWindow(QMainWindow):
         self.currentLabelColor = None  # หรือกำหนดเป็นค่าสีเริ่มต้น เช่น "#000000"
 
         self.document_handler = DocumentHandler()
+        self.page_source = None  # PdfPageSource ของไฟล์ PDF ที่เปิดอยู่
+        self.page_cache = PageImageCache()  # ใช้ร่วมกันระหว่าง canvas และ thumbnail
+        self.disk_cache = get_default_disk_cache()  # ภาพหน้าที่ render แล้วจากการเปิดครั้งก่อน ๆ
+        self.prefetcher = None
+        self.prefetch_window = DEFAULT_PREFETCH_WINDOW  # จำนวนหน้าก่อน/หลังที่ render ล่วงหน้า
+        # โหลดเอกสารบน worker thread พร้อมแจ้งความคืบหน้าทีละหน้า
+        self.document_loader = DocumentLoader(cache=self.page_cache, disk_cache=self.disk_cache, parent=self)
+        self.document_loader.opened.connect(self.on_document_opened)
+        self.document_loader.pageLoaded.connect(self.on_document_page_loaded)
+        self.document_loader.progress.connect(self.on_document_progress)
+        self.document_loader.finished.connect(self.on_document_finished)
+        self.document_loader.cancelled.connect(self.on_document_cancelled)
+        self.document_loader.failed.connect(self.on_document_failed)
         self.annotations = []  # เก็บ Annotation objects ของ core
-        self.autosave_manager = AutoSaveManager()
+        self.autosave_store = AutoSaveStore()
+        # ลบ autosave ของเอกสารที่ไม่ได้แก้ไขนานแล้วบน thread เบื้องหลัง (ไม่หน่วงการเปิดหน้าต่าง)
+        threading.Thread(target=self.autosave_store.cleanup_old_autosaves, name="autosave-cleanup",
+                         daemon=True).start()
+        self.autosave_manager = None  # AutoSaveManager ของเอกสารที่เปิดอยู่
+        self.current_page = 0  # หน้าของ PDF ที่แสดงอยู่ใน canvas
         
         # สร้าง AnnotationCanvas สำหรับแสดงภาพเพื่อทำ annotation
         self.canvas = AnnotationCanvas(self.annotations, main_window=self)
+        self.canvas.violationsChanged.connect(self.on_violations_changed)
+        self.canvas.annotationChanged.connect(self.on_annotation_changed)
         
         # QSplitter แบ่งพื้นที่เป็น 2 ส่วน (แนวนอน)
         self.splitter = QSplitter(Qt.Orientation.Horizontal)
@@ -54,10 +87,18 @@ class MainWindow(QMainWindow):
         self.create_menu()
         self.create_document_dropdowns()  # สร้าง dropdown สำหรับ Document Type และ Label
 
-        self.executor = ProcessPoolExecutor()
+        # pool ของ process สำหรับงานตรวจสอบชุดใหญ่จะเริ่มเมื่อใช้งานครั้งแรกเท่านั้น
+        self.validation_backend = ValidationBackend()
+        self.validationFinished.connect(self.show_validation_result)
+        # บันทึกอัตโนมัติหลังผู้ใช้หยุดแก้ไขครู่หนึ่ง (debounce) และไม่เกินทุก ๆ AUTOSAVE_MAX_DELAY_MS
+        # ระหว่างแก้ไขต่อเนื่อง การเขียนไฟล์ทำบน thread เบื้องหลังของ AutoSaveManager
+        self.autosave_debounce = QTimer(self)
+        self.autosave_debounce.setSingleShot(True)
+        self.autosave_debounce.setInterval(AUTOSAVE_DEBOUNCE_MS)
+        self.autosave_debounce.timeout.connect(self.perform_auto_save)
         self.autosave_timer = QTimer(self)
         self.autosave_timer.timeout.connect(self.perform_auto_save)
-        self.autosave_timer.start(300000)  # ทุก 5 นาที
+        self.autosave_timer.start(AUTOSAVE_MAX_DELAY_MS)
 
         
 
@@ -69,6 +110,12 @@ class MainWindow(QMainWindow):
         open_action = QAction("Open", self)
         open_action.triggered.connect(self.open_file)
         file_menu.addAction(open_action)
+
+        self.cancel_load_action = QAction("Cancel Loading", self)
+        self.cancel_load_action.setShortcut("Esc")
+        self.cancel_load_action.setEnabled(False)
+        self.cancel_load_action.triggered.connect(self.cancel_loading)
+        file_menu.addAction(self.cancel_load_action)
         
         export_action = QAction("Export Annotations (JSON)", self)
         export_action.triggered.connect(self.export_annotations)
@@ -188,6 +235,13 @@ class MainWindow(QMainWindow):
         self.currentLabelColor = color
         self.statusBar().showMessage(f"Document Type: {self.currentDocType} | Label: {label} ({color}) - Zoom: {int(self.canvas._zoom_step ** self.canvas._zoom * 100)}%")
 
+    def on_violations_changed(self, count: int):
+        """ แสดงจำนวนคู่ annotation ที่ซ้อนทับกันเกินกำหนดใน Status Bar ระหว่างวาด """
+        if count:
+            self.statusBar().showMessage(f"Overlap warnings: {count}")
+        else:
+            self.update_zoom_status()
+
     def update_zoom_status(self):
         zoom_factor = self.canvas._zoom_step ** self.canvas._zoom
         percentage = int(zoom_factor * 100)
@@ -196,16 +250,20 @@ class MainWindow(QMainWindow):
     def on_pdf_page_selected(self, index: int):
         """
         เมื่อผู้ใช้เลือกหน้าจาก PdfListWidget
-        ให้ดึง QPixmap แบบเต็มความละเอียดจาก self.pdf_pixmap_list ตาม index แล้วแสดงใน AnnotationCanvas
+        ให้แสดงหน้าจาก self.page_source ตาม index ใน AnnotationCanvas แบบ tile
         """
         try:
-            if index < 0 or index >= len(self.pdf_pixmap_list):
+            if self.page_source is None or index < 0 or index >= self.page_source.page_count:
                 return
-            full_pixmap = self.pdf_pixmap_list[index]
-            self.canvas.setImage(full_pixmap)
+            # แสดงหน้าแบบ tile: render เฉพาะส่วนที่มองเห็นที่ความละเอียดตาม zoom
+            self.canvas.setTiledImage(self.tile_provider(index), self.page_cache)
+            self.current_page = index
             self.canvas.resetTransform()
             self.canvas._zoom = 0
             self.update_zoom_status()
+            # render หน้าข้างเคียงล่วงหน้าระหว่างที่ผู้ใช้ทำ annotation หน้านี้
+            if self.prefetcher is not None:
+                self.prefetcher.prefetch_around(index)
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
@@ -240,11 +298,15 @@ class MainWindow(QMainWindow):
             return
 
         from core.annotation import LayoutLMExporter  # นำเข้าคลาส LayoutLMExporter
+        from core.ocr import DEFAULT_OCR_BACKEND
+        # words มาจาก text layer ของ PDF และ OCR (ถ้ากำหนด OCR_AI_OCR_BACKEND) สำหรับหน้าสแกน
         exporter = LayoutLMExporter(
             current_document=self.current_document,
             file_annotations=self.file_annotations,
             doc_type_combo=self.doc_type_combo,
-            original_pixmap=self.original_pixmap
+            original_pixmap=getattr(self, 'original_pixmap', None),
+            page_source=self.page_source,
+            ocr_backend=DEFAULT_OCR_BACKEND
         )
         try:
             exporter.export_layoutlm_format(export_directory)
@@ -254,12 +316,15 @@ class MainWindow(QMainWindow):
 
 
     def start_validation(self):
-        future = self.executor.submit(core_validate_annotations, self.annotations)
+        future = self.validation_backend.submit(self.annotations)
         future.add_done_callback(self.validation_callback)
 
     def validation_callback(self, future):
-        result = future.result()
-        QTimer.singleShot(0, lambda: self.show_validation_result(result))
+        try:
+            result = future.result()
+        except Exception as e:
+            result = (False, f"Validation failed: {e}")
+        self.validationFinished.emit(result)
 
     def show_validation_result(self, result):
         valid, message = result
@@ -268,8 +333,83 @@ class MainWindow(QMainWindow):
         else:
             QMessageBox.warning(self, "Validation Error", message)
 
+    def on_annotation_changed(self, op: str, annotation):
+        """ บันทึกการแก้ไขลง journal ของ autosave เพื่อให้การบันทึกครั้งถัดไปเขียนเฉพาะส่วนที่เปลี่ยน """
+        if self.autosave_manager is None:
+            return
+        if op == "add":
+            self.autosave_manager.record_add(annotation)
+        elif op == "remove":
+            self.autosave_manager.record_remove(annotation)
+        else:
+            self.autosave_manager.record_modify(annotation)
+        self.autosave_debounce.start()
+
     def perform_auto_save(self):
-        self.autosave_manager.auto_save(self.document_handler, self.annotations)
+        # ไม่มีเอกสารที่เปิดอยู่ หรือไม่มีการแก้ไขตั้งแต่การบันทึกครั้งก่อน ก็ไม่ต้องเขียนอะไร
+        if self.autosave_manager is None or not self.autosave_manager.is_dirty():
+            return
+        self.autosave_debounce.stop()
+        self.autosave_manager.auto_save_async(self.document_handler, self.annotations)
+
+    def switch_autosave_document(self, filepath: str):
+        """
+        บันทึกงานที่ค้างของเอกสารเดิม แล้วเปลี่ยนไปใช้ autosave ของ filepath
+        ถ้าเอกสารนี้มีข้อมูลกู้คืนอยู่จะถามผู้ใช้ก่อนรับการแก้ไขใหม่ ข้อมูลเดิมจึงไม่ถูกเขียนทับจนกว่าผู้ใช้จะปฏิเสธ
+        """
+        self.perform_auto_save()
+        if self.autosave_manager is not None:
+            self.autosave_store.release(self.autosave_manager)
+            self.autosave_manager = None
+        self.document_handler.filepath = filepath
+        try:
+            self.autosave_manager = self.autosave_store.manager_for(filepath)
+        except OSError as e:
+            print(f"Autosave disabled for {filepath}: {e}")
+            return
+        recovered = self.autosave_manager.check_for_autosave()
+        if recovered and recovered["annotations"]:
+            if self.ask_restore_autosave(recovered):
+                self.restore_autosave(recovered)
+            else:
+                self.statusBar().showMessage("Autosave discarded for this document")
+
+    def ask_restore_autosave(self, recovered: dict) -> bool:
+        """
+        ถามผู้ใช้ว่าต้องการกู้คืน annotation จาก autosave ของเอกสารที่เปิดหรือไม่
+        """
+        saved_at = ""
+        if recovered.get("timestamp"):
+            saved_at = time.strftime(" (%Y-%m-%d %H:%M)", time.localtime(recovered["timestamp"]))
+        answer = QMessageBox.question(
+            self, "กู้คืนงาน",
+            f"พบงานที่บันทึกอัตโนมัติของเอกสารนี้{saved_at}: {len(recovered['annotations'])} annotation\n"
+            "ต้องการกู้คืนหรือไม่?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.Yes,
+        )
+        return answer == QMessageBox.StandardButton.Yes
+
+    def restore_autosave(self, recovered: dict):
+        """
+        แทน annotation ปัจจุบันด้วยข้อมูลกู้คืน แล้วแสดงบน canvas (list เดียวกับที่ canvas ใช้)
+        """
+        self.annotations[:] = [Annotation.from_dict(data) for data in recovered["annotations"]]
+        self.canvas.showAnnotations(self.current_page)
+        # snapshot ถัดไปของเอกสารนี้เริ่มจากสถานะที่กู้คืน
+        if self.autosave_manager is not None:
+            self.autosave_manager.mark_dirty()
+        self.unsavedChanges = True
+        self.statusBar().showMessage(f"Restored {len(self.annotations)} annotations from autosave")
+
+    def closeEvent(self, event):
+        # บันทึกการแก้ไขที่ค้างอยู่และรอให้เขียนเสร็จก่อนปิดโปรแกรม
+        self.perform_auto_save()
+        if self.autosave_manager is not None:
+            self.autosave_store.release(self.autosave_manager)
+        self.document_loader.shutdown()
+        self.validation_backend.shutdown()
+        super().closeEvent(event)
 
     def prompt_save_changes(self):
         """
@@ -316,7 +456,10 @@ class MainWindow(QMainWindow):
         (ไม่ลบโครงสร้าง UI เช่น panel thumbnail)
         """
         self.annotations.clear()
-        self.canvas.scene.clear()
+        if self.autosave_manager is not None:
+            self.autosave_manager.mark_dirty()
+        self.canvas.clearScene()
+        self.canvas.resetValidation()
         self.currentFile = None
         self.unsavedChanges = False
 
@@ -338,44 +481,97 @@ class MainWindow(QMainWindow):
                 return  # ยกเลิกเปิดไฟล์ใหม่
             # หากเลือก No ให้เคลียร์เฉพาะข้อมูล annotation
             self.annotations.clear()
-            self.canvas.scene.clear()
+            if self.autosave_manager is not None:
+                self.autosave_manager.mark_dirty()
+            self.canvas.clearScene()
+            self.canvas.resetValidation()
         
         filepath, _ = QFileDialog.getOpenFileName(
-            self, "Open File", "", "Images (*.png *.jpg *.bmp);;PDF Files (*.pdf)"
+            self, "Open File", "", "Images (*.png *.jpg *.bmp *.gif *.tif *.tiff);;PDF Files (*.pdf)"
         )
         if filepath:
-            try:
-                ext = filepath.split('.')[-1].lower()
-                if ext == "pdf":
-                    # แปลง PDF เป็น QPixmap แบบ full resolution แล้วเก็บไว้ใน attribute
-                    self.pdf_pixmap_list = pdf_to_pixmap_list(filepath)
-                    if not self.pdf_pixmap_list:
-                        raise Exception("ไม่พบหน้าที่สามารถแปลงเป็นภาพได้")
-                    # สร้าง PdfListWidget สำหรับแสดง thumbnail
-                    pdf_list_widget = PdfListWidget(self.pdf_pixmap_list)
-                    pdf_list_widget.setFixedWidth(200)
-                    pdf_list_widget.pageSelected.connect(self.on_pdf_page_selected)
-                    if self.splitter.count() == 1:
-                        self.splitter.insertWidget(0, pdf_list_widget)
-                    else:
-                        self.splitter.widget(0).deleteLater()
-                        self.splitter.insertWidget(0, pdf_list_widget)
-                    self.splitter.setStretchFactor(0, 0)
-                    self.splitter.setStretchFactor(1, 1)
-                    # แสดงหน้ากระดาษแรกใน AnnotationCanvas
-                    self.canvas.setImage(self.pdf_pixmap_list[0])
-                else:
-                    # กรณีเปิดไฟล์รูปภาพ
-                    self.document_handler.load_image(filepath)
-                    pixmap = QPixmap(filepath)
-                    self.canvas.setImage(pixmap)
-                self.canvas.resetTransform()
-                self.canvas._zoom = 0
-                self.update_zoom_status()
-                self.currentFile = filepath
-                self.unsavedChanges = True
-            except Exception as e:
-                QMessageBox.critical(self, "Error", str(e))
+            self.load_document(filepath)
+
+    def load_document(self, filepath: str):
+        """
+        เริ่มโหลดเอกสารบน worker thread หน้าต่างยังตอบสนองได้ระหว่างโหลด และยกเลิกได้ (Esc)
+        หน้าแรกจะแสดงทันทีเมื่อเปิดไฟล์เสร็จ (on_document_opened)
+        """
+        self.statusBar().showMessage(f"Loading {filepath} ...")
+        self.cancel_load_action.setEnabled(True)
+        self.document_loader.load(filepath)
+
+    def cancel_loading(self):
+        self.document_loader.cancel()
+
+    def on_document_opened(self, page_source):
+        """
+        เปิดไฟล์เสร็จแล้ว: เปลี่ยนไปใช้ page_source ใหม่และแสดงหน้าแรก (หน้าที่เหลือยังโหลดต่อเบื้องหลัง)
+        """
+        filepath = page_source.filepath
+        try:
+            if self.prefetcher is not None:
+                self.prefetcher.shutdown()
+                self.prefetcher.deleteLater()
+                self.prefetcher = None
+            if self.splitter.count() > 1:
+                old_list = self.splitter.widget(0)
+                old_list.shutdown()
+                old_list.setParent(None)  # นำออกจาก splitter ทันที
+                old_list.deleteLater()
+            if self.page_source is not None:
+                self.page_source.close()
+            self.page_source = page_source
+            if isinstance(page_source, PdfPageSource):
+                self.prefetcher = PagePrefetcher(page_source, window=self.prefetch_window, parent=self)
+            # แสดง thumbnail ของทุกหน้าเมื่อเป็น PDF หรือภาพหลาย frame
+            if isinstance(page_source, PdfPageSource) or page_source.page_count > 1:
+                pdf_list_widget = PdfListWidget(page_source)
+                pdf_list_widget.setFixedWidth(200)
+                pdf_list_widget.pageSelected.connect(self.on_pdf_page_selected)
+                self.splitter.insertWidget(0, pdf_list_widget)
+                self.splitter.setStretchFactor(0, 0)
+                self.splitter.setStretchFactor(1, 1)
+            # แสดงหน้าแรกใน AnnotationCanvas
+            self.canvas.setTiledImage(self.tile_provider(0), self.page_cache)
+            if self.prefetcher is not None:
+                self.prefetcher.prefetch_around(0)
+            self.canvas.resetTransform()
+            self.canvas._zoom = 0
+            self.current_page = 0
+            self.currentFile = filepath
+            self.unsavedChanges = True
+            self.switch_autosave_document(filepath)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+
+    def tile_provider(self, index: int):
+        """ แหล่ง tile ของหน้า index ของเอกสารที่เปิดอยู่ """
+        if isinstance(self.page_source, PdfPageSource):
+            return PdfTileProvider(self.page_source, index)
+        return PilTileProvider(self.page_source.frame(index), self.page_source.filepath, page=index)
+
+    def on_document_page_loaded(self, page_source, index: int, thumbnail):
+        # thumbnail ของเอกสารที่ถูกแทนที่ไปแล้วจะถูกละทิ้ง
+        if page_source is not self.page_source or self.splitter.count() < 2:
+            return
+        self.splitter.widget(0).set_thumbnail(index, thumbnail)
+
+    def on_document_progress(self, done: int, total: int):
+        self.statusBar().showMessage(f"Loading pages: {done}/{total}")
+
+    def on_document_finished(self, page_source):
+        if page_source is self.page_source:
+            self.cancel_load_action.setEnabled(False)
+            self.update_zoom_status()
+
+    def on_document_cancelled(self, filepath: str):
+        self.cancel_load_action.setEnabled(self.document_loader.is_loading())
+        self.statusBar().showMessage(f"Loading cancelled: {filepath}")
+
+    def on_document_failed(self, filepath: str, message: str):
+        self.cancel_load_action.setEnabled(self.document_loader.is_loading())
+        QMessageBox.critical(self, "Error", message)
 
 
 def main():
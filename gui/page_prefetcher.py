@@ -0,0 +1,47 @@
+# project/gui/page_prefetcher.py
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap
+from core.prefetch import PrefetchScheduler, DEFAULT_PREFETCH_WINDOW
+
+class PagePrefetcher(QObject):
+    """
+    render หน้าข้างเคียงของหน้าปัจจุบันล่วงหน้าบน thread pool แล้วเก็บลง cache ของ page_source
+    worker thread สร้างได้เฉพาะ QImage ส่วนการแปลงเป็น QPixmap ทำบน main thread
+    """
+    # ส่งค่า index ของหน้าที่พร้อมใช้งานใน cache แล้ว
+    pageReady = pyqtSignal(int)
+    # signal ภายในที่ถูก emit จาก worker thread (Qt ส่งต่อเข้า main thread แบบ queued)
+    # ส่ง QImage เป็น object เพื่อให้ buffer ของ fitz ที่ QImage อ้างอิงอยู่ยังมีชีวิตจนถึง main thread
+    _imageRendered = pyqtSignal(int, object)
+
+    def __init__(self, page_source, window: int = DEFAULT_PREFETCH_WINDOW, max_workers: int = 2, parent=None):
+        super().__init__(parent)
+        self.page_source = page_source
+        self._imageRendered.connect(self._store_page)
+        self.scheduler = PrefetchScheduler(
+            render_fn=page_source.render_image,
+            on_ready=self._imageRendered.emit,
+            is_cached=page_source.is_cached,
+            window=window,
+            max_workers=max_workers,
+        )
+
+    def prefetch_around(self, index: int) -> None:
+        """
+        กำหนดหน้าปัจจุบัน แล้ว render หน้าภายใน window ล่วงหน้า (งานที่ไกลเกินไปจะถูกยกเลิก)
+        """
+        if self.page_source.cache is None:
+            return
+        self.scheduler.schedule(index, self.page_source.page_count)
+
+    def shutdown(self) -> None:
+        self.scheduler.shutdown()
+
+    def _store_page(self, index: int, image: QImage):
+        # ทำงานบน main thread
+        source = self.page_source
+        if source.cache is None or source.document is None:
+            return
+        source.cache.put(source.filepath, index, source.zoom, QPixmap.fromImage(image))
+        self.pageReady.emit(index)
@@ -1,25 +1,47 @@
 from PyQt6.QtWidgets import QListWidget, QListWidgetItem, QWidget, QVBoxLayout
-from PyQt6.QtGui import QIcon
-from PyQt6.QtCore import QSize, pyqtSignal, Qt
+from PyQt6.QtGui import QIcon, QPixmap, QColor, QImage
+from PyQt6.QtCore import QSize, QPoint, pyqtSignal
+
+from core.pdf_utils import THUMBNAIL_SIZE as THUMBNAIL_PIXELS
+from core.prefetch import PrefetchScheduler
+
+THUMBNAIL_SIZE = QSize(THUMBNAIL_PIXELS, THUMBNAIL_PIXELS)
+# จำนวนแถวนอก viewport ที่จะเตรียม thumbnail ไว้ล่วงหน้า
+THUMBNAIL_MARGIN_ROWS = 5
 
 class PdfListWidget(QWidget):
     # ประกาศ signal ที่ส่งค่า index ของหน้าที่เลือก
     pageSelected = pyqtSignal(int)
+    # signal ภายในที่ถูก emit จาก worker thread เมื่อ thumbnail render เสร็จ
+    # (ส่ง QImage เป็น object เพื่อคง buffer ที่ QImage อ้างอิงไว้ ดู pixmap_to_qimage)
+    _thumbnailRendered = pyqtSignal(int, object)
 
-    def __init__(self, pixmap_list, parent=None):
+    def __init__(self, page_source, parent=None):
         super().__init__(parent)
-        # pixmap_list นี้ควรเป็นรายชื่อ QPixmap แบบ full resolution
-        self.pixmap_list = pixmap_list  
+        # page_source คือ PdfPageSource (หรือ ImagePageSource) ที่ render หน้าแบบ lazy
+        self.page_source = page_source
         self.list_widget = QListWidget()
+        # เก็บ index ของหน้าที่สร้าง thumbnail แล้ว
+        self._loaded_thumbnails = set()
+        # thumbnail ถูก render ตรงจาก fitz ด้วย matrix ขนาดเล็กบน worker thread
+        self._thumbnailRendered.connect(self.set_thumbnail)
+        self.thumbnail_scheduler = PrefetchScheduler(
+            render_fn=lambda index: self.page_source.render_thumbnail_image(index, THUMBNAIL_PIXELS),
+            on_ready=self._thumbnailRendered.emit,
+            max_workers=1,
+        )
         self.init_ui()
 
     def init_ui(self):
         # กำหนดขนาดของ icon สำหรับ thumbnail
-        self.list_widget.setIconSize(QSize(100, 100))
-        for i, pixmap in enumerate(self.pixmap_list):
-            # สร้าง thumbnail โดย scaling QPixmap ลง
-            thumbnail = pixmap.scaled(QSize(100, 100), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            item = QListWidgetItem(QIcon(thumbnail), f"Page {i+1}")
+        self.list_widget.setIconSize(THUMBNAIL_SIZE)
+        self.list_widget.setUniformItemSizes(True)
+        # ใช้ placeholder เดียวกันทุกหน้าจนกว่า thumbnail จริงจะถูก render
+        placeholder = QPixmap(THUMBNAIL_SIZE)
+        placeholder.fill(QColor("white"))
+        placeholder_icon = QIcon(placeholder)
+        for i in range(self.page_source.page_count):
+            item = QListWidgetItem(placeholder_icon, f"Page {i+1}")
             self.list_widget.addItem(item)
 
         layout = QVBoxLayout()
@@ -28,3 +50,76 @@ class PdfListWidget(QWidget):
 
         # เมื่อมีการเปลี่ยนแถวที่เลือก ส่งค่า index ผ่าน signal pageSelected
         self.list_widget.currentRowChanged.connect(self.pageSelected.emit)
+        # ขอ thumbnail เฉพาะแถวที่มองเห็นเมื่อมีการเลื่อน
+        self.list_widget.verticalScrollBar().valueChanged.connect(self.load_visible_thumbnails)
+
+    def visible_rows(self) -> range:
+        """
+        คืนค่าช่วงของแถวที่มองเห็นอยู่ใน viewport
+        """
+        count = self.list_widget.count()
+        if count == 0:
+            return range(0)
+        viewport = self.list_widget.viewport().rect()
+        first = self.list_widget.indexAt(QPoint(1, 1)).row()
+        last = self.list_widget.indexAt(QPoint(1, viewport.height() - 1)).row()
+        if first < 0:
+            first = 0
+        if last < 0:
+            last = count - 1
+        return range(first, last + 1)
+
+    def load_visible_thumbnails(self, *args):
+        """
+        ใช้ thumbnail จาก cache ทันทีถ้ามี ที่เหลือส่งเข้า worker ตามลำดับแถวที่มองเห็นก่อน
+        แถวที่เลื่อนพ้นไปแล้วจะถูกยกเลิก
+        """
+        visible = self.visible_rows()
+        if not visible:
+            return
+        count = self.list_widget.count()
+        rows = list(visible)
+        rows += range(visible.stop, min(count, visible.stop + THUMBNAIL_MARGIN_ROWS))
+        rows += range(max(0, visible.start - THUMBNAIL_MARGIN_ROWS), visible.start)
+        wanted = []
+        cache = self.page_source.cache
+        key = self.page_source.thumbnail_key(THUMBNAIL_PIXELS)
+        for row in rows:
+            if row in self._loaded_thumbnails:
+                continue
+            cached = cache.get(self.page_source.filepath, row, key) if cache is not None else None
+            if cached is not None:
+                self._apply_thumbnail(row, cached)
+            else:
+                wanted.append(row)
+        self.thumbnail_scheduler.schedule_pages(wanted)
+
+    def set_thumbnail(self, row: int, image: QImage):
+        """
+        ใช้ thumbnail ที่ render แล้ว (เช่น จาก DocumentLoader) ต้องเรียกบน main thread
+        """
+        if row in self._loaded_thumbnails or self.page_source.document is None:
+            return
+        thumbnail = QPixmap.fromImage(image)
+        cache = self.page_source.cache
+        if cache is not None:
+            cache.put(self.page_source.filepath, row, self.page_source.thumbnail_key(THUMBNAIL_PIXELS), thumbnail)
+        self._apply_thumbnail(row, thumbnail)
+
+    def _apply_thumbnail(self, row: int, thumbnail: QPixmap):
+        self.list_widget.item(row).setIcon(QIcon(thumbnail))
+        self._loaded_thumbnails.add(row)
+
+    def shutdown(self):
+        """
+        ยกเลิกงาน render thumbnail ที่ค้างอยู่ (เรียกก่อนปิดเอกสาร)
+        """
+        self.thumbnail_scheduler.shutdown()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.load_visible_thumbnails()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.load_visible_thumbnails()
@@ -0,0 +1,228 @@
+# project/gui/pdf_source.py
+
+import threading
+from PyQt6.QtGui import QImage, QPixmap
+from core.disk_cache import file_content_hash
+from core.tiles import tile_scene_rect, level_scale
+from core.pdf_utils import THUMBNAIL_SIZE, pixmap_to_ppm, parse_pnm
+from core.render_profiles import (VIEWING_PROFILE, THUMBNAIL_PROFILE, page_is_grayscale, render_pixmap, to_points,
+                                  document_key, page_pixel_size)
+
+# รูปแบบ QImage ตาม (จำนวน channel, มี alpha หรือไม่) ของ fitz.Pixmap
+_QIMAGE_FORMATS = {
+    (1, False): QImage.Format.Format_Grayscale8,
+    (3, False): QImage.Format.Format_RGB888,
+    # fitz เก็บค่าสีของภาพที่มี alpha แบบ premultiplied
+    (4, True): QImage.Format.Format_RGBA8888_Premultiplied,
+}
+
+
+def pixmap_to_qimage(pix) -> QImage:
+    """
+    ห่อ buffer ของ fitz.Pixmap เป็น QImage โดยไม่คัดลอกและไม่ encode/decode
+    QImage อ้างอิงหน่วยความจำของ pix โดยตรง จึงผูก pix ไว้กับ object QImage ที่คืนไป
+    ถ้าส่งข้าม thread ต้องส่ง object นี้เอง (signal แบบ object) ไม่ใช่สำเนาของ QImage
+    """
+    image_format = _QIMAGE_FORMATS.get((pix.n, bool(pix.alpha)))
+    if image_format is None:
+        # เช่น CMYK: แปลงเป็น RGB ก่อน (คัดลอกหนึ่งครั้ง)
+        import fitz
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        image_format = QImage.Format.Format_RGB888
+    image = QImage(pix.samples_mv, pix.width, pix.height, pix.stride, image_format)
+    image._buffer_owner = pix
+    return image
+
+
+def ppm_to_qimage(data: bytes) -> QImage:
+    """
+    ห่อ pixel ของ PPM/PGM แบบ binary (รวมไฟล์ที่ fitz เขียนด้วย tobytes("ppm")) เป็น QImage
+    โดยไม่คัดลอก ข้อมูลรูปแบบอื่นจะถูก decode ด้วย QImage.fromData
+    """
+    parsed = parse_pnm(data)
+    if parsed is None:
+        return QImage.fromData(data)
+    channels, width, height, pixels = parsed
+    image_format = QImage.Format.Format_Grayscale8 if channels == 1 else QImage.Format.Format_RGB888
+    image = QImage(pixels, width, height, width * channels, image_format)
+    image._buffer_owner = data
+    return image
+
+
+class PdfPageSource:
+    """
+    แหล่งข้อมูลหน้าของ PDF แบบ lazy
+    เปิดเอกสาร fitz ค้างไว้ รู้จำนวนหน้าทันที และ render เฉพาะหน้าที่ถูกขอเท่านั้น
+    ถ้ากำหนด cache (PageImageCache) ภาพที่ render แล้วจะถูกเก็บและใช้ซ้ำ
+    ถ้ากำหนด disk_cache (DiskPageCache) ภาพจะถูกเก็บบนดิสก์ตาม content hash ของไฟล์
+    และใช้ซ้ำได้เมื่อเปิดไฟล์เดิมอีกครั้ง
+    การเข้าถึงเอกสาร fitz ถูกป้องกันด้วย lock เพื่อให้ render จาก worker thread ได้
+    profile และ thumbnail_profile (RenderProfile) กำหนด colorspace/alpha ของภาพหน้าและ thumbnail
+    zoom คือพิกัดของหน้า (pixel = point * zoom) ถ้าไม่กำหนดจะใช้ dpi ของ profile
+    """
+    def __init__(self, filepath: str, zoom: float = None, cache=None, disk_cache=None,
+                 profile=VIEWING_PROFILE, thumbnail_profile=THUMBNAIL_PROFILE):
+        self.filepath = filepath
+        self.profile = profile
+        self.thumbnail_profile = thumbnail_profile
+        self.zoom = zoom if zoom is not None else profile.zoom
+        self.cache = cache
+        self.disk_cache = disk_cache
+        self._content_hash = None
+        # key ของผลการตรวจว่าหน้าไม่มีสี (colorspace "auto") ที่ใช้ร่วมกับแหล่งหน้าอื่นของไฟล์เดียวกัน
+        self.document_key = document_key(filepath)
+        self._lock = threading.RLock()
+        import fitz  # PyMuPDF (import เมื่อเปิดเอกสารแรก ไม่ใช่ตอนเริ่มโปรแกรม)
+        self.document = fitz.open(filepath)
+
+    @property
+    def content_hash(self) -> str:
+        """
+        SHA-256 ของเนื้อหาไฟล์ (คำนวณครั้งแรกที่ต้องใช้)
+        """
+        if self._content_hash is None:
+            self._content_hash = file_content_hash(self.filepath)
+        return self._content_hash
+
+    @property
+    def page_count(self) -> int:
+        return self.document.page_count
+
+    def __len__(self):
+        return self.page_count
+
+    def page_size(self, index: int) -> tuple:
+        """
+        คืนค่าขนาดหน้า (width, height) ในหน่วย pixel ที่ zoom ปัจจุบัน โดยไม่ต้อง render
+        """
+        with self._lock:
+            rect = self.document.load_page(index).rect
+        return page_pixel_size(rect, self.zoom)
+
+    def to_points(self, bbox) -> list:
+        """
+        แปลง bbox [x1, y1, x2, y2] จากพิกัดของหน้า (pixel ที่ zoom) เป็นหน่วย point ของ PDF
+        """
+        return to_points(bbox, self.zoom)
+
+    def is_grayscale(self, index: int) -> bool:
+        """
+        หน้าที่ index ไม่มีสีหรือไม่ (ตรวจครั้งแรกที่ต้องใช้แล้วจำผลไว้ตาม document_key)
+        """
+        with self._lock:
+            if self.document is None:
+                raise ValueError("Document is closed")
+            return page_is_grayscale(self.document.load_page(index), self.document_key)
+
+    def render_page(self, index: int) -> QPixmap:
+        """
+        render หน้าที่ index เป็น QPixmap แบบ full resolution
+        """
+        if index < 0 or index >= self.page_count:
+            raise IndexError(f"Page index {index} out of range")
+        if self.cache is None:
+            return self._render(index)
+        return self.cache.get_or_render(self.filepath, index, self.zoom, lambda: self._render(index))
+
+    def render_thumbnail(self, index: int, size: int = THUMBNAIL_SIZE) -> QPixmap:
+        """
+        สร้าง thumbnail ของหน้าที่ index ให้พอดีกรอบ size x size
+        """
+        if self.cache is None:
+            return QPixmap.fromImage(self.render_thumbnail_image(index, size))
+        return self.cache.get_or_render(self.filepath, index, self.thumbnail_key(size),
+                                        lambda: QPixmap.fromImage(self.render_thumbnail_image(index, size)))
+
+    @staticmethod
+    def thumbnail_key(size: int = THUMBNAIL_SIZE) -> tuple:
+        """
+        ค่าที่ใช้แทน zoom ใน key ของ cache สำหรับ thumbnail
+        """
+        return ("thumbnail", size)
+
+    def render_thumbnail_image(self, index: int, size: int = THUMBNAIL_SIZE) -> QImage:
+        """
+        render thumbnail ตรงจาก fitz ด้วย matrix ขนาดเล็กที่พอดีกรอบ size x size
+        (ไม่ต้อง render ความละเอียดเต็มแล้วย่อ) เรียกจาก worker thread ได้
+        """
+        def scale_for(page):
+            return size / max(page.rect.width, page.rect.height)
+        return self._page_image(index, self.thumbnail_key(size), scale_for, profile=self.thumbnail_profile)
+
+    def is_cached(self, index: int) -> bool:
+        return self.cache is not None and self.cache.contains(self.filepath, index, self.zoom)
+
+    def render_image(self, index: int) -> QImage:
+        """
+        render หน้าที่ index เป็น QImage (เรียกจาก worker thread ได้ เพราะไม่สร้าง QPixmap)
+        """
+        return self._page_image(index, self.zoom, lambda page: self.zoom)
+
+    def tile_key(self, level: int, tx: int, ty: int) -> tuple:
+        """
+        ค่าที่ใช้แทน zoom ใน key ของ cache สำหรับ tile (รวม zoom ของ source เพราะพิกัดของ tile ขึ้นกับ zoom)
+        """
+        return ("tile", self.zoom, level, tx, ty)
+
+    def render_tile(self, index: int, level: int, tx: int, ty: int) -> QImage:
+        """
+        render เฉพาะ tile (tx, ty) ของ pyramid ระดับ level (ความละเอียด zoom * 2^level)
+        พิกัดของ tile อ้างอิงพิกัด pixel ที่ zoom ปัจจุบัน (พิกัดเดียวกับ scene ของ canvas)
+        """
+        width, height = self.page_size(index)
+        x, y, w, h = tile_scene_rect(level, tx, ty, width, height)
+        import fitz
+        clip = fitz.Rect(x, y, x + w, y + h) / self.zoom
+        return self._page_image(index, self.tile_key(level, tx, ty),
+                                lambda page: self.zoom * level_scale(level), clip)
+
+    def _page_image(self, index: int, zoom_key, scale_for, clip=None, profile=None) -> QImage:
+        """
+        คืนค่าภาพของหน้าที่ index อ่านจาก disk cache ถ้ามี มิฉะนั้น render ด้วย MuPDF แล้วเก็บลงดิสก์
+        ทั้งสองทางห่อ pixel เป็น QImage โดยตรง (ไม่ผ่าน codec)
+        """
+        profile = profile or self.profile
+        # key ใช้ colorspace ที่ใช้จริงของหน้า: "auto" ของหน้าขาวดำตรงกับ "gray" และหน้าสีตรงกับ "rgb"
+        grayscale = self.is_grayscale(index) if profile.colorspace == "auto" else None
+        tag = profile.cache_tag(grayscale)
+        if tag:
+            zoom_key = tag + (zoom_key if isinstance(zoom_key, tuple) else (zoom_key,))
+        if self.disk_cache is not None:
+            data = self.disk_cache.get(self.content_hash, index, zoom_key)
+            if data is not None:
+                image = ppm_to_qimage(data)
+                if not image.isNull():
+                    return image
+        with self._lock:
+            if self.document is None:
+                raise ValueError("Document is closed")
+            page = self.document.load_page(index)
+            pix = render_pixmap(page, profile, scale_for(page), clip, grayscale)
+        if self.disk_cache is not None:
+            self.disk_cache.put(self.content_hash, index, zoom_key, pixmap_to_ppm(pix))
+        return pixmap_to_qimage(pix)
+
+    def _render(self, index: int) -> QPixmap:
+        return QPixmap.fromImage(self.render_image(index))
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.invalidate_file(self.filepath)
+        with self._lock:
+            if self.document is not None:
+                self.document.close()
+                self.document = None
+
+
+def pdf_to_pixmap_list(filepath: str) -> list:
+    """
+    เปิดไฟล์ PDF และแปลงแต่ละหน้าเป็น QPixmap แบบ full resolution
+    (render ทุกหน้าทันที ควรใช้ PdfPageSource แทนสำหรับเอกสารขนาดใหญ่)
+    """
+    source = PdfPageSource(filepath)
+    try:
+        return [source.render_page(i) for i in range(source.page_count)]
+    finally:
+        source.close()
@@ -0,0 +1,229 @@
+# project/gui/tiled_image_item.py
+
+import threading
+from PyQt6 import sip
+from PyQt6.QtWidgets import QGraphicsObject, QGraphicsItem, QGraphicsView, QStyleOptionGraphicsItem
+from PyQt6.QtCore import Qt, QRectF, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap, QPainter
+from core.page_cache import PageImageCache
+from core.prefetch import PrefetchScheduler
+from gui.image_source import pil_to_qimage
+from core.render_profiles import VIEWING_PROFILE, pil_for_profile
+from core.pdf_utils import THUMBNAIL_SIZE
+from core.tiles import level_for_scale, level_scale, tile_scene_rect, tiles_for_rect, MAX_LEVEL
+
+# ขนาดด้านยาวของภาพ preview ความละเอียดต่ำที่แสดงระหว่างรอ tile
+PREVIEW_SIZE = 1024
+
+
+class PdfTileProvider:
+    """
+    ผู้ให้บริการ tile ของหน้า PDF หนึ่งหน้า (render ด้วย fitz ผ่าน PdfPageSource)
+    พิกัด scene คือ pixel ที่ zoom ของ page_source
+    """
+    max_level = MAX_LEVEL
+
+    def __init__(self, page_source, index: int):
+        self.page_source = page_source
+        self.index = index
+        self.cache_file = page_source.filepath
+        self.cache_page = index
+
+    def size(self) -> tuple:
+        return self.page_source.page_size(self.index)
+
+    def preview_keys(self) -> tuple:
+        # preview ขนาด PREVIEW_SIZE ก่อน แล้วจึง thumbnail ของรายการหน้า (render ไว้แล้วโดย loader หรือ list widget)
+        return (self.page_source.thumbnail_key(PREVIEW_SIZE), self.page_source.thumbnail_key(THUMBNAIL_SIZE))
+
+    def render_preview(self) -> QImage:
+        return self.page_source.render_thumbnail_image(self.index, PREVIEW_SIZE)
+
+    def full_image(self):
+        # ใช้ภาพเต็มหน้าที่อยู่ใน cache แล้ว (เช่น จากการ prefetch) โดยไม่ render ใหม่
+        cache = self.page_source.cache
+        if cache is None:
+            return None
+        return cache.get(self.cache_file, self.index, self.page_source.zoom)
+
+    def tile_key(self, level: int, tx: int, ty: int) -> tuple:
+        return self.page_source.tile_key(level, tx, ty)
+
+    def render_tile(self, level: int, tx: int, ty: int) -> QImage:
+        return self.page_source.render_tile(self.index, level, tx, ty)
+
+
+class PilTileProvider:
+    """
+    ผู้ให้บริการ tile ของภาพจาก PIL (เช่น ภาพสแกน 600 dpi)
+    พิกัด scene คือ pixel ของภาพต้นฉบับ จึงไม่มีระดับที่ละเอียดกว่าระดับ 0
+    """
+    max_level = 0
+
+    def __init__(self, image, filepath: str, page: int = 0, profile=VIEWING_PROFILE):
+        self.image = image
+        self.profile = profile
+        self.cache_file = filepath
+        self.cache_page = page  # frame ของภาพหลาย frame (เช่น TIFF)
+        # PIL ไม่รองรับการอ่านภาพเดียวกันจากหลาย thread พร้อมกัน
+        self._lock = threading.Lock()
+
+    def size(self) -> tuple:
+        return self.image.size
+
+    def preview_keys(self) -> tuple:
+        return (("preview", PREVIEW_SIZE),)
+
+    def render_preview(self) -> QImage:
+        with self._lock:
+            preview = pil_for_profile(self.image, self.profile)
+            if preview is self.image:
+                preview = preview.copy()
+        preview.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+        return pil_to_qimage(preview)
+
+    def full_image(self):
+        return None
+
+    def tile_key(self, level: int, tx: int, ty: int) -> tuple:
+        return ("tile", level, tx, ty)
+
+    def render_tile(self, level: int, tx: int, ty: int) -> QImage:
+        width, height = self.image.size
+        x, y, w, h = tile_scene_rect(level, tx, ty, width, height)
+        scale = level_scale(level)
+        with self._lock:
+            tile = pil_for_profile(self.image.crop((int(x), int(y), int(x + w), int(y + h))), self.profile)
+        target = (max(1, round(tile.width * scale)), max(1, round(tile.height * scale)))
+        if target != tile.size:
+            tile = tile.resize(target)
+        return pil_to_qimage(tile)
+
+
+
+
+class TiledImageItem(QGraphicsObject):
+    """
+    QGraphicsItem ที่วาดภาพเป็น tile ตามระดับความละเอียดที่เหมาะกับ transform ของ view
+    render เฉพาะ tile ที่มองเห็นบน worker thread และเก็บไว้ใน PageImageCache
+    ระหว่างรอ tile จะแสดงภาพ preview ความละเอียดต่ำแทน ภาพ preview ขนาด PREVIEW_SIZE ก็ render บน worker thread
+    เช่นกัน ระหว่างนั้นจะใช้ thumbnail ที่อยู่ใน cache แล้ว (หรือพื้นขาวถ้ายังไม่มี) เพื่อไม่ให้การเปลี่ยนหน้าค้าง
+    """
+    # signal ภายในที่ถูก emit จาก worker thread เมื่อ tile render เสร็จ
+    # (ส่ง QImage เป็น object เพื่อคง buffer ที่ QImage อ้างอิงไว้ ดู pixmap_to_qimage)
+    _tileRendered = pyqtSignal(object, object)
+    _previewRendered = pyqtSignal(object, object)
+
+    def __init__(self, provider, cache=None, parent=None):
+        super().__init__(parent)
+        self.provider = provider
+        self.cache = cache if cache is not None else PageImageCache()
+        width, height = provider.size()
+        self._rect = QRectF(0, 0, width, height)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+        self._tileRendered.connect(self._store_tile)
+        self._previewRendered.connect(self._store_preview)
+        self.scheduler = PrefetchScheduler(
+            render_fn=lambda key: provider.render_tile(*key),
+            on_ready=lambda key, image: self._emit(self._tileRendered, key, image),
+            max_workers=2,
+        )
+        self.preview_scheduler = PrefetchScheduler(
+            render_fn=lambda key: provider.render_preview(),
+            on_ready=lambda key, image: self._emit(self._previewRendered, key, image),
+            max_workers=1,
+        )
+        self.preview = None
+        keys = provider.preview_keys()
+        for key in keys:
+            self.preview = self.cache.get(provider.cache_file, provider.cache_page, key)
+            if self.preview is not None:
+                break
+        if key != keys[0] or self.preview is None:
+            self.preview_scheduler.schedule_pages([keys[0]])
+
+    def boundingRect(self) -> QRectF:
+        return self._rect
+
+    def current_level(self, painter_scale: float) -> int:
+        return level_for_scale(painter_scale, max_level=self.provider.max_level)
+
+    def paint(self, painter, option, widget=None):
+        width, height = self._rect.width(), self._rect.height()
+        exposed = option.exposedRect.intersected(self._rect)
+        view_scale = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        level = self.current_level(view_scale)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+
+        # พื้นหลังเป็น preview ความละเอียดต่ำ ถ้าละเอียดพอสำหรับ zoom ปัจจุบันก็ไม่ต้องใช้ tile
+        if self.preview is None:
+            painter.fillRect(exposed, Qt.GlobalColor.white)
+        else:
+            _draw(painter, self._rect, self.preview)
+        if self.preview is not None and self.preview.width() / width >= level_scale(level):
+            self.scheduler.cancel_all()
+            return
+        if level <= 0:
+            full = self.provider.full_image()
+            if full is not None:
+                self.scheduler.cancel_all()
+                painter.drawPixmap(self._rect, full, QRectF(full.rect()))
+                return
+
+        missing = []
+        visible = self._visible_scene_rect(widget, exposed)
+        for tx, ty in tiles_for_rect(_rect_tuple(visible), level, width, height):
+            key = (level, tx, ty)
+            tile_rect = QRectF(*tile_scene_rect(level, tx, ty, width, height))
+            tile = self.cache.get(self.provider.cache_file, self.provider.cache_page,
+                                  self.provider.tile_key(*key))
+            if tile is None:
+                missing.append(key)
+            elif tile_rect.intersects(exposed):
+                _draw(painter, tile_rect, tile)
+        # ขอเฉพาะ tile ที่มองเห็นอยู่ tile ที่เลื่อนพ้นไปแล้วจะถูกยกเลิก
+        self.scheduler.schedule_pages(missing)
+
+    def shutdown(self):
+        self.preview_scheduler.shutdown()
+        self.scheduler.shutdown()
+
+    def _visible_scene_rect(self, widget, fallback: QRectF) -> QRectF:
+        view = widget.parentWidget() if widget is not None else None
+        if isinstance(view, QGraphicsView):
+            return view.mapToScene(view.viewport().rect()).boundingRect().intersected(self._rect)
+        return fallback
+
+    def _emit(self, signal, key, image):
+        # ถูกเรียกบน worker thread; item อาจถูกลบออกจาก scene ไปแล้ว
+        if sip.isdeleted(self):
+            return
+        try:
+            signal.emit(key, image)
+        except RuntimeError:
+            pass
+
+    def _store_tile(self, key, image: QImage):
+        # ทำงานบน main thread
+        # tile สีเทาเก็บเป็น QImage 8 bit ต่อ pixel (QPixmap จะขยายเป็น 32 bit ต่อ pixel)
+        tile = image if image.format() == QImage.Format.Format_Grayscale8 else QPixmap.fromImage(image)
+        self.cache.put(self.provider.cache_file, self.provider.cache_page, self.provider.tile_key(*key), tile)
+        level, tx, ty = key
+        self.update(QRectF(*tile_scene_rect(level, tx, ty, self._rect.width(), self._rect.height())))
+
+    def _store_preview(self, key, image: QImage):
+        # ทำงานบน main thread: เก็บ preview ลง cache เพื่อให้การกลับมาหน้านี้ไม่ต้อง render ใหม่
+        self.preview = QPixmap.fromImage(image)
+        self.cache.put(self.provider.cache_file, self.provider.cache_page, key, self.preview)
+        self.update()
+
+
+def _draw(painter, rect: QRectF, image):
+    if isinstance(image, QImage):
+        painter.drawImage(rect, image, QRectF(image.rect()))
+    else:
+        painter.drawPixmap(rect, image, QRectF(image.rect()))
+
+
+def _rect_tuple(rect: QRectF) -> tuple:
+    return (rect.x(), rect.y(), rect.width(), rect.height())
@@ -1,5 +1,13 @@
 import sys
 import os
+import tempfile
 
 # เพิ่มโปรเจกต์ root (โฟลเดอร์ที่มี core อยู่) เข้าไปใน sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# ข้อมูลของ API ระหว่างทดสอบอยู่ใน temporary directory (ไม่แตะข้อมูลจริงของผู้ใช้)
+_data_dir = tempfile.mkdtemp(prefix="ocr_ai_test_")
+os.environ["OCR_AI_DB_PATH"] = os.path.join(_data_dir, "annotations.db")
+os.environ["OCR_AI_DOCUMENTS_DIR"] = os.path.join(_data_dir, "documents")
+os.environ["OCR_AI_JOBS_DIR"] = os.path.join(_data_dir, "jobs")
+os.environ["OCR_AI_AUTOSAVE_DIR"] = os.path.join(_data_dir, "autosave")
@@ -5,6 +5,10 @@ from core.annotation import (
     export_annotations,
     export_layoutlm_format,
     validate_annotations,
+    find_overlaps,
+    overlap_violations,
+    SpatialIndex,
+    IncrementalValidator,
     _calculate_overlap,
 )
 
@@ -55,3 +59,84 @@ def test_calculate_overlap():
     overlap = _calculate_overlap(a1, a2)
     # พื้นที่ซ้อนทับ: intersection จาก (5,5) ถึง (10,10) => พื้นที่ = 25; พื้นที่เล็กที่สุด = 100
     assert abs(overlap - 0.25) < 0.01
+
+
+def test_validate_annotations_reports_all_violations():
+    annotations = [
+        Annotation(0, 0, 20, 20, "A"), Annotation(1, 1, 20, 20, "B"),
+        Annotation(100, 100, 20, 20, "C"), Annotation(101, 101, 20, 20, "D"),
+    ]
+    valid, message = validate_annotations(annotations)
+    assert not valid
+    assert "Annotations 0 and 1" in message
+    assert "Annotations 2 and 3" in message
+
+def test_find_overlaps_matches_pairwise_check():
+    import random
+    rng = random.Random(42)
+    annotations = [Annotation(rng.uniform(0, 500), rng.uniform(0, 500),
+                              rng.uniform(5, 40), rng.uniform(5, 40), "W") for _ in range(300)]
+    expected = []
+    for i in range(len(annotations)):
+        for j in range(i + 1, len(annotations)):
+            overlap = _calculate_overlap(annotations[i], annotations[j])
+            if overlap > 0.3:
+                expected.append((i, j))
+    found = [(i, j) for i, j, _ in find_overlaps(annotations, threshold=0.3)]
+    assert found == expected
+
+def test_spatial_index_queries():
+    index = SpatialIndex(cell_size=10)
+    index.insert("a", 0, 0, 15, 15)
+    index.insert("b", 50, 50, 10, 10)
+    assert index.query_point(5, 5) == {"a"}
+    assert index.query(40, 40, 30, 30) == {"b"}
+    assert index.query(200, 200, 5, 5) == set()
+    index.remove("a")
+    assert index.query_point(5, 5) == set()
+    assert len(index) == 1
+
+def test_incremental_validator_tracks_edits():
+    validator = IncrementalValidator()
+    a = Annotation(0, 0, 20, 20, "A")
+    b = Annotation(1, 1, 20, 20, "B")
+    c = Annotation(100, 100, 20, 20, "C")
+    assert validator.add(a) == set()
+    # กล่องที่ซ้อนทับเกินกำหนดทั้งสองกล่องเปลี่ยนสถานะ
+    assert validator.add(b) == {a, b}
+    assert validator.add(c) == set()
+    assert validator.violation_count() == 1
+    valid, message = validator.result([a, b, c])
+    assert not valid
+    assert "Annotations 0 and 1" in message
+    assert validator.remove(b) == {a, b}
+    assert validator.violation_count() == 0
+    assert validator.result([a, c])[0]
+
+def test_incremental_validator_ignores_other_pages():
+    validator = IncrementalValidator()
+    a = Annotation(0, 0, 20, 20, "A", page=0)
+    b = Annotation(1, 1, 20, 20, "B", page=1)
+    assert validator.add(a) == set()
+    assert validator.add(b) == set()
+    assert validator.violation_count() == 0
+    # ย้ายกล่องไปหน้าเดียวกันแล้วตรวจใหม่
+    b.page = 0
+    assert validator.update(b) == {a, b}
+    assert validator.violation_count() == 1
+
+def test_validate_annotations_groups_by_page():
+    # กล่องชุดเดียวกันบนสองหน้า: ชุดใหญ่ (AnnotationBatch) และชุดเล็ก (SpatialIndex) ให้ผลเดียวกับการตรวจทีละหน้า
+    for count in (10, 600):
+        page_boxes = [Annotation(i * 30, 0, 20, 20, "W") for i in range(count)]
+        page_boxes.append(Annotation(1, 1, 20, 20, "X"))
+        annotations = []
+        for page in (0, 1):
+            annotations += [Annotation(a.x, a.y, a.width, a.height, a.label, page=page) for a in page_boxes]
+        pairs = [(i, j) for i, j, _ in overlap_violations(annotations)]
+        assert pairs == [(0, count), (count + 1, 2 * count + 1)]
+        # การตรวจทั้งชุดตรงกับ IncrementalValidator (กรอบเตือนบน canvas)
+        validator = IncrementalValidator()
+        for anno in annotations:
+            validator.add(anno)
+        assert validator.result(annotations) == validate_annotations(annotations)
@@ -0,0 +1,67 @@
+import random
+import numpy as np
+import pytest
+from core.annotation import Annotation, find_overlaps, _calculate_overlap
+from core.annotation_batch import AnnotationBatch
+
+@pytest.fixture
+def random_annotations():
+    rng = random.Random(7)
+    return [Annotation(rng.uniform(0, 800), rng.uniform(0, 800),
+                       rng.uniform(5, 60), rng.uniform(5, 60), rng.choice("ABC")) for _ in range(500)]
+
+def test_round_trip(random_annotations):
+    batch = AnnotationBatch.from_annotations(random_annotations)
+    assert len(batch) == 500
+    assert sorted(batch.labels) == ["A", "B", "C"]
+    restored = batch.to_annotations()
+    assert restored[10].to_dict() == random_annotations[10].to_dict()
+
+def test_overlap_matrix_matches_scalar():
+    annotations = [Annotation(0, 0, 10, 10, "A"), Annotation(5, 5, 10, 10, "B"), Annotation(50, 50, 0, 0, "C")]
+    matrix = AnnotationBatch.from_annotations(annotations).overlap_matrix()
+    assert matrix[0, 1] == pytest.approx(_calculate_overlap(annotations[0], annotations[1]))
+    # กล่องที่ไม่มีพื้นที่ไม่ซ้อนทับกับใคร
+    assert matrix[2, 0] == 0.0
+
+def test_iou_matrix():
+    batch = AnnotationBatch.from_arrays([0, 5], [0, 5], [10, 10], [10, 10])
+    iou = batch.iou_matrix()
+    assert iou[0, 0] == pytest.approx(1.0)
+    assert iou[0, 1] == pytest.approx(25 / 175)
+
+def test_find_overlaps_matches_spatial_index(random_annotations):
+    batch = AnnotationBatch.from_annotations(random_annotations)
+    assert [(i, j) for i, j, _ in batch.find_overlaps(0.3, max_pairs=64)] == \
+        [(i, j) for i, j, _ in find_overlaps(random_annotations, 0.3)]
+
+def test_clip_filter_and_scale():
+    batch = AnnotationBatch.from_arrays([-10, 90, 10], [0, 90, 10], [20, 20, 1], [20, 20, 1])
+    clipped = batch.clip(100, 100)
+    assert clipped.xyxy().tolist()[0] == [0, 0, 10, 20]
+    assert clipped.xyxy().tolist()[1] == [90, 90, 100, 100]
+    assert len(batch.filter_area(min_area=10)) == 2
+    points = batch.to_pdf_points(zoom=3.0)
+    assert points.boxes["width"][0] == pytest.approx(20 / 3)
+    assert np.allclose(points.from_pdf_points(zoom=3.0).xyxy(), batch.xyxy())
+
+def test_find_overlaps_normalizes_negative_sizes(random_annotations):
+    # กล่องที่ลากกลับด้าน (width/height ติดลบ) ให้ผลเหมือนกล่องปกติทั้งสอง engine
+    annotations = random_annotations + [Annotation(10, 500, 20, -300, "A"), Annotation(30, 200, -20, 300, "B")]
+    violations = AnnotationBatch.from_annotations(annotations).find_overlaps(0.8)
+    assert (500, 501, pytest.approx(1.0)) in violations
+    assert [(i, j) for i, j, _ in violations] == [(i, j) for i, j, _ in find_overlaps(annotations, 0.8)]
+
+@pytest.mark.parametrize("height", [0.0, 1e-12])
+def test_find_overlaps_with_degenerate_median_height(height):
+    # median ความสูงเป็น 0 ต้องไม่ทำให้แถบบางจนจองหน่วยความจำมหาศาล
+    annotations = [Annotation(i * 3.0, i * 2.0, 5, height, "A") for i in range(600)]
+    annotations += [Annotation(0, 0, 100, 1000, "B"), Annotation(10, 10, 50, 50, "C")]
+    violations = AnnotationBatch.from_annotations(annotations).find_overlaps(0.8)
+    assert (600, 601, pytest.approx(1.0)) in violations
+    assert [(i, j) for i, j, _ in violations] == [(i, j) for i, j, _ in find_overlaps(annotations, 0.8)]
+
+def test_find_overlaps_ignores_non_finite_boxes(random_annotations):
+    annotations = random_annotations + [Annotation(float("nan"), 0, 10, 10, "A")]
+    assert AnnotationBatch.from_annotations(annotations).find_overlaps(0.3) == \
+        AnnotationBatch.from_annotations(random_annotations).find_overlaps(0.3)
@@ -0,0 +1,61 @@
+import threading
+import pytest
+from core import annotation_store
+from core.annotation import Annotation
+from core.annotation_store import AnnotationStore, PoolTimeoutError
+
+def test_store_persists_and_filters(tmp_path):
+    path = str(tmp_path / "annotations.db")
+    store = AnnotationStore(path)
+    store.add(Annotation(0, 0, 10, 10, "total", page=0), document="a.pdf")
+    store.add(Annotation(5, 5, 10, 10, "date", page=1), document="a.pdf")
+    store.add({"x": 1, "y": 2, "width": 3, "height": 4, "label": "total", "document": "b.pdf"})
+    store.close()
+
+    # เปิดไฟล์เดิมใหม่ (เหมือน restart หรือ worker อีกตัว) ข้อมูลต้องยังอยู่
+    reopened = AnnotationStore(path)
+    assert reopened.count() == 3
+    assert [row["label"] for row in reopened.iter_rows(document="a.pdf")] == ["total", "date"]
+    assert reopened.count(document="a.pdf", page=1) == 1
+    assert [row["document"] for row in reopened.iter_rows(label="total")] == ["a.pdf", "b.pdf"]
+    row = next(reopened.iter_rows(document="b.pdf"))
+    assert "page" not in row and "color" not in row
+    annotation = next(reopened.iter_annotations(page=1))
+    assert (annotation.x, annotation.label, annotation.page) == (5, "date", 1)
+    reopened.close()
+
+def test_store_uses_wal_and_pooled_connections(tmp_path):
+    store = AnnotationStore(str(tmp_path / "annotations.db"), pool_size=2)
+    with store.pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def add_many(worker):
+        for i in range(50):
+            store.add(Annotation(i, worker, 1, 1, "w"), document=f"doc{worker}")
+
+    threads = [threading.Thread(target=add_many, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.count() == 200
+    assert store.pool._created <= 2
+    store.close()
+
+def test_partly_read_iterators_do_not_hold_connections(tmp_path, monkeypatch):
+    monkeypatch.setattr(annotation_store, "FETCH_SIZE", 10)
+    store = AnnotationStore(str(tmp_path / "annotations.db"), pool_size=2)
+    store.add_many([Annotation(i, 0, 1, 1, "w") for i in range(35)])
+    readers = [store.iter_rows(), store.iter_rows(), store.iter_rows(limit=25)]
+    for reader in readers:
+        next(reader)
+    # ผู้อ่านที่ค้างอยู่ไม่ถือ connection ไว้ request อื่นจึงยังใช้ฐานข้อมูลได้
+    assert store.count() == 35
+    assert len(list(readers[0])) == 34
+    assert len(list(readers[2])) == 24
+
+    store.pool.timeout = 0.05
+    with store.pool.connection(), store.pool.connection():
+        with pytest.raises(PoolTimeoutError):
+            store.count()
+    store.close()
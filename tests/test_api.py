@@ -1,6 +1,11 @@
+import json
+import time
 import pytest
+import fitz
 from fastapi.testclient import TestClient
-from api.api_handler import app
+from api.api_handler import app, get_job_queue, get_store
+from core.annotation_store import AnnotationStore
+from core.jobs import JobQueue
 
 client = TestClient(app)
 
@@ -43,3 +48,157 @@ def test_validate_endpoint():
     data = response.json()
     assert "valid" in data
     assert "message" in data
+
+def test_annotations_keep_document_and_page():
+    payload = {"x": 1, "y": 2, "width": 3, "height": 4, "label": "Total", "document": "invoice.pdf", "page": 2}
+    created = client.post("/annotations", json=payload).json()
+    assert created["id"] > 0
+    assert (created["document"], created["page"]) == ("invoice.pdf", 2)
+    stored = [a for a in client.get("/annotations").json() if a["id"] == created["id"]]
+    assert stored == [created]
+
+def test_annotations_pagination_and_filters():
+    for i in range(5):
+        client.post("/annotations", json={"x": i * 100, "y": 0, "width": 50, "height": 50,
+                                          "label": "Cell", "document": "grid.pdf", "page": 0})
+    params = {"document": "grid.pdf", "limit": 2}
+    seen = []
+    response = client.get("/annotations", params=params)
+    while True:
+        assert response.status_code == 200
+        seen += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        response = client.get("/annotations", params={**params, "cursor": cursor})
+    assert [a["x"] for a in seen] == [0, 100, 200, 300, 400]
+
+    # เฉพาะกล่องที่ซ้อนทับ region
+    overlapping = client.get("/annotations", params={"document": "grid.pdf", "region": "120,10,260,20"}).json()
+    assert [a["x"] for a in overlapping] == [100, 200]
+    assert client.get("/annotations", params={"region": "1,2"}).status_code == 400
+
+def test_annotations_stream_ndjson():
+    client.post("/annotations", json={"x": 1, "y": 1, "width": 1, "height": 1, "label": "S", "document": "s.pdf"})
+    response = client.get("/annotations/stream", params={"document": "s.pdf"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["label"] for line in lines] == ["S"]
+
+def test_bulk_ingest_json_and_ndjson():
+    boxes = [{"x": i * 20, "y": 0, "width": 10, "height": 10, "label": "Word"} for i in range(100)]
+    response = client.post("/annotations/bulk", params={"document": "bulk.pdf", "page": 3}, json=boxes)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["inserted"] == 100
+    assert result["last_id"] - result["first_id"] == 99
+    assert len(client.get("/annotations", params={"document": "bulk.pdf", "page": 3}).json()) == 100
+
+    body = "\n".join(json.dumps(box) for box in boxes[:3]) + "\n"
+    response = client.post("/annotations/bulk", params={"document": "bulk.ndjson"}, content=body,
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.json()["inserted"] == 3
+
+def test_bulk_ingest_is_transactional():
+    boxes = [{"x": 0, "y": 0, "width": 10, "height": 10, "label": "A"},
+             {"x": 1, "y": 1, "width": 10, "height": 10, "label": "B"},
+             {"x": 50, "y": 50, "width": 10, "height": 10}]
+    # รายการที่ไม่ถูกต้องทำให้ไม่มีรายการใดถูกเพิ่ม
+    response = client.post("/annotations/bulk", params={"document": "tx.pdf"}, json=boxes)
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][0] == 2
+    boxes[2]["label"] = "C"
+    response = client.post("/annotations/bulk", params={"document": "tx.pdf", "reject_overlaps": True}, json=boxes)
+    assert response.status_code == 422
+    assert response.json()["detail"]["violations"][0]["a"] == 0
+    assert client.get("/annotations", params={"document": "tx.pdf"}).json() == []
+
+    response = client.post("/annotations/bulk", params={"document": "tx.pdf", "check_overlaps": True}, json=boxes)
+    assert response.json()["valid"] is False
+    assert response.json()["inserted"] == 3
+
+def wait_for_job(job_id, timeout=10.0):
+    deadline = time.time() + timeout
+    while True:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed", "cancelled") or time.time() > deadline:
+            return job
+        time.sleep(0.05)
+
+@pytest.fixture
+def uploaded_pdf():
+    doc = fitz.open()
+    for _ in range(2):
+        doc.new_page(width=200, height=300)
+    data = doc.tobytes()
+    doc.close()
+    response = client.post("/documents", params={"filename": "job.pdf"}, content=data)
+    assert response.status_code == 201
+    return response.json()["document_id"]
+
+def test_upload_rejects_unsupported_type():
+    response = client.post("/documents", params={"filename": "notes.txt"}, content=b"hello")
+    assert response.status_code == 415
+    assert client.post("/documents/" + "0" * 64 + "/jobs", json={"kind": "render"}).status_code == 404
+
+def test_render_job(uploaded_pdf):
+    response = client.post(f"/documents/{uploaded_pdf}/jobs", json={"kind": "render", "pages": [1], "dpi": 144})
+    assert response.status_code == 202
+    assert response.headers["Location"] == f"/jobs/{response.json()['id']}"
+    job = wait_for_job(response.json()["id"])
+    assert job["status"] == "done"
+    assert job["result"]["pages"] == [{"page": 1, "file": "page-2.png", "width": 400, "height": 600}]
+    response = client.get(f"/jobs/{job['id']}/files/page-2.png")
+    assert response.status_code == 200
+    assert response.content.startswith(b"\x89PNG")
+
+def test_export_job(uploaded_pdf):
+    client.post("/annotations/bulk", params={"document": uploaded_pdf, "page": 0},
+                json=[{"x": 10, "y": 10, "width": 50, "height": 20, "label": "total"}])
+    response = client.post(f"/documents/{uploaded_pdf}/jobs", json={"kind": "export", "document_type": "Invoice"})
+    job = wait_for_job(response.json()["id"])
+    assert job["status"] == "done"
+    assert client.get(f"/jobs/{job['id']}/result").json()["records"] == 1
+    record = json.loads(client.get(f"/jobs/{job['id']}/files/records.jsonl").text)
+    assert record["layout"]["label"] == ["total"]
+
+def test_job_queue_full_returns_429(uploaded_pdf):
+    queue = JobQueue(max_workers=1, max_pending=0)
+    app.dependency_overrides[get_job_queue] = lambda: queue
+    try:
+        response = client.post(f"/documents/{uploaded_pdf}/jobs", json={"kind": "render"})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+def test_bulk_ingest_rejects_bad_geometry():
+    boxes = [{"x": i * 20, "y": 0, "width": 10, "height": 10, "label": "Word"} for i in range(600)]
+    boxes.append({"x": 10, "y": 500, "width": 20, "height": -300, "label": "Word"})
+    response = client.post("/annotations/bulk", params={"document": "geometry.pdf", "check_overlaps": True},
+                           json=boxes)
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][:2] == [600, "height"]
+
+    body = '[{"x": NaN, "y": 0, "width": 10, "height": 10, "label": "Word"}]'
+    response = client.post("/annotations/bulk", params={"document": "geometry.pdf"}, content=body,
+                           headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][:2] == [0, "x"]
+    assert client.post("/annotations", json={"x": 0, "y": 0, "width": -1, "height": 1, "label": "A"}).status_code == 422
+    response = client.post("/annotations", content=body[1:-1], headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+    assert client.get("/annotations", params={"document": "geometry.pdf"}).json() == []
+
+def test_busy_connection_pool_returns_503(tmp_path):
+    store = AnnotationStore(str(tmp_path / "busy.db"), pool_size=1)
+    store.pool.timeout = 0.05
+    app.dependency_overrides[get_store] = lambda: store
+    try:
+        with store.pool.connection():
+            response = client.get("/annotations")
+    finally:
+        app.dependency_overrides.clear()
+        store.close()
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
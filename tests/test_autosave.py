@@ -2,7 +2,8 @@ import os
 import json
 import time
 import pytest
-from core.autosave import AutoSaveManager
+from core.autosave import AutoSaveManager, AutoSaveStore
+from core.disk_cache import file_content_hash
 from core.document_handler import DocumentHandler
 from core.annotation import Annotation
 
@@ -51,3 +52,137 @@ def test_cleanup_old_autosaves(tmp_path, sample_document_handler, sample_annotat
     
     manager.cleanup_old_autosaves(max_age_seconds=3600)
     assert not os.path.exists(autosave_path)
+
+def test_auto_save_appends_journal(tmp_path, sample_document_handler):
+    autosave_path = tmp_path / "autosave.json"
+    manager = AutoSaveManager(str(autosave_path))
+    annotations = [Annotation(i * 20, 0, 10, 10, "Test") for i in range(3)]
+    manager.auto_save(sample_document_handler, annotations)
+    snapshot_mtime = os.path.getmtime(autosave_path)
+
+    # การบันทึกครั้งถัดไปเขียนเฉพาะการแก้ไขลง journal โดยไม่เขียน snapshot ใหม่
+    added = Annotation(100, 0, 10, 10, "New")
+    annotations.append(added)
+    manager.record_add(added)
+    removed = annotations.pop(0)
+    manager.record_remove(removed)
+    annotations[0].label = "Changed"
+    manager.record_modify(annotations[0])
+    manager.auto_save(sample_document_handler, annotations)
+
+    assert os.path.getmtime(autosave_path) == snapshot_mtime
+    with open(manager.journal_path, "r", encoding="utf-8") as f:
+        assert len(f.readlines()) == 3
+    data = AutoSaveManager(str(autosave_path)).check_for_autosave()
+    assert sorted(a["label"] for a in data["annotations"]) == ["Changed", "New", "Test"]
+
+def test_journal_compacts_into_snapshot(tmp_path, sample_document_handler):
+    manager = AutoSaveManager(str(tmp_path / "autosave.json"), compact_min_records=2)
+    annotations = []
+    manager.auto_save(sample_document_handler, annotations)
+    for i in range(5):
+        anno = Annotation(i * 20, 0, 10, 10, "Test")
+        annotations.append(anno)
+        manager.record_add(anno)
+        manager.auto_save(sample_document_handler, annotations)
+    with open(manager.journal_path, "r", encoding="utf-8") as f:
+        assert len(f.readlines()) <= 2
+    assert len(manager.check_for_autosave()["annotations"]) == 5
+
+def test_recovery_ignores_truncated_and_stale_journal(tmp_path, sample_document_handler, sample_annotations):
+    manager = AutoSaveManager(str(tmp_path / "autosave.json"))
+    manager.auto_save(sample_document_handler, sample_annotations)
+    anno = Annotation(50, 50, 10, 10, "Later")
+    sample_annotations.append(anno)
+    manager.record_add(anno)
+    manager.auto_save(sample_document_handler, sample_annotations)
+    with open(manager.journal_path, "a", encoding="utf-8") as f:
+        # record ของ snapshot รุ่นอื่น และบรรทัดที่เขียนไม่ครบ
+        f.write(json.dumps({"op": "remove", "id": 0, "generation": -1}) + "\n")
+        f.write('{"op": "add", "id": 9')
+    data = manager.check_for_autosave()
+    assert [a["label"] for a in data["annotations"]] == ["Test", "Later"]
+
+def test_auto_save_skips_when_clean(tmp_path, sample_document_handler, sample_annotations):
+    manager = AutoSaveManager(str(tmp_path / "autosave.json"))
+    assert not manager.is_dirty()
+    manager.mark_dirty()
+    assert manager.is_dirty()
+    manager.auto_save(sample_document_handler, sample_annotations)
+    assert not manager.is_dirty()
+    saves = manager.stats()["saves"]
+    assert manager.auto_save_async(sample_document_handler, sample_annotations) is None
+    assert manager.stats()["saves"] == saves
+
+def test_auto_save_async_writes_in_background(tmp_path, sample_document_handler, sample_annotations):
+    manager = AutoSaveManager(str(tmp_path / "autosave.json"))
+    manager.auto_save_async(sample_document_handler, sample_annotations).result(timeout=10)
+    anno = Annotation(50, 50, 10, 10, "Later")
+    sample_annotations.append(anno)
+    manager.record_add(anno)
+    future = manager.auto_save_async(sample_document_handler, sample_annotations)
+    # แก้ไขต่อได้ทันทีโดยไม่กระทบข้อมูลที่ส่งไปเขียนแล้ว
+    anno.label = "Edited"
+    future.result(timeout=10)
+    manager.shutdown()
+
+    stats = manager.stats()
+    assert stats["saves"] == 2
+    assert stats["bytes_written"] > stats["last_bytes"] > 0
+    data = manager.check_for_autosave()
+    assert [a["label"] for a in data["annotations"]] == ["Test", "Later"]
+
+def _write_document(path, content):
+    path.write_bytes(content)
+    return str(path)
+
+def test_failed_async_write_forces_snapshot(tmp_path, sample_document_handler, sample_annotations):
+    manager = AutoSaveManager(str(tmp_path / "autosave.json"))
+    manager.auto_save(sample_document_handler, sample_annotations)
+    # journal เขียนไม่ได้: thread เบื้องหลังต้อง reset สถานะให้ครั้งถัดไปเขียน snapshot ใหม่
+    os.remove(manager.journal_path)
+    os.mkdir(manager.journal_path)
+    added = Annotation(5, 5, 10, 10, "New")
+    manager.record_add(added)
+    manager.auto_save_async(sample_document_handler, sample_annotations + [added]).result(timeout=10)
+    assert manager.stats()["errors"] == 1
+    assert manager.is_dirty()
+    os.rmdir(manager.journal_path)
+    manager.auto_save_async(sample_document_handler, sample_annotations + [added]).result(timeout=10)
+    manager.shutdown()
+    assert len(manager.check_for_autosave()["annotations"]) == 2
+
+def test_store_keeps_documents_separate(tmp_path):
+    store = AutoSaveStore(str(tmp_path / "store"))
+    first = _write_document(tmp_path / "first.pdf", b"first")
+    second = _write_document(tmp_path / "second.pdf", b"second")
+    handler = DocumentHandler()
+
+    handler.filepath = first
+    store.manager_for(first).auto_save(handler, [Annotation(0, 0, 10, 10, "A", page=0),
+                                                 Annotation(0, 0, 10, 10, "B", page=1)])
+    handler.filepath = second
+    store.manager_for(second).auto_save(handler, [Annotation(0, 0, 10, 10, "C")])
+
+    assert [a["label"] for a in store.recover(first)["annotations"]] == ["A", "B"]
+    assert [a["label"] for a in store.recover(first, page=1)["annotations"]] == ["B"]
+    assert [a["label"] for a in store.recover(second)["annotations"]] == ["C"]
+    assert store.recover(_write_document(tmp_path / "third.pdf", b"third")) is None
+
+def test_store_cleanup_removes_only_old_documents(tmp_path):
+    store = AutoSaveStore(str(tmp_path / "store"))
+    handler = DocumentHandler()
+    paths = [_write_document(tmp_path / f"doc{i}.pdf", f"doc{i}".encode()) for i in range(3)]
+    for path in paths:
+        handler.filepath = path
+        manager = store.manager_for(path)
+        manager.auto_save(handler, [Annotation(0, 0, 10, 10, "A")])
+        store.release(manager)
+    old_time = time.time() - 7200
+    old_snapshot = store.path_for(file_content_hash(paths[0]))
+    for name in (old_snapshot, old_snapshot + ".journal"):
+        os.utime(name, (old_time, old_time))
+
+    assert store.cleanup_old_autosaves(max_age_seconds=3600) == 1
+    assert store.recover(paths[0]) is None
+    assert store.recover(paths[1]) is not None
@@ -0,0 +1,150 @@
+import os
+import json
+import pytest
+import fitz
+from PIL import Image
+from core.annotation import Annotation, export_annotations
+from core.batch_export import find_jobs, export_dataset, main
+from core.render_profiles import OCR_PROFILE
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    documents = tmp_path / "documents"
+    documents.mkdir()
+    doc = fitz.open()
+    for _ in range(3):
+        doc.new_page(width=200, height=300)
+    doc.save(str(documents / "invoice.pdf"))
+    doc.close()
+    Image.new("RGB", (64, 48), "white").save(documents / "receipt.png")
+    Image.new("RGB", (64, 48), "white").save(documents / "unlabelled.png")
+
+    (documents / "invoice.json").write_text(export_annotations([
+        Annotation(0, 0, 30, 30, "total", page=0),
+        Annotation(10, 10, 30, 30, "date", page=2),
+        Annotation(50, 10, 30, 30, "name", page=2),
+    ]))
+    (documents / "receipt.json").write_text(export_annotations([Annotation(1, 2, 3, 4, "shop")]))
+    return documents
+
+def test_find_jobs_requires_annotations(dataset_dir):
+    jobs = find_jobs(str(dataset_dir))
+    assert [os.path.basename(job.document_path) for job in jobs] == ["invoice.pdf", "receipt.png"]
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_export_dataset(dataset_dir, tmp_path, use_processes):
+    output = tmp_path / "out"
+    totals = export_dataset(str(dataset_dir), str(output), document_type="Invoice",
+                            render_images=True, max_workers=2, use_processes=use_processes)
+    assert (totals["documents"], totals["pages"], totals["boxes"], totals["errors"]) == (2, 3, 4, 0)
+
+    record = json.loads((output / "invoice_page_3_layoutlm.json").read_text())
+    assert record["page_number"] == 3
+    assert record["document_type"] == "Invoice"
+    # ขนาดหน้าอยู่ในพิกัดเดียวกับ annotation (pixel ที่ zoom 3)
+    assert (record["width"], record["height"]) == (600, 900)
+    assert record["layout"]["bbox"] == [[10, 10, 40, 40], [50, 10, 80, 40]]
+    # กล่องเดียวกันในหน่วย point ของ PDF
+    assert [pytest.approx(bbox) for bbox in record["layout"]["bbox_points"]] == [
+        [10 / 3, 10 / 3, 40 / 3, 40 / 3], [50 / 3, 10 / 3, 80 / 3, 40 / 3]]
+    assert record["layout"]["label"] == ["date", "name"]
+    assert os.path.exists(output / record["image_path"])
+    # ไฟล์ภาพไม่มีหน่วย point ของ PDF
+    assert "bbox_points" not in json.loads((output / "receipt_layoutlm.json").read_text())["layout"]
+    assert not (output / "invoice_page_2_layoutlm.json").exists()
+
+def test_main_cli(dataset_dir, tmp_path):
+    assert main([str(dataset_dir), str(tmp_path / "out"), "--threads"]) == 0
+    assert len(os.listdir(tmp_path / "out")) == 3
+
+def test_export_dataset_as_shards(dataset_dir, tmp_path):
+    from core.jsonl_export import ShardedJsonlReader
+    output = tmp_path / "shards"
+    totals = export_dataset(str(dataset_dir), str(output), output_format="shards", use_processes=False)
+    assert totals["pages"] == 3
+    reader = ShardedJsonlReader(str(output))
+    record = reader.get(str(dataset_dir / "invoice.pdf"), 2)
+    assert record["layout"]["label"] == ["date", "name"]
+
+def test_export_dataset_with_ocr(dataset_dir, tmp_path):
+    output = tmp_path / "ocr"
+    export_dataset(str(dataset_dir), str(output), use_processes=False,
+                   ocr_backend="stub", ocr_cache_dir=str(tmp_path / "ocr_cache"),
+                   ocr_profile=OCR_PROFILE.replace(dpi=288))
+    record = json.loads((output / "invoice_page_3_layoutlm.json").read_text())
+    # กล่อง 30 pixel ที่ zoom 3 (10 point) ถูก OCR บนภาพ 288 dpi (zoom 4) จึงมีขนาด 40 pixel
+    assert record["layout"]["words"] == ["40x40", "40x40"]
+    # พิกัดใน record ยังอยู่ในพิกัดของ annotation
+    assert record["layout"]["bbox"] == [[10, 10, 40, 40], [50, 10, 80, 40]]
+    assert all(0.0 <= c <= 1.0 for c in record["layout"]["confidence"])
+
+def test_export_uses_pdf_text_layer(tmp_path):
+    documents = tmp_path / "digital"
+    documents.mkdir()
+    doc = fitz.open()
+    page = doc.new_page(width=200, height=300)
+    page.insert_text((20, 40), "Total 100")
+    doc.save(str(documents / "bill.pdf"))
+    doc.close()
+    (documents / "bill.json").write_text(export_annotations([Annotation(0, 90, 600, 60, "total", page=0)]))
+
+    output = tmp_path / "out"
+    export_dataset(str(documents), str(output), use_processes=False, ocr_backend="stub",
+                   ocr_cache_dir=str(tmp_path / "ocr_cache"))
+    record = json.loads((output / "bill_page_1_layoutlm.json").read_text())
+    assert record["layout"]["words"] == ["Total 100"]
+    # หน้าที่มี text layer ไม่ต้อง OCR
+    assert not (tmp_path / "ocr_cache").exists()
+
+def test_export_multi_frame_image(tmp_path):
+    documents = tmp_path / "scans"
+    documents.mkdir()
+    frames = [Image.new("RGB", (64, 48), "white"), Image.new("RGB", (80, 60), "white")]
+    frames[0].save(documents / "batch.tiff", save_all=True, append_images=frames[1:])
+    (documents / "batch.json").write_text(export_annotations([
+        Annotation(1, 2, 3, 4, "first", page=0),
+        Annotation(5, 6, 7, 8, "second", page=1),
+    ]))
+    output = tmp_path / "out"
+    totals = export_dataset(str(documents), str(output), render_images=True, use_processes=False)
+    assert (totals["pages"], totals["boxes"]) == (2, 2)
+    # แต่ละ frame เป็นหนึ่งหน้า มีขนาดของตัวเองและไม่เขียนทับกัน
+    record = json.loads((output / "batch_page_2_layoutlm.json").read_text())
+    assert (record["width"], record["height"]) == (80, 60)
+    assert record["layout"]["label"] == ["second"]
+    assert Image.open(output / record["image_path"]).size == (80, 60)
+    assert (output / "batch_page_1_layoutlm.json").exists()
+
+class _Combo:
+    def currentText(self):
+        return "Invoice"
+
+class _PageSource:
+    zoom = 3.0
+
+    def page_size(self, index):
+        return (600, 900)
+
+def test_gui_exporter_uses_text_layer_and_ocr(tmp_path):
+    from core.annotation import LayoutLMExporter
+    pdf_path = str(tmp_path / "bill.pdf")
+    doc = fitz.open()
+    doc.new_page(width=200, height=300).insert_text((20, 40), "Total 100")
+    doc.save(pdf_path)
+    doc.close()
+    scan_path = str(tmp_path / "scan.png")
+    Image.new("RGB", (64, 48), "white").save(scan_path)
+    pages = [{"path": "bill-1", "type": "pdf_page", "original_path": pdf_path, "page": 1},
+             {"path": scan_path, "type": "image", "original_path": scan_path}]
+    file_annotations = {
+        "bill-1": [{"coordinates": {"x1": 0, "y1": 90, "x2": 600, "y2": 150}, "label": "total"}],
+        scan_path: [{"coordinates": {"x1": 2, "y1": 2, "x2": 12, "y2": 22}, "label": "shop"}],
+    }
+    exporter = LayoutLMExporter({"pages": pages}, file_annotations, _Combo(), page_source=_PageSource(),
+                                ocr_backend="stub", ocr_cache_dir=str(tmp_path / "ocr_cache"))
+    exporter.export_layoutlm_format(str(tmp_path))
+    digital = json.loads((tmp_path / "bill_page_1_layoutlm.json").read_text())
+    assert digital["layout"]["words"] == ["Total 100"]
+    scanned = json.loads((tmp_path / "scan_layoutlm.json").read_text())
+    # หน้าที่ไม่มี text layer ถูก OCR (stub คืนขนาดของภาพที่ตัด)
+    assert scanned["layout"]["words"] == ["10x20"]
@@ -0,0 +1,101 @@
+import os
+import time
+import pytest
+from core.disk_cache import DiskPageCache, file_content_hash
+
+def test_put_and_get(tmp_path):
+    cache = DiskPageCache(str(tmp_path / "cache"), max_bytes=1024)
+    assert cache.get("abcd", 0, 3.0) is None
+    cache.put("abcd", 0, 3.0, b"pixels")
+    assert cache.get("abcd", 0, 3.0) == b"pixels"
+    # zoom ต่างกันต้องเป็นคนละรายการ
+    assert cache.get("abcd", 0, ("thumbnail", 100)) is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskPageCache(str(tmp_path / "cache"), max_bytes=250)
+    for page in range(2):
+        cache.put("abcd", page, 3.0, b"x" * 100)
+    # ทำให้หน้า 0 เก่ากว่าหน้า 1 แล้วอ่านหน้า 0 เพื่อให้เป็นรายการที่ใช้ล่าสุด
+    old = time.time() - 100
+    os.utime(cache.path_for("abcd", 0, 3.0), (old, old))
+    os.utime(cache.path_for("abcd", 1, 3.0), (old + 1, old + 1))
+    cache.get("abcd", 0, 3.0)
+    cache.put("abcd", 2, 3.0, b"x" * 100)
+    assert cache.get("abcd", 0, 3.0) is not None
+    assert not os.path.exists(cache.path_for("abcd", 1, 3.0))
+    assert cache.stats()["bytes"] <= 250
+
+def test_overwrite_and_failed_write_keep_accounting(tmp_path, monkeypatch):
+    cache = DiskPageCache(str(tmp_path / "cache"), max_bytes=250)
+    cache.put("abcd", 0, 3.0, b"x" * 10)
+    cache.stats()
+    for _ in range(5):
+        cache.put("abcd", 0, 3.0, b"x" * 100)
+    # เขียนทับ key เดิมนับขนาดครั้งเดียว จึงไม่ต้อง evict
+    assert cache.stats()["bytes"] == 100
+    assert cache.stats()["evictions"] == 0
+
+    def fail_replace(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "replace", fail_replace)
+    cache.put("abcd", 1, 3.0, b"x" * 100)
+    folder = os.path.dirname(cache.path_for("abcd", 0, 3.0))
+    assert not [name for name in os.listdir(folder) if name.endswith(".tmp")]
+    assert cache.stats()["bytes"] == 100
+
+def test_file_content_hash(tmp_path):
+    a = tmp_path / "a.pdf"
+    b = tmp_path / "b.pdf"
+    a.write_bytes(b"same content")
+    b.write_bytes(b"same content")
+    # key อิงจากเนื้อหาไฟล์ ไม่ใช่ path
+    assert file_content_hash(str(a)) == file_content_hash(str(b))
+    # ผลที่จำไว้มีจำนวนจำกัด
+    from core.disk_cache import _content_hash, HASH_MEMO_SIZE
+    assert _content_hash.cache_info().maxsize == HASH_MEMO_SIZE
+
+def test_reopened_document_reads_from_disk(qtbot, tmp_path):
+    import fitz
+    from gui.pdf_source import PdfPageSource
+    pdf_path = str(tmp_path / "doc.pdf")
+    doc = fitz.open()
+    doc.new_page(width=100, height=100)
+    doc.save(pdf_path)
+    cache = DiskPageCache(str(tmp_path / "cache"))
+    source = PdfPageSource(pdf_path, disk_cache=cache)
+    source.render_page(0)
+    source.close()
+    reopened = PdfPageSource(pdf_path, disk_cache=cache)
+    image = reopened.render_image(0)
+    assert image.width() == 300
+    assert cache.stats()["hits"] == 1
+    reopened.close()
+
+def test_tiles_keyed_by_zoom_and_resolved_colorspace(qtbot, tmp_path):
+    import fitz
+    from PyQt6.QtGui import QImage
+    from gui.pdf_source import PdfPageSource
+    from core.render_profiles import VIEWING_PROFILE
+    pdf_path = str(tmp_path / "gray.pdf")
+    doc = fitz.open()
+    doc.new_page(width=100, height=100).insert_text((10, 20), "Gray page")
+    doc.save(pdf_path)
+    cache = DiskPageCache(str(tmp_path / "cache"))
+    auto = PdfPageSource(pdf_path, disk_cache=cache)
+    assert auto.render_tile(0, 0, 0, 0).format() == QImage.Format.Format_Grayscale8
+    # source ที่ zoom ต่างกันหรือ profile "rgb" ต้องไม่ได้ tile ของ source แรก
+    zoomed = PdfPageSource(pdf_path, zoom=1.0, disk_cache=cache)
+    assert zoomed.tile_key(0, 0, 0) != auto.tile_key(0, 0, 0)
+    assert zoomed.render_tile(0, 0, 0, 0).width() == 100
+    rgb = PdfPageSource(pdf_path, disk_cache=cache, profile=VIEWING_PROFILE.replace(colorspace="rgb"))
+    assert rgb.render_tile(0, 0, 0, 0).format() == QImage.Format.Format_RGB888
+    # หน้าขาวดำของ "auto" ใช้ภาพเดียวกับ profile "gray"
+    gray = PdfPageSource(pdf_path, disk_cache=cache, profile=VIEWING_PROFILE.replace(colorspace="gray"))
+    hits = cache.stats()["hits"]
+    gray.render_tile(0, 0, 0, 0)
+    assert cache.stats()["hits"] == hits + 1
+    for source in (auto, zoomed, rgb, gray):
+        source.close()
@@ -22,3 +22,33 @@ def test_load_image(sample_image):
     assert "size" in info
     # ตรวจสอบขนาดภาพ (100, 100)
     assert info["size"] == (100, 100)
+
+@pytest.fixture
+def text_pdf(tmp_path):
+    import fitz
+    file_path = tmp_path / "text.pdf"
+    doc = fitz.open()
+    page = doc.new_page(width=200, height=300)
+    page.insert_text((20, 40), "Invoice Total")
+    page.insert_text((20, 100), "Date")
+    doc.new_page(width=200, height=300)  # หน้าไม่มี text layer (เช่น ภาพสแกน)
+    doc.save(str(file_path))
+    doc.close()
+    return str(file_path)
+
+def test_word_index_in_canvas_coordinates(text_pdf):
+    handler = DocumentHandler()
+    handler.load_image(text_pdf)
+    index = handler.word_index(0)
+    assert index.has_text
+    assert not handler.word_index(1).has_text
+    # ข้อความที่ y=40 pt อยู่ที่ประมาณ y=120 px ในพิกัด canvas (zoom 3.0)
+    assert handler.text_in_rect(0, 0, 90, 600, 60) == "Invoice Total"
+    assert handler.text_in_rect(0, 0, 270, 600, 60) == "Date"
+    assert handler.text_in_rect(0, 0, 0, 10, 10) == ""
+
+def test_word_index_not_available_for_images(sample_image):
+    handler = DocumentHandler()
+    handler.load_image(sample_image)
+    assert handler.word_index(0) is None
+    assert handler.words_in_rect(0, 0, 0, 100, 100) == []
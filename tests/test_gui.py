@@ -1,6 +1,9 @@
 import pytest
 from PyQt6.QtCore import Qt
 from gui.annotation_canvas import AnnotationCanvas
+from gui.pdf_list_widget import PdfListWidget
+from core.page_cache import PageImageCache
+from gui.pdf_source import PdfPageSource
 
 # ใช้ fixture qtbot (จาก pytest-qt) เพื่อควบคุม widget
 @pytest.fixture
@@ -31,3 +34,162 @@ def test_annotation_drawing(qtbot, canvas):
     assert anno.y == pytest.approx(10, abs=1)
     assert anno.width == pytest.approx(40, abs=1)
     assert anno.height == pytest.approx(40, abs=1)
+
+def test_pdf_list_widget_loads_visible_thumbnails(qtbot, tmp_path):
+    import fitz
+    pdf_path = str(tmp_path / "pages.pdf")
+    doc = fitz.open()
+    for _ in range(50):
+        doc.new_page()
+    doc.save(pdf_path)
+    source = PdfPageSource(pdf_path, cache=PageImageCache())
+    widget = PdfListWidget(source)
+    qtbot.addWidget(widget)
+    widget.resize(200, 400)
+    widget.show()
+    # thumbnail ถูกเติมแบบ asynchronous เฉพาะแถวที่มองเห็น (และแถวเผื่อ) เท่านั้น
+    qtbot.waitUntil(lambda: 0 in widget._loaded_thumbnails, timeout=5000)
+    assert len(widget._loaded_thumbnails) < 50
+    widget.shutdown()
+    source.close()
+
+def test_tiled_canvas_renders_visible_tiles(qtbot):
+    from PIL import Image
+    from gui.tiled_image_item import PilTileProvider
+    annotations = []
+    widget = AnnotationCanvas(annotations)
+    qtbot.addWidget(widget)
+    widget.resize(400, 400)
+    widget.show()
+    cache = PageImageCache()
+    widget.setTiledImage(PilTileProvider(Image.new("RGB", (4000, 4000), "white"), "scan.png"), cache)
+    widget.viewport().grab()
+    # tile ของส่วนที่มองเห็นถูก render บน worker thread แล้วเก็บลง cache
+    qtbot.waitUntil(lambda: cache.contains("scan.png", 0, ("tile", 0, 0, 0)), timeout=5000)
+    assert not cache.contains("scan.png", 0, ("tile", 0, 7, 7))
+
+def test_tiled_preview_rendered_off_gui_thread(qtbot, tmp_path):
+    import threading
+    import fitz
+    from PIL import Image
+    from PyQt6.QtGui import QPixmap
+    from gui.pdf_source import PdfPageSource
+    from gui.tiled_image_item import TiledImageItem, PdfTileProvider, PilTileProvider, PREVIEW_SIZE
+    threads = []
+
+    class RecordingProvider(PilTileProvider):
+        def render_preview(self):
+            threads.append(threading.current_thread())
+            return super().render_preview()
+
+    cache = PageImageCache()
+    item = TiledImageItem(RecordingProvider(Image.new("RGB", (4000, 4000), "white"), "scan.png"), cache)
+    # preview ขนาดเต็มถูก render บน worker thread แล้วเก็บลง cache
+    qtbot.waitUntil(lambda: item.preview is not None, timeout=5000)
+    assert threads and threading.main_thread() not in threads
+    assert cache.contains("scan.png", 0, ("preview", PREVIEW_SIZE))
+    item.shutdown()
+
+    # thumbnail ที่ list widget render ไว้แล้วถูกใช้ทันทีระหว่างรอ preview
+    pdf_path = str(tmp_path / "page.pdf")
+    doc = fitz.open()
+    doc.new_page()
+    doc.save(pdf_path)
+    doc.close()
+    source = PdfPageSource(pdf_path, cache=cache)
+    thumbnail = QPixmap(10, 10)
+    cache.put(pdf_path, 0, source.thumbnail_key(), thumbnail)
+    item = TiledImageItem(PdfTileProvider(source, 0), cache)
+    assert item.preview is thumbnail
+    qtbot.waitUntil(lambda: item.preview is not thumbnail, timeout=5000)
+    assert max(item.preview.width(), item.preview.height()) == PREVIEW_SIZE
+    item.shutdown()
+    source.close()
+
+def test_canvas_marks_overlapping_annotations(qtbot, canvas):
+    widget, annotations = canvas
+    counts = []
+    widget.violationsChanged.connect(counts.append)
+    for offset in (0, 1):
+        start = widget.mapFromScene(10 + offset, 10 + offset)
+        end = widget.mapFromScene(50 + offset, 50 + offset)
+        qtbot.mousePress(widget.viewport(), Qt.MouseButton.LeftButton, pos=start)
+        qtbot.mouseMove(widget.viewport(), pos=end)
+        qtbot.mouseRelease(widget.viewport(), Qt.MouseButton.LeftButton, pos=end)
+    assert counts[-1] == 1
+    assert len(widget.violation_markers) == 2
+    widget.undoLastAnnotation()
+    assert counts[-1] == 0
+    assert not widget.violation_markers
+
+def test_document_loader_reports_progress(qtbot, tmp_path):
+    import fitz
+    from gui.document_loader import DocumentLoader
+    pdf_path = str(tmp_path / "pages.pdf")
+    doc = fitz.open()
+    for _ in range(4):
+        doc.new_page()
+    doc.save(pdf_path)
+    loader = DocumentLoader(cache=PageImageCache())
+    opened, progress, loaded = [], [], []
+    loader.opened.connect(opened.append)
+    loader.progress.connect(lambda done, total: progress.append((done, total)))
+    loader.pageLoaded.connect(lambda source, index, image: loaded.append(index))
+    with qtbot.waitSignal(loader.finished, timeout=10000):
+        loader.load(pdf_path)
+    assert opened[0].page_count == 4
+    # เตรียมเฉพาะหน้าแรก thumbnail ของหน้าอื่นถูก render ตามแถวที่มองเห็นใน PdfListWidget
+    assert progress[-1] == (1, 4)
+    assert loaded == [0]
+    opened[0].close()
+    loader.shutdown()
+
+def test_document_loader_cancel(qtbot, tmp_path):
+    from PIL import Image
+    from gui.document_loader import DocumentLoader
+    path = str(tmp_path / "scan.tiff")
+    frames = [Image.new("RGB", (200, 200), "white") for _ in range(20)]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+    loader = DocumentLoader()
+    finished = []
+    loader.finished.connect(finished.append)
+    # เริ่มโหลดใหม่ระหว่างที่โหลดอยู่: งานแรกถูกยกเลิก
+    with qtbot.waitSignal(loader.cancelled, timeout=10000):
+        loader.load(path)
+        loader.load(path)
+    qtbot.waitUntil(lambda: len(finished) == 1, timeout=10000)
+    assert not loader.is_loading()
+    loader.shutdown()
+
+def test_main_window_restores_autosave(qtbot, tmp_path):
+    from core.annotation import Annotation
+    from core.autosave import AutoSaveStore
+    from core.document_handler import DocumentHandler
+    from gui.main_window import MainWindow
+    path = tmp_path / "scan.png"
+    path.write_bytes(b"scan")
+    store = AutoSaveStore(str(tmp_path / "autosave"))
+    handler = DocumentHandler()
+    handler.filepath = str(path)
+    manager = store.manager_for(str(path))
+    manager.auto_save(handler, [Annotation(0, 0, 10, 10, "A", page=0), Annotation(0, 0, 10, 10, "B", page=1)])
+    store.release(manager)
+
+    window = MainWindow()
+    qtbot.addWidget(window)
+    window.autosave_store = store
+    # ผู้ใช้ปฏิเสธ: ข้อมูลกู้คืนยังอยู่จนกว่าจะมีการแก้ไขใหม่
+    window.ask_restore_autosave = lambda recovered: False
+    window.switch_autosave_document(str(path))
+    assert window.annotations == []
+    assert len(store.recover(str(path))["annotations"]) == 2
+
+    window.ask_restore_autosave = lambda recovered: True
+    window.switch_autosave_document(str(path))
+    assert [anno.label for anno in window.annotations] == ["A", "B"]
+    # canvas แสดงเฉพาะกล่องของหน้าที่เปิดอยู่
+    assert len(window.canvas.annotation_items) == 1
+    window.perform_auto_save()
+    window.autosave_manager.shutdown()
+    assert [a["label"] for a in store.recover(str(path))["annotations"]] == ["A", "B"]
+    window.close()
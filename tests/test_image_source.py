@@ -0,0 +1,29 @@
+import pytest
+from PIL import Image
+from gui.image_source import ImagePageSource
+
+@pytest.fixture
+def multi_frame_tiff(tmp_path):
+    file_path = tmp_path / "scan.tiff"
+    frames = [Image.new("RGB", (300 + 100 * i, 200), color) for i, color in enumerate(("white", "gray", "black"))]
+    frames[0].save(file_path, save_all=True, append_images=frames[1:])
+    return str(file_path)
+
+def test_each_frame_is_a_page(qtbot, multi_frame_tiff):
+    source = ImagePageSource(multi_frame_tiff)
+    assert source.page_count == 3
+    assert source.page_size(2) == (500, 200)
+    assert source.frame(1).getpixel((0, 0)) == (128, 128, 128)
+    thumbnail = source.render_thumbnail_image(2, 100)
+    assert (thumbnail.width(), thumbnail.height()) == (100, 40)
+    with pytest.raises(IndexError):
+        source.frame(3)
+    source.close()
+
+def test_single_frame_image(qtbot, tmp_path):
+    path = str(tmp_path / "page.png")
+    Image.new("RGB", (50, 60), "white").save(path)
+    source = ImagePageSource(path)
+    assert source.page_count == 1
+    assert source.page_size(0) == (50, 60)
+    source.close()
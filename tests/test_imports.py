@@ -0,0 +1,22 @@
+import os
+import sys
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def loaded_modules(code: str) -> set:
+    # ตรวจใน interpreter ใหม่ เพราะ process ของ pytest import PyQt6 ไว้แล้ว
+    result = subprocess.run([sys.executable, "-c", code + "\nimport sys\nprint('\\n'.join(sys.modules))"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+def test_core_and_api_do_not_import_qt():
+    modules = loaded_modules(
+        "import core.annotation, core.annotation_store, core.batch_export, core.document_tasks, core.jobs\n"
+        "import core.ocr, core.page_render, core.pdf_utils, core.render_profiles, core.document_handler\n"
+        "import api.api_handler")
+    assert not any(name.split(".")[0] == "PyQt6" for name in modules)
+
+def test_main_window_imports_heavy_modules_lazily():
+    modules = loaded_modules("import gui.main_window")
+    assert not modules & {"fitz", "pymupdf", "PIL.Image", "concurrent.futures.process"}
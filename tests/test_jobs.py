@@ -0,0 +1,83 @@
+import time
+import threading
+import pytest
+from core.jobs import JobQueue, QueueFullError, DONE, FAILED, CANCELLED, RUNNING
+
+def wait_for(queue, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while queue.get(job_id).status not in (DONE, FAILED, CANCELLED):
+        assert time.time() < deadline
+        time.sleep(0.01)
+    return queue.get(job_id)
+
+def test_job_result_and_failure():
+    queue = JobQueue(max_workers=1)
+    job = queue.submit("add", lambda a, b: a + b, 1, 2, params={"a": 1})
+    assert wait_for(queue, job.id).result == 3
+    assert job.to_dict()["params"] == {"a": 1}
+
+    def fail():
+        raise RuntimeError("boom")
+    job = wait_for(queue, queue.submit("fail", fail).id)
+    assert job.status == FAILED
+    assert job.to_dict()["error"] == "boom"
+    queue.shutdown()
+
+def test_queue_full_and_cancel():
+    release = threading.Event()
+    queue = JobQueue(max_workers=1, max_pending=2)
+    running = queue.submit("block", release.wait)
+    waiting = queue.submit("block", release.wait)
+    # งานค้างครบ max_pending แล้ว งานใหม่ถูกปฏิเสธ
+    with pytest.raises(QueueFullError):
+        queue.submit("block", release.wait)
+    assert queue.cancel(waiting.id)
+    assert waiting.status == CANCELLED
+    assert queue.stats()["pending"] == 1
+    queue.submit("block", release.wait)
+    release.set()
+    assert wait_for(queue, running.id).status == DONE
+    queue.shutdown()
+
+def test_keep_finished_trims_oldest():
+    queue = JobQueue(max_workers=1, keep_finished=2)
+    jobs = [queue.submit("noop", lambda: None) for _ in range(4)]
+    wait_for(queue, jobs[-1].id)
+    queue.shutdown()
+    assert queue.get(jobs[0].id) is None
+    assert queue.get(jobs[-1].id) is not None
+
+def test_trim_removes_job_folders(tmp_path):
+    queue = JobQueue(max_workers=1, keep_finished=1, jobs_dir=str(tmp_path))
+    first = queue.submit("noop", lambda: None)
+    wait_for(queue, first.id)
+    (tmp_path / first.id / "page-1.png").write_bytes(b"png")
+    second = queue.submit("noop", lambda: None)
+    wait_for(queue, second.id)
+    queue.shutdown()
+    assert not (tmp_path / first.id).exists()
+    assert (tmp_path / second.id / "job.json").exists()
+
+def test_other_process_reads_job_state(tmp_path):
+    # queue ที่สองจำลอง worker อีก process ที่ใช้ jobs_dir เดียวกัน
+    queue = JobQueue(max_workers=1, jobs_dir=str(tmp_path))
+    other = JobQueue(max_workers=1, jobs_dir=str(tmp_path))
+    job = wait_for(queue, queue.submit("add", lambda a, b: {"sum": a + b}, 1, 2, params={"a": 1}).id)
+    queue.shutdown()
+    seen = other.get(job.id)
+    assert (seen.status, seen.result, seen.params) == (DONE, {"sum": 3}, {"a": 1})
+    assert not other.cancel(job.id)
+    assert other.get("../" + job.id) is None
+
+def test_shutdown_cancels_queued_jobs():
+    release = threading.Event()
+    queue = JobQueue(max_workers=1)
+    running = queue.submit("block", release.wait)
+    waiting = queue.submit("block", release.wait)
+    while running.status != RUNNING:
+        time.sleep(0.01)
+    threading.Timer(0.1, release.set).start()
+    queue.shutdown()
+    assert running.status == DONE
+    assert waiting.status == CANCELLED and waiting.finished is not None
+    assert queue.stats()["pending"] == 0
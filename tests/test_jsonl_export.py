@@ -0,0 +1,47 @@
+import json
+import pytest
+from core.annotation import Annotation
+from core.jsonl_export import (
+    iter_annotations_jsonl,
+    write_jsonl,
+    iter_jsonl,
+    ShardedJsonlWriter,
+    ShardedJsonlReader,
+)
+
+def test_iter_annotations_jsonl_is_lazy():
+    def annotations():
+        for i in range(3):
+            yield Annotation(i, i, 10, 10, f"L{i}")
+    lines = iter_annotations_jsonl(annotations())
+    assert json.loads(next(lines))["label"] == "L0"
+    assert len(list(lines)) == 2
+
+def test_write_and_iter_jsonl(tmp_path):
+    path = str(tmp_path / "data.jsonl")
+    assert write_jsonl(({"i": i} for i in range(5)), path) == 5
+    assert [r["i"] for r in iter_jsonl(path)] == [0, 1, 2, 3, 4]
+
+def test_sharded_writer_random_access(tmp_path):
+    directory = str(tmp_path / "shards")
+    with ShardedJsonlWriter(directory, shard_max_bytes=200) as writer:
+        for doc in ("a.pdf", "b.pdf"):
+            for page in range(5):
+                writer.write(doc, page, {"document": doc, "page": page, "words": ["x" * 20]})
+    assert len(writer.shards) > 1
+
+    reader = ShardedJsonlReader(directory)
+    assert len(reader) == 10
+    assert reader.get("b.pdf", 3) == {"document": "b.pdf", "page": 3, "words": ["x" * 20]}
+    assert reader.get("c.pdf", 0) is None
+    assert [(r["document"], r["page"]) for r in reader][:2] == [("a.pdf", 0), ("a.pdf", 1)]
+
+def test_iter_json_array_matches_json_dumps():
+    from core.jsonl_export import iter_json_array, iter_records_jsonl
+    records = [{"i": i, "label": "ก"} for i in range(5)]
+    for chunk_records in (1, 2, 10):
+        text = "".join(iter_json_array(iter(records), chunk_records))
+        assert json.loads(text) == records
+        lines = "".join(iter_records_jsonl(iter(records), chunk_records)).splitlines()
+        assert [json.loads(line) for line in lines] == records
+    assert "".join(iter_json_array([])) == "[]"
@@ -0,0 +1,36 @@
+import pytest
+from PIL import Image, ImageDraw
+from core.ocr import StubOcrBackend, OcrCache, OcrStage, get_ocr_backend, page_hash
+
+@pytest.fixture
+def page_image():
+    image = Image.new("RGB", (200, 100), "white")
+    ImageDraw.Draw(image).rectangle((0, 0, 49, 49), fill="black")
+    return image
+
+def test_stub_backend_is_deterministic(page_image):
+    backend = get_ocr_backend("stub")
+    assert backend.recognize_batch([page_image.crop((0, 0, 50, 50))]) == [("50x50", 1.0)]
+    with pytest.raises(ValueError):
+        get_ocr_backend("missing")
+
+def test_stage_batches_and_caches(page_image, tmp_path):
+    backend = StubOcrBackend()
+    stage = OcrStage(backend, OcrCache(str(tmp_path)), batch_size=2)
+    key = page_hash("abc", 0, 3.0)
+    boxes = [[0, 0, 50, 50], [100, 0, 150, 50], [0, 50, 20, 70]]
+    results = stage.recognize_page(page_image, key, boxes)
+    assert results == [("50x50", 1.0), ("50x50", 0.0), ("20x20", 0.0)]
+    assert (backend.calls, backend.images) == (2, 3)
+
+    # กล่องเดิมไม่ถูก OCR ซ้ำ และไม่ต้อง render หน้าใหม่
+    stage.recognize_page(lambda: pytest.fail("page should not be rendered"), key, boxes)
+    assert backend.images == 3
+
+    # process ใหม่อ่านผลจาก cache บนดิสก์ได้ และ OCR เฉพาะกล่องใหม่
+    other = OcrStage(backend, OcrCache(str(tmp_path)))
+    results = other.recognize_page(page_image, key, boxes + [[150, 50, 200, 100]])
+    assert results[:3] == [("50x50", 1.0), ("50x50", 0.0), ("20x20", 0.0)]
+    assert backend.images == 4
+    stage.shutdown()
+    other.shutdown()
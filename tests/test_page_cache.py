@@ -0,0 +1,43 @@
+import pytest
+from core.page_cache import PageImageCache
+
+def test_cache_hit_and_miss():
+    cache = PageImageCache(budget_bytes=100)
+    assert cache.get("a.pdf", 0, 3.0) is None
+    cache.put("a.pdf", 0, 3.0, b"x" * 10)
+    assert cache.get("a.pdf", 0, 3.0) == b"x" * 10
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["bytes"] == 10
+
+def test_cache_evicts_least_recently_used():
+    cache = PageImageCache(budget_bytes=30)
+    cache.put("a.pdf", 0, 3.0, b"0" * 10)
+    cache.put("a.pdf", 1, 3.0, b"1" * 10)
+    cache.put("a.pdf", 2, 3.0, b"2" * 10)
+    # ใช้งานหน้า 0 ล่าสุด ดังนั้นหน้า 1 ต้องถูก evict ก่อน
+    cache.get("a.pdf", 0, 3.0)
+    cache.put("a.pdf", 3, 3.0, b"3" * 10)
+    assert cache.contains("a.pdf", 0, 3.0)
+    assert not cache.contains("a.pdf", 1, 3.0)
+    assert cache.stats()["evictions"] == 1
+    assert cache.current_bytes <= 30
+
+def test_get_or_render_renders_once():
+    cache = PageImageCache(budget_bytes=1000)
+    calls = []
+    def render():
+        calls.append(1)
+        return b"page"
+    cache.get_or_render("a.pdf", 0, 3.0, render)
+    cache.get_or_render("a.pdf", 0, 3.0, render)
+    assert len(calls) == 1
+
+def test_invalidate_file():
+    cache = PageImageCache(budget_bytes=1000)
+    cache.put("a.pdf", 0, 3.0, b"a")
+    cache.put("b.pdf", 0, 3.0, b"b")
+    cache.invalidate_file("a.pdf")
+    assert len(cache) == 1
+    assert cache.current_bytes == 1
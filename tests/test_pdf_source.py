@@ -0,0 +1,65 @@
+import gc
+import pytest
+import fitz
+from PyQt6.QtGui import QImage
+from core.pdf_utils import pixmap_to_ppm
+from gui.pdf_source import PdfPageSource, pixmap_to_qimage, ppm_to_qimage
+
+# Fixture สร้างไฟล์ PDF หลายหน้าใน temporary directory
+@pytest.fixture
+def sample_pdf(tmp_path):
+    file_path = tmp_path / "test_document.pdf"
+    doc = fitz.open()
+    for i in range(5):
+        page = doc.new_page(width=200, height=300)
+        page.insert_text((20, 40), f"Page {i+1}")
+    doc.save(str(file_path))
+    doc.close()
+    return str(file_path)
+
+def test_page_source_reports_page_count(sample_pdf):
+    source = PdfPageSource(sample_pdf)
+    assert source.page_count == 5
+    # ขนาดหน้าคำนวณได้โดยไม่ต้อง render
+    assert source.page_size(0) == (600, 900)
+    source.close()
+
+def test_page_source_renders_on_demand(qtbot, sample_pdf):
+    source = PdfPageSource(sample_pdf)
+    pixmap = source.render_page(2)
+    assert pixmap.width() == 600
+    assert pixmap.height() == 900
+    with pytest.raises(IndexError):
+        source.render_page(5)
+    source.close()
+
+def test_thumbnail_rendered_at_small_matrix(qtbot, sample_pdf):
+    source = PdfPageSource(sample_pdf)
+    image = source.render_thumbnail_image(0, 100)
+    # หน้า 200x300 point ต้องถูก render ให้พอดีกรอบ 100x100 โดยตรง
+    assert max(image.width(), image.height()) <= 100
+    assert image.height() == 100
+    source.close()
+
+def test_pixmap_wrapped_without_codec(qtbot, sample_pdf):
+    doc = fitz.open(sample_pdf)
+    pix = doc[0].get_pixmap(matrix=fitz.Matrix(2, 2))
+    expected = QImage.fromData(pix.tobytes("ppm"))
+    image = pixmap_to_qimage(pix)
+    # ปล่อย reference ของ pix: buffer ต้องยังอยู่เพราะผูกไว้กับ QImage
+    del pix
+    gc.collect()
+    assert image.width() == expected.width()
+    assert image.height() == expected.height()
+    assert image.convertToFormat(expected.format()) == expected
+    doc.close()
+
+def test_ppm_roundtrip_matches_fitz_ppm(qtbot, sample_pdf):
+    doc = fitz.open(sample_pdf)
+    for colorspace in (fitz.csRGB, fitz.csGRAY):
+        pix = doc[1].get_pixmap(matrix=fitz.Matrix(1.5, 1.5), colorspace=colorspace)
+        # ไฟล์ใน disk cache ที่เขียนด้วย tobytes("ppm") ต้องยังอ่านได้
+        assert pixmap_to_ppm(pix) == pix.tobytes("ppm")
+        image = ppm_to_qimage(pix.tobytes("ppm"))
+        assert image == pixmap_to_qimage(pix)
+    doc.close()
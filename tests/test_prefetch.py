@@ -0,0 +1,43 @@
+import threading
+import pytest
+from core.prefetch import PrefetchScheduler, prefetch_order
+
+def test_prefetch_order_nearest_first():
+    assert prefetch_order(5, 10, 2) == [6, 4, 7, 3]
+    # หน้าที่อยู่นอกเอกสารจะไม่ถูกรวม
+    assert prefetch_order(0, 3, 2) == [1, 2]
+
+def test_scheduler_renders_neighbours():
+    ready = {}
+    done = threading.Event()
+    def on_ready(index, image):
+        ready[index] = image
+        if len(ready) == 2:
+            done.set()
+    scheduler = PrefetchScheduler(lambda i: f"page-{i}", on_ready, window=1)
+    scheduler.schedule(3, 10)
+    assert done.wait(5)
+    assert ready == {2: "page-2", 4: "page-4"}
+    scheduler.shutdown()
+
+def test_scheduler_skips_cached_pages():
+    scheduler = PrefetchScheduler(lambda i: i, lambda i, img: None,
+                                  is_cached=lambda i: i == 4, window=1)
+    submitted = scheduler.schedule(3, 10)
+    assert submitted == [2]
+    scheduler.shutdown()
+
+def test_scheduler_cancels_far_pages():
+    release = threading.Event()
+    ready = []
+    def render(index):
+        release.wait(5)
+        return index
+    scheduler = PrefetchScheduler(render, lambda i, img: ready.append(i), window=1, max_workers=1)
+    scheduler.schedule(1, 100)
+    # กระโดดไปหน้าที่อยู่ไกล งานของหน้าเดิมต้องถูกยกเลิก
+    scheduler.schedule(50, 100)
+    assert scheduler.pending_pages() == [49, 51]
+    release.set()
+    scheduler.shutdown()
+    assert 0 not in ready and 2 not in ready
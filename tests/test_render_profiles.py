@@ -0,0 +1,106 @@
+import pytest
+import fitz
+from PIL import Image
+from PyQt6.QtGui import QImage
+from gui.pdf_source import PdfPageSource
+from gui.image_source import ImagePageSource
+from core.render_profiles import (RenderProfile, VIEWING_PROFILE, OCR_PROFILE, get_render_profile,
+                                  page_is_grayscale, render_pixmap, to_points, from_points, document_key,
+                                  page_pixel_size)
+from core.page_render import PageRenderer
+
+@pytest.fixture
+def mixed_pdf(tmp_path):
+    # หน้าแรกเป็นขาวดำ หน้าที่สองมีสี
+    file_path = tmp_path / "mixed.pdf"
+    doc = fitz.open()
+    page = doc.new_page(width=200, height=300)
+    page.insert_text((20, 40), "Gray page")
+    page = doc.new_page(width=200, height=300)
+    page.draw_rect(fitz.Rect(20, 20, 120, 120), color=(1, 0, 0), fill=(1, 0, 0))
+    doc.save(str(file_path))
+    doc.close()
+    return str(file_path)
+
+def test_profiles():
+    assert VIEWING_PROFILE.zoom == 3.0
+    assert get_render_profile("ocr") is OCR_PROFILE
+    assert OCR_PROFILE.replace(dpi=144).zoom == 2.0
+    with pytest.raises(ValueError):
+        RenderProfile("bad", 72, "cmyk")
+    with pytest.raises(ValueError):
+        get_render_profile("missing")
+
+def test_bbox_roundtrip_through_points():
+    bbox = [30, 60, 90, 150]
+    assert to_points(bbox, 3.0) == [10, 20, 30, 50]
+    assert from_points(to_points(bbox, 3.0), OCR_PROFILE.zoom) == pytest.approx([v * 300 / 216 for v in bbox])
+
+def test_page_size_rounded_the_same_in_gui_and_export(qtbot, tmp_path):
+    from core.batch_export import DocumentPages
+    pdf_path = str(tmp_path / "a4.pdf")
+    doc = fitz.open()
+    doc.new_page(width=595.28, height=841.89)
+    doc.save(pdf_path)
+    doc.close()
+    # A4 ที่ zoom 3: 595.28 * 3 = 1785.84 ต้องได้ 1786 pixel ทั้งบน canvas และในไฟล์ที่ export
+    assert page_pixel_size(fitz.Rect(0, 0, 595.28, 841.89), 3.0) == (1786, 2526)
+    source = PdfPageSource(pdf_path, zoom=3.0)
+    pages = DocumentPages(pdf_path, 3.0)
+    assert source.page_size(0) == pages.sizes[0] == pages.page_size(0, 3.0) == (1786, 2526)
+    source.close()
+    pages.close()
+
+def test_auto_colorspace_detects_gray_pages(mixed_pdf):
+    doc = fitz.open(mixed_pdf)
+    assert page_is_grayscale(doc[0])
+    assert not page_is_grayscale(doc[1])
+    assert render_pixmap(doc[0], VIEWING_PROFILE).n == 1
+    assert render_pixmap(doc[1], VIEWING_PROFILE).n == 3
+    assert render_pixmap(doc[1], OCR_PROFILE).n == 1
+    doc.close()
+
+def test_grayscale_probe_shared_between_sources(qtbot, mixed_pdf, monkeypatch):
+    probes = []
+    original = fitz.Page.get_pixmap
+    def counting_get_pixmap(page, *args, **kwargs):
+        if "colorspace" not in kwargs:  # ภาพตัวอย่างของ page_is_grayscale
+            probes.append(page.number)
+        return original(page, *args, **kwargs)
+    monkeypatch.setattr(fitz.Page, "get_pixmap", counting_get_pixmap)
+
+    source = PdfPageSource(mixed_pdf)
+    assert source.render_image(0).format() == QImage.Format.Format_Grayscale8
+    source.render_thumbnail(0)
+    source.close()
+    # แหล่งหน้าอื่นที่เปิดไฟล์เดียวกัน (เช่น งาน export) ใช้ผลการตรวจเดิม
+    with PageRenderer(mixed_pdf) as renderer:
+        assert renderer.render_image(0, VIEWING_PROFILE).mode == "L"
+    assert probes == [0]
+    # ผู้เรียกที่รู้ colorspace ของหน้าแล้วไม่ต้องตรวจ
+    doc = fitz.open(mixed_pdf)
+    assert render_pixmap(doc[1], VIEWING_PROFILE, grayscale=True).n == 1
+    assert probes == [0]
+    # ไฟล์ที่ถูกแก้ไขได้ key ใหม่
+    assert document_key(mixed_pdf) != document_key(str(mixed_pdf) + ".missing") is None
+    doc.close()
+
+def test_page_source_renders_gray_pages_single_channel(qtbot, mixed_pdf):
+    source = PdfPageSource(mixed_pdf)
+    gray = source.render_image(0)
+    color = source.render_image(1)
+    assert gray.format() == QImage.Format.Format_Grayscale8
+    assert color.format() == QImage.Format.Format_RGB888
+    # ขนาดภาพ (และพิกัดของ annotation) ไม่ขึ้นกับ colorspace
+    assert (gray.width(), gray.height()) == (color.width(), color.height()) == source.page_size(0)
+    assert gray.sizeInBytes() * 3 == color.sizeInBytes()
+    assert source.to_points([30, 30, 60, 90]) == [10, 10, 20, 30]
+    source.close()
+
+def test_image_source_keeps_grayscale_scans(qtbot, tmp_path):
+    path = tmp_path / "scan.png"
+    Image.new("L", (40, 30), 128).save(path)
+    source = ImagePageSource(str(path))
+    assert source.render_image(0).format() == QImage.Format.Format_Grayscale8
+    assert source.render_thumbnail_image(0, 20).format() == QImage.Format.Format_Grayscale8
+    source.close()
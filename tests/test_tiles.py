@@ -0,0 +1,23 @@
+import pytest
+from core.tiles import level_for_scale, tile_scene_rect, tiles_for_rect, TILE_SIZE
+
+def test_level_for_scale():
+    assert level_for_scale(1.0) == 0
+    assert level_for_scale(1.5) == 1
+    assert level_for_scale(0.3) == -1
+    # ระดับถูกจำกัดด้วย max_level
+    assert level_for_scale(100.0, max_level=2) == 2
+
+def test_tile_scene_rect_clipped_to_image():
+    # ภาพกว้าง 600 pixel: tile ที่สองของระดับ 0 เหลือ 88 pixel
+    assert tile_scene_rect(0, 1, 0, 600, 600) == (TILE_SIZE, 0, 600 - TILE_SIZE, TILE_SIZE)
+    # ระดับ 1 ครอบคลุมพื้นที่ scene ครึ่งหนึ่งของระดับ 0
+    assert tile_scene_rect(1, 0, 0, 600, 600)[2] == TILE_SIZE / 2
+
+def test_tiles_for_rect_only_visible():
+    tiles = tiles_for_rect((0, 0, 300, 300), 0, 2000, 2000)
+    assert tiles == [(0, 0)]
+    tiles = tiles_for_rect((500, 500, 100, 100), 1, 2000, 2000)
+    assert tiles == [(1, 1), (2, 1), (1, 2), (2, 2)]
+    # พื้นที่นอกภาพไม่มี tile
+    assert tiles_for_rect((3000, 3000, 10, 10), 0, 2000, 2000) == []
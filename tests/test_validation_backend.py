@@ -0,0 +1,84 @@
+import pytest
+from core.annotation import Annotation, validate_annotations
+from core.validation_backend import ValidationBackend
+
+@pytest.fixture
+def overlapping_annotations():
+    return [Annotation(0, 0, 20, 20, "A"), Annotation(1, 1, 20, 20, "B"), Annotation(100, 100, 5, 5, "C")]
+
+def test_small_batch_runs_on_thread(overlapping_annotations):
+    backend = ValidationBackend()
+    future = backend.submit(overlapping_annotations)
+    # ผู้เรียกแก้ไข list ต่อได้ทันทีโดยไม่กระทบการตรวจที่เริ่มไปแล้ว
+    expected = validate_annotations(list(overlapping_annotations))
+    overlapping_annotations.clear()
+    assert future.result(timeout=10) == expected
+    assert backend.last_timing["backend"] == "thread"
+    # pool ของ process ต้องไม่ถูกสร้างถ้าไม่ได้ใช้
+    assert backend._executor is None
+    backend.shutdown()
+
+def test_choose_backend_by_size():
+    backend = ValidationBackend(process_threshold=100, shared_memory_threshold=1000)
+    assert backend.choose(10)[0] == "thread"
+    assert backend.choose(500)[0] == "process"
+    assert backend.choose(5000)[0] == "process+shm"
+
+@pytest.mark.parametrize("shared_memory_threshold", [1, 10**9])
+def test_process_backend_matches_inline(overlapping_annotations, shared_memory_threshold):
+    backend = ValidationBackend(process_threshold=1, shared_memory_threshold=shared_memory_threshold)
+    try:
+        result = backend.submit(overlapping_annotations).result(timeout=60)
+    finally:
+        backend.shutdown()
+    assert result == validate_annotations(overlapping_annotations)
+    assert backend.last_timing["backend"].startswith("process")
+
+def test_default_thresholds_reach_every_backend():
+    from core.validation_backend import DEFAULT_PROCESS_THRESHOLD, DEFAULT_SHARED_MEMORY_THRESHOLD
+    backend = ValidationBackend()
+    assert DEFAULT_SHARED_MEMORY_THRESHOLD >= DEFAULT_PROCESS_THRESHOLD
+    assert backend.choose(DEFAULT_PROCESS_THRESHOLD - 1)[0] == "thread"
+    assert backend.choose(DEFAULT_PROCESS_THRESHOLD)[0] == "process"
+    assert backend.choose(DEFAULT_SHARED_MEMORY_THRESHOLD - 1)[0] == "process"
+    assert backend.choose(DEFAULT_SHARED_MEMORY_THRESHOLD)[0] == "process+shm"
+
+@pytest.mark.parametrize("process_threshold", [10**9, 1])
+def test_boxes_on_other_pages_do_not_overlap(process_threshold):
+    # กล่องพิกัดเดียวกันบนคนละหน้า (รวมหน้า None) ไม่ซ้อนทับกัน ทั้งใน process เดิมและใน worker
+    annotations = [Annotation(0, 0, 20, 20, "A", page=0), Annotation(0, 0, 20, 20, "B", page=1),
+                   Annotation(0, 0, 20, 20, "C"), Annotation(1, 1, 20, 20, "D", page=1)]
+    backend = ValidationBackend(process_threshold=process_threshold)
+    try:
+        valid, message = backend.submit(annotations).result(timeout=60)
+    finally:
+        backend.shutdown()
+    assert not valid
+    assert message.splitlines() == ["Annotations 1 and 3 overlap more than 80.0%."]
+    assert (valid, message) == validate_annotations(annotations)
+
+def test_worker_reports_real_error_and_shared_memory_released(monkeypatch):
+    from multiprocessing import shared_memory
+    from core import validation_backend
+    # สร้าง array ไม่ได้ (จำนวนกล่องเกินขนาด buffer): ต้องได้ error จริง ไม่ใช่ UnboundLocalError
+    shm = shared_memory.SharedMemory(create=True, size=8)
+    try:
+        with pytest.raises(TypeError):
+            validation_backend._validate_in_worker((shm.name, 10), 0.8)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    created = []
+    original = shared_memory.SharedMemory
+    def tracking(*args, **kwargs):
+        created.append(original(*args, **kwargs))
+        return created[-1]
+    monkeypatch.setattr(shared_memory, "SharedMemory", tracking)
+    backend = ValidationBackend(process_threshold=1, shared_memory_threshold=1)
+    backend._get_executor().shutdown()
+    with pytest.raises(RuntimeError):
+        backend.submit([Annotation(0, 0, 1, 1, "A")])
+    # segment ที่สร้างไว้ถูก unlink แล้ว
+    with pytest.raises(FileNotFoundError):
+        original(name=created[0].name)